@@ -0,0 +1,226 @@
+import io
+import math
+import os
+import zipfile
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+try:
+    import pymupdf
+except ImportError:  # pragma: no cover - optional dependency
+    pymupdf = None
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif", ".webp")
+MAX_PAGES = int(os.getenv("LAB_DOCUMENT_MAX_PAGES", "30"))
+PDF_DPI = int(os.getenv("LAB_DOCUMENT_DPI", "150"))
+# Pixels per rendered PDF page; oversized pages are rendered at a lower DPI, down to PDF_MIN_DPI
+MAX_PAGE_PIXELS = int(os.getenv("LAB_DOCUMENT_MAX_PAGE_PIXELS", str(25_000_000)))
+PDF_MIN_DPI = int(os.getenv("LAB_DOCUMENT_MIN_DPI", "72"))
+# Uncompressed size limits for zip uploads, per image and for the whole archive
+MAX_ZIP_ENTRY_BYTES = int(os.getenv("LAB_DOCUMENT_MAX_ENTRY_BYTES", str(20 * 1024 * 1024)))
+MAX_ZIP_TOTAL_BYTES = int(os.getenv("LAB_DOCUMENT_MAX_TOTAL_BYTES", str(200 * 1024 * 1024)))
+
+
+class DocumentError(ValueError):
+    """Raised when an uploaded document cannot be turned into page images"""
+
+
+def is_pdf(contents: bytes) -> bool:
+    return contents[:5] == b"%PDF-"
+
+
+def is_zip(contents: bytes) -> bool:
+    return zipfile.is_zipfile(io.BytesIO(contents))
+
+
+def page_dpi(width_pt: float, height_pt: float, dpi: int, max_pixels: int) -> int:
+    """
+    Rendering DPI for a page of the given size (in points) within the pixel budget
+
+    Returns `dpi` when the page fits, otherwise the highest DPI that does.
+    """
+    pixels = (width_pt * dpi / 72) * (height_pt * dpi / 72)
+    if pixels <= max_pixels:
+        return dpi
+    return int(dpi * math.sqrt(max_pixels / pixels))
+
+
+def rasterize_pdf(
+    contents: bytes,
+    dpi: int = PDF_DPI,
+    max_pixels: int = MAX_PAGE_PIXELS,
+    min_dpi: int = PDF_MIN_DPI,
+) -> List[Tuple[str, bytes]]:
+    """
+    Render every page of a PDF to a PNG image
+
+    Page sizes come from the PDF itself, so a tiny file can declare a page that
+    would need gigabytes at `dpi`. Each page is checked before rendering: pages
+    over `max_pixels` are rendered at a lower DPI, and refused if that falls
+    below `min_dpi`.
+
+    Args:
+        contents: Raw PDF bytes
+        dpi: Rendering resolution
+        max_pixels: Largest rendered page, in pixels
+        min_dpi: Lowest resolution an oversized page may be reduced to
+
+    Returns:
+        List of (page name, PNG bytes) in page order
+    """
+    if pymupdf is None:
+        raise DocumentError("PDF support requires PyMuPDF (pip install pymupdf)")
+
+    try:
+        document = pymupdf.open(stream=contents, filetype="pdf")
+    except Exception as e:
+        raise DocumentError(f"Invalid PDF file: {str(e)}")
+
+    with document:
+        if document.page_count == 0:
+            raise DocumentError("PDF has no pages")
+        if document.page_count > MAX_PAGES:
+            raise DocumentError(f"PDF has {document.page_count} pages, the limit is {MAX_PAGES}")
+
+        pages = []
+        for number, page in enumerate(document, start=1):
+            rect = page.rect
+            render_dpi = page_dpi(rect.width, rect.height, dpi, max_pixels)
+            if render_dpi < min_dpi:
+                raise DocumentError(
+                    f"PDF page {number} is {rect.width / 72:.0f}x{rect.height / 72:.0f} inches, "
+                    f"too large to render within {max_pixels} pixels"
+                )
+            pixmap = page.get_pixmap(dpi=render_dpi)
+            pages.append((f"page-{number}", pixmap.tobytes("png")))
+    return pages
+
+
+def _read_zip_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    """Decompress one entry, refusing it once it grows past `limit` bytes whatever its header claims"""
+    with archive.open(info) as entry:
+        data = entry.read(limit + 1)
+    if len(data) > limit:
+        raise DocumentError(f"Image '{info.filename}' in zip is larger than its declared size allows")
+    return data
+
+
+def extract_zip_pages(
+    contents: bytes,
+    max_entry_bytes: int = MAX_ZIP_ENTRY_BYTES,
+    max_total_bytes: int = MAX_ZIP_TOTAL_BYTES,
+) -> List[Tuple[str, bytes]]:
+    """
+    Extract the page scans from a zip archive, ordered by file name
+
+    Declared uncompressed sizes are checked against the limits before anything is
+    decompressed, and each entry is read no further than its declared size, so a
+    small archive cannot expand into gigabytes in memory.
+
+    Args:
+        contents: Raw zip bytes
+        max_entry_bytes: Largest uncompressed image
+        max_total_bytes: Largest uncompressed total over all images
+
+    Returns:
+        List of (file name, image bytes); non-image entries are ignored
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(contents))
+    except zipfile.BadZipFile as e:
+        raise DocumentError(f"Invalid zip file: {str(e)}")
+
+    with archive:
+        entries = sorted(
+            (
+                info for info in archive.infolist()
+                if not info.is_dir()
+                and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+                and not os.path.basename(info.filename).startswith(".")
+            ),
+            key=lambda info: info.filename,
+        )
+        if not entries:
+            raise DocumentError("Zip file contains no images")
+        if len(entries) > MAX_PAGES:
+            raise DocumentError(f"Zip file has {len(entries)} images, the limit is {MAX_PAGES}")
+
+        total = 0
+        for info in entries:
+            if info.file_size > max_entry_bytes:
+                raise DocumentError(f"Image '{info.filename}' in zip is {info.file_size} bytes uncompressed, the limit is {max_entry_bytes}")
+            total += info.file_size
+        if total > max_total_bytes:
+            raise DocumentError(f"Zip file images are {total} bytes uncompressed, the limit is {max_total_bytes}")
+
+        pages = []
+        for info in entries:
+            data = _read_zip_entry(archive, info, info.file_size)
+            try:
+                Image.open(io.BytesIO(data)).verify()
+            except Exception as e:
+                raise DocumentError(f"Invalid image '{info.filename}' in zip: {str(e)}")
+            pages.append((info.filename, data))
+    return pages
+
+
+def load_document_pages(contents: bytes) -> List[Tuple[str, bytes]]:
+    """Split an uploaded PDF or zip into page images"""
+    if is_pdf(contents):
+        return rasterize_pdf(contents)
+    if is_zip(contents):
+        return extract_zip_pages(contents)
+    raise DocumentError("File must be a PDF or a zip of page images")
+
+
+def merge_page_results(pages: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge per-page parsed analyses into one report
+
+    Args:
+        pages: List of (page name, parsed analysis) in page order
+
+    Returns:
+        Dictionary with the same fields as a single-page analysis plus a "pages" list
+    """
+    merged = {
+        "error": False,
+        "summary": "",
+        "key_findings": [],
+        "analytes": [],
+        "interpretation": "",
+        "note": "",
+        "pages": [],
+    }
+
+    summaries = []
+    interpretations = []
+    failed = 0
+    for name, result in pages:
+        merged["pages"].append({"page": name, **result})
+        if result.get("error"):
+            failed += 1
+            continue
+        if result.get("summary"):
+            summaries.append(result["summary"])
+        if result.get("interpretation"):
+            interpretations.append(result["interpretation"])
+        for finding in result.get("key_findings", []):
+            if finding not in merged["key_findings"]:
+                merged["key_findings"].append(finding)
+        for analyte in result.get("analytes", []):
+            merged["analytes"].append({**analyte, "page": name})
+        if not merged["note"] and result.get("note"):
+            merged["note"] = result["note"]
+
+    merged["summary"] = " ".join(summaries)
+    merged["interpretation"] = " ".join(interpretations)
+    merged["pages_analyzed"] = len(pages) - failed
+    merged["pages_failed"] = failed
+
+    if pages and failed == len(pages):
+        merged["error"] = True
+        merged["message"] = "Analysis failed for every page"
+
+    return merged
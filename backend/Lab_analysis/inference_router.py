@@ -0,0 +1,351 @@
+import asyncio
+import copy
+import importlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from huggingface_hub import InferenceClient
+
+from metrics import PROVIDER_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying on the same provider
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# HTTP statuses that are specific to one provider (auth, unknown model) - skip to the next one
+PROVIDER_STATUS = {401, 402, 403, 404}
+
+DEFAULT_PROVIDERS = [{"provider": "nebius", "model": "google/gemma-3-27b-it"}]
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the request deadline passes before any provider answered"""
+
+
+class NoProviderAvailable(RuntimeError):
+    """Raised when every provider failed or has an open circuit breaker"""
+
+
+def _transient_error_types() -> Tuple[type, ...]:
+    """Timeout and connection error classes of the HTTP clients that may be installed"""
+    types: List[type] = [TimeoutError, ConnectionError, asyncio.TimeoutError]
+    for module_name, names in (
+        ("requests.exceptions", ("Timeout", "ConnectionError", "ChunkedEncodingError")),
+        ("httpx", ("TimeoutException", "NetworkError", "RemoteProtocolError")),
+        # huggingface_hub >= 1.0 talks HTTP through httpx2
+        ("httpx2", ("TimeoutException", "NetworkError", "RemoteProtocolError")),
+    ):
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        types.extend(getattr(module, name) for name in names if hasattr(module, name))
+    return tuple(types)
+
+
+# Transport failures that carry no HTTP response and are worth retrying
+TRANSIENT_ERRORS = _transient_error_types()
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a provider error: on its response (requests, httpx, huggingface_hub) or on the error (openai)"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Decide how the router should react to a provider error
+
+    Returns:
+        "retry" for transient failures (timeouts, connection errors, 429/5xx),
+        "next" for provider-specific failures (auth, unknown model),
+        "fatal" for errors caused by the request itself (e.g. 400)
+    """
+    status = _status_code(error)
+    if status is not None:
+        if status in RETRYABLE_STATUS:
+            return "retry"
+        if status in PROVIDER_STATUS:
+            return "next"
+        return "fatal"
+    if isinstance(error, TRANSIENT_ERRORS):
+        return "retry"
+    return "fatal"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to this provider now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial slot without counting an outcome"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ProviderBackend:
+    """One provider/model pair reachable through an OpenAI-compatible chat completions API"""
+
+    def __init__(
+        self,
+        model: str,
+        provider: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        name: Optional[str] = None,
+        client: Any = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            model: Model id sent with each request
+            provider: Hugging Face inference provider (e.g. "nebius")
+            base_url: OpenAI-compatible endpoint, used instead of a provider
+            api_key: API key; defaults to HUGGINGFACE_API_KEY
+            timeout: Per-call HTTP timeout in seconds; calls with a deadline use the shorter of the two
+            name: Label used in logs and stats
+            client: Pre-built client exposing chat.completions.create (e.g. a fake for testing)
+            breaker: Circuit breaker for this backend
+        """
+        self.model = model
+        self.timeout = timeout
+        self.name = name or f"{provider or base_url}:{model}"
+        self.client = client or InferenceClient(
+            provider=provider if base_url is None else None,
+            base_url=base_url,
+            api_key=api_key or os.getenv("HUGGINGFACE_API_KEY", "your-api-key-here"),
+            timeout=timeout,
+        )
+        self.breaker = breaker or CircuitBreaker()
+
+    def create(self, messages: List[Dict[str, Any]], timeout: Optional[float] = None, **kwargs):
+        """
+        Run a chat completion synchronously
+
+        Args:
+            messages: Chat messages
+            timeout: HTTP timeout for this call in seconds, e.g. the time left until the
+                request's deadline, so the call stops instead of outliving its caller
+            **kwargs: Extra arguments for chat.completions.create
+        """
+        client = self.client
+        if timeout is not None and hasattr(client, "timeout"):
+            # The client is shared across executor threads; a shallow copy keeps its
+            # HTTP session and gets its own timeout
+            client = copy.copy(client)
+            client.timeout = max(0.001, timeout if self.timeout is None else min(timeout, self.timeout))
+        return client.chat.completions.create(model=self.model, messages=messages, **kwargs)
+
+
+class InferenceRouter:
+    """
+    Sends chat completions to several backends in priority order
+
+    Transient errors are retried on the same backend with exponential backoff and
+    full jitter; each backend has a circuit breaker so that a provider in a brownout
+    is skipped instead of burning every request's timeout.
+    """
+
+    def __init__(
+        self,
+        backends: List[ProviderBackend],
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        if not backends:
+            raise ValueError("At least one provider backend is required")
+        self.backends = backends
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls) -> "InferenceRouter":
+        """
+        Build a router from LAB_PROVIDERS, a JSON list of backends in priority order, e.g.
+        [{"provider": "nebius", "model": "google/gemma-3-27b-it"},
+         {"base_url": "http://localhost:9000", "model": "stub"}]
+        """
+        specs = json.loads(os.getenv("LAB_PROVIDERS", "null") or "null") or DEFAULT_PROVIDERS
+        threshold = int(os.getenv("LAB_BREAKER_THRESHOLD", "5"))
+        reset = float(os.getenv("LAB_BREAKER_RESET", "30"))
+        backends = [
+            ProviderBackend(
+                model=spec["model"],
+                provider=spec.get("provider"),
+                base_url=spec.get("base_url"),
+                api_key=spec.get("api_key"),
+                timeout=spec.get("timeout"),
+                name=spec.get("name"),
+                breaker=CircuitBreaker(threshold, reset),
+            )
+            for spec in specs
+        ]
+        return cls(
+            backends,
+            max_attempts=int(os.getenv("LAB_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("LAB_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LAB_RETRY_MAX_DELAY", "8")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def complete(self, messages: List[Dict[str, Any]], deadline: Optional[float] = None, **kwargs):
+        """
+        Run a chat completion on the first healthy backend
+
+        Args:
+            messages: Chat messages
+            deadline: Absolute time.monotonic() by which an answer is needed
+            **kwargs: Extra arguments for chat.completions.create
+
+        Returns:
+            The provider's completion object
+
+        Raises:
+            DeadlineExceeded: If the deadline passed
+            NoProviderAvailable: If every backend failed or is open
+        """
+        loop = asyncio.get_running_loop()
+        last_error: Optional[Exception] = None
+
+        for backend in self.backends:
+            if not backend.breaker.allow():
+                logger.info(f"Skipping provider {backend.name}: circuit open")
+                continue
+
+            for attempt in range(self.max_attempts):
+                remaining = self._remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    backend.breaker.release()
+                    raise DeadlineExceeded(f"Request deadline exceeded (last error: {last_error})")
+
+                try:
+                    # The provider gets the remaining budget as its HTTP timeout; wait_for
+                    # is the backstop for clients that ignore it
+                    call = loop.run_in_executor(None, lambda: backend.create(messages, timeout=remaining, **kwargs))
+                    result = await asyncio.wait_for(call, timeout=remaining)
+                except Exception as e:
+                    remaining = self._remaining(deadline)
+                    if isinstance(e, asyncio.TimeoutError) and remaining is not None and remaining <= 0:
+                        # The provider was still working when the request's budget ran out
+                        backend.breaker.record_failure()
+                        PROVIDER_ATTEMPTS.labels(backend.name, "deadline").inc()
+                        raise DeadlineExceeded(f"Request deadline exceeded waiting for provider {backend.name}")
+                    last_error = e
+                    action = classify_error(e)
+                    PROVIDER_ATTEMPTS.labels(backend.name, action).inc()
+                    logger.warning(f"Provider {backend.name} attempt {attempt + 1} failed ({action}): {str(e)}")
+                    if action == "fatal":
+                        backend.breaker.release()
+                        raise
+                    backend.breaker.record_failure()
+                    if action == "next" or backend.breaker.state == CircuitBreaker.OPEN:
+                        break
+
+                    delay = self.backoff(attempt)
+                    remaining = self._remaining(deadline)
+                    if attempt + 1 >= self.max_attempts or (remaining is not None and delay >= remaining):
+                        break
+                    await asyncio.sleep(delay)
+                else:
+                    backend.breaker.record_success()
+                    PROVIDER_ATTEMPTS.labels(backend.name, "success").inc()
+                    return result
+
+        raise NoProviderAvailable(f"All inference providers failed or are unavailable (last error: {last_error})")
+
+    def open_stream(self, messages: List[Dict[str, Any]], deadline: Optional[float] = None, **kwargs):
+        """
+        Start a streaming completion on the first healthy backend (blocking)
+
+        Only establishing the stream fails over; errors mid-stream are raised to the caller.
+
+        Raises:
+            DeadlineExceeded: If the deadline passed before a stream was opened
+            NoProviderAvailable: If every backend failed or is open
+        """
+        last_error: Optional[Exception] = None
+        for backend in self.backends:
+            if not backend.breaker.allow():
+                continue
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                backend.breaker.release()
+                raise DeadlineExceeded(f"Request deadline exceeded (last error: {last_error})")
+            try:
+                stream = backend.create(messages, stream=True, timeout=remaining, **kwargs)
+            except Exception as e:
+                last_error = e
+                if classify_error(e) == "fatal":
+                    backend.breaker.release()
+                    raise
+                backend.breaker.record_failure()
+                continue
+            backend.breaker.record_success()
+            return stream
+        raise NoProviderAvailable(f"All inference providers failed or are unavailable (last error: {last_error})")
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Breaker state of each backend, in priority order"""
+        return [
+            {"name": backend.name, "state": backend.breaker.state, "consecutive_failures": backend.breaker.failures}
+            for backend in self.backends
+        ]
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
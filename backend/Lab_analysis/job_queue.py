@@ -0,0 +1,398 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class CallbackURLError(ValueError):
+    """A callback URL the server must not POST to"""
+
+
+def allowed_callback_hosts() -> List[str]:
+    """LAB_CALLBACK_ALLOWED_HOSTS as a list; ".example.com" also allows its subdomains"""
+    return [h.strip().lower() for h in os.getenv("LAB_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+
+
+def check_callback_url(url: str, allowed_hosts: Optional[Sequence[str]] = None):
+    """
+    Refuse callback URLs that would make the server reach into its own network
+
+    Only http and https are accepted. With an allow-list, the host must be listed
+    (exactly, or under a listed ".domain"). Without one, every address the host
+    resolves to must be globally routable: loopback, private, link-local, multicast
+    and reserved addresses are refused, which also covers cloud metadata endpoints.
+
+    Raises:
+        CallbackURLError: The URL is not acceptable
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise CallbackURLError("Callback URL must use http or https")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise CallbackURLError("Callback URL has no host")
+    if parts.username or parts.password:
+        raise CallbackURLError("Callback URL must not contain credentials")
+
+    if allowed_hosts:
+        if not any(host == h or (h.startswith(".") and host.endswith(h)) for h in allowed_hosts):
+            raise CallbackURLError(f"Callback host {host} is not in LAB_CALLBACK_ALLOWED_HOSTS")
+        return
+
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise CallbackURLError(f"Callback host {host} does not resolve: {str(e)}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise CallbackURLError(f"Callback host {host} resolves to non-public address {address}")
+
+
+class JobStore:
+    """SQLite-backed persistence for lab analysis jobs"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the job database
+
+        Args:
+            db_path: Path to the SQLite file, or ":memory:" for a throwaway store
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    callback_url TEXT,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    heartbeat_at REAL
+                )
+                """
+            )
+            # Databases created before jobs were claimed by worker
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("worker", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def create(self, payload: str, filename: Optional[str], callback_url: Optional[str]) -> str:
+        """Insert a new queued job and return its id"""
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, callback_url, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, filename, callback_url, payload, time.time()),
+            )
+        return job_id
+
+    def get_payload(self, job_id: str) -> Optional[str]:
+        """Return the stored image payload of a job that has not finished yet"""
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["payload"] if row else None
+
+    def claim(self, job_id: str, worker: str) -> bool:
+        """
+        Atomically move a queued job to running for one worker
+
+        Several processes may share the database and hold the same job id in their
+        queues; only the one whose UPDATE matches the queued row runs it.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, worker, now, now, job_id, JOB_QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Record that `worker` is still running the job; False if it no longer owns it"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (time.time(), job_id, JOB_RUNNING, worker),
+            )
+        return cursor.rowcount == 1
+
+    def mark_finished(
+        self,
+        job_id: str,
+        worker: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Store the outcome of a job `worker` owns and drop its image payload; False if it lost the job"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, finished_at = ? "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, JOB_RUNNING, worker),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the public view of a job, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, filename, callback_url, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Return running jobs whose worker stopped heartbeating to the queue; returns how many"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (JOB_QUEUED, JOB_RUNNING, time.time() - stale_after),
+            )
+        return cursor.rowcount
+
+    def queued_ids(self) -> List[str]:
+        """Ids of jobs waiting for a worker, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                (JOB_QUEUED,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    In-process task queue that runs lab analyses on a fixed pool of async workers
+
+    Several processes (uvicorn workers) may share one SQLite file. Each claims a job
+    atomically before running it and heartbeats while it runs; every `stale_after`
+    seconds each process requeues running jobs whose heartbeat stopped (their
+    process died) and picks up queued jobs it has not seen.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: Callable[[str], Awaitable[Dict[str, Any]]],
+        workers: int = 4,
+        heartbeat_interval: Optional[float] = None,
+        stale_after: Optional[float] = None,
+        callback_attempts: Optional[int] = None,
+        callback_backoff: Optional[float] = None,
+        callback_allowed_hosts: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            store: Persistent job state
+            handler: Coroutine taking a base64 image and returning the analysis dict
+            workers: Number of analyses allowed to run concurrently
+            heartbeat_interval: Seconds between heartbeats of a running job (LAB_JOB_HEARTBEAT, 10)
+            stale_after: Seconds without a heartbeat before a running job is requeued (LAB_JOB_STALE_AFTER, 60)
+            callback_attempts: Tries per callback POST (LAB_CALLBACK_ATTEMPTS, 4)
+            callback_backoff: Seconds before the first retry, doubled each time (LAB_CALLBACK_BACKOFF, 1)
+            callback_allowed_hosts: Hosts callbacks may go to (LAB_CALLBACK_ALLOWED_HOSTS); without
+                an allow-list only public addresses are accepted
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv("LAB_JOB_HEARTBEAT", "10"))
+        self.stale_after = stale_after or float(os.getenv("LAB_JOB_STALE_AFTER", "60"))
+        self.callback_attempts = callback_attempts or int(os.getenv("LAB_CALLBACK_ATTEMPTS", "4"))
+        self.callback_backoff = callback_backoff if callback_backoff is not None else float(os.getenv("LAB_CALLBACK_BACKOFF", "1"))
+        self.callback_allowed_hosts = list(callback_allowed_hosts) if callback_allowed_hosts is not None else allowed_callback_hosts()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._waiting: set = set()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Spawn the workers, recover jobs of dead workers and pick up queued jobs"""
+        self._queue = asyncio.Queue()
+        await self._sweep()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def check_callback(self, callback_url: str):
+        """
+        Raises:
+            CallbackURLError: The server must not POST to this URL
+        """
+        check_callback_url(callback_url, self.callback_allowed_hosts)
+
+    async def submit(self, image_b64: str, filename: Optional[str] = None, callback_url: Optional[str] = None) -> str:
+        """
+        Persist a job and hand it to the workers; returns immediately with the job id
+
+        Raises:
+            CallbackURLError: The callback URL is refused
+        """
+        if callback_url:
+            await asyncio.to_thread(self.check_callback, callback_url)
+        job_id = await asyncio.to_thread(self.store.create, image_b64, filename, callback_url)
+        self._enqueue(job_id)
+        return job_id
+
+    def _enqueue(self, job_id: str):
+        if job_id not in self._waiting:
+            self._waiting.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _sweep(self):
+        requeued = await asyncio.to_thread(self.store.requeue_stale, self.stale_after)
+        if requeued:
+            logger.info(f"Requeued {requeued} lab analysis jobs whose worker stopped heartbeating")
+        for job_id in await asyncio.to_thread(self.store.queued_ids):
+            self._enqueue(job_id)
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(self.stale_after)
+            try:
+                await self._sweep()
+            except Exception as e:
+                logger.error(f"Job sweep failed: {str(e)}")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            self._waiting.discard(job_id)
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        # Another process (or an earlier sweep) may have taken it already
+        if not await asyncio.to_thread(self.store.claim, job_id, self.worker_id):
+            return
+        payload = await asyncio.to_thread(self.store.get_payload, job_id)
+        if payload is None:
+            logger.warning(f"Job {job_id} has no payload, skipping")
+            await asyncio.to_thread(self.store.mark_finished, job_id, self.worker_id, JOB_FAILED, None, "Job payload missing")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await self.handler(payload)
+        except Exception as e:
+            status, result, error = JOB_FAILED, None, str(e)
+        else:
+            status = JOB_FAILED if result.get("error") else JOB_COMPLETED
+            error = result.get("message")
+        finally:
+            heartbeat.cancel()
+
+        if not await asyncio.to_thread(self.store.mark_finished, job_id, self.worker_id, status, result, error):
+            logger.warning(f"Job {job_id} was requeued while this worker ran it; dropping this result")
+            return
+
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job and job.get("callback_url"):
+            await self._deliver_callback(job)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await asyncio.to_thread(self.store.heartbeat, job_id, self.worker_id)
+
+    async def _deliver_callback(self, job: Dict[str, Any]):
+        """POST the finished job to its callback URL, retrying with exponential backoff"""
+        delay = self.callback_backoff
+        for attempt in range(1, self.callback_attempts + 1):
+            try:
+                retry = await asyncio.to_thread(self._send_callback, job)
+            except CallbackURLError as e:
+                logger.warning(f"Callback for job {job['id']} refused: {str(e)}")
+                return
+            if not retry:
+                return
+            if attempt < self.callback_attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+        logger.warning(f"Callback for job {job['id']} to {job['callback_url']} failed after {self.callback_attempts} attempts")
+
+    def _send_callback(self, job: Dict[str, Any]) -> bool:
+        """
+        POST the finished job once
+
+        The URL is checked again right before sending, since the host may resolve
+        differently than at submit time. Redirects are not followed, so they cannot
+        point the request somewhere the check would refuse.
+
+        Returns:
+            True if the attempt failed in a way worth retrying (connection error, 429, 5xx)
+
+        Raises:
+            CallbackURLError: The URL is refused
+        """
+        self.check_callback(job["callback_url"])
+        body = {key: job[key] for key in ("id", "status", "filename", "result", "error")}
+        try:
+            response = requests.post(job["callback_url"], json=body, timeout=10, allow_redirects=False)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Callback for job {job['id']} to {job['callback_url']} failed: {str(e)}")
+            return True
+        if response.status_code == 429 or response.status_code >= 500:
+            logger.warning(f"Callback for job {job['id']} to {job['callback_url']} returned HTTP {response.status_code}")
+            return True
+        if response.status_code >= 300:
+            logger.warning(f"Callback for job {job['id']} to {job['callback_url']} returned HTTP {response.status_code}, not retrying")
+        return False
@@ -1,54 +1,78 @@
 import base64
+import json
 import os
-from huggingface_hub import InferenceClient
 import asyncio
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 import logging
+from pydantic import ValidationError
+from models import ParsedAnalysis
+from inference_router import DeadlineExceeded, InferenceRouter
+from metrics import ERRORS, FAST_PATH, PARSE_OUTCOMES, observe
+from ocr_fast_path import LabTableExtractor
 
 logger = logging.getLogger(__name__)
 
 class LabReportAnalyzer:
     """Lab Report Analysis service using Hugging Face Inference Client"""
     
-    def __init__(self):
-        """Initialize the analyzer with Hugging Face client"""
-        self.client = InferenceClient(
-            provider="nebius",
-            api_key=os.getenv("HUGGINGFACE_API_KEY", "your-api-key-here"),
-        )
-        self.model = "google/gemma-3-27b-it"
-        
-    async def analyze_report(self, image_b64: str) -> Dict[str, Any]:
+    def __init__(self, router: Optional[InferenceRouter] = None):
+        """
+        Initialize the analyzer
+        
+        Args:
+            router: Provider routing layer; built from LAB_PROVIDERS when omitted
+        """
+        self.router = router or InferenceRouter.from_env()
+        # Time budget for one analysis when the caller does not pass a deadline
+        self.default_timeout = float(os.getenv("LAB_REQUEST_TIMEOUT", "60"))
+        # Local OCR path for clean tabular reports; None when disabled or unavailable
+        self.fast_path = LabTableExtractor.from_env()
+        # "json" asks the model for a ParsedAnalysis object, "text" for the line-based format
+        self.output_mode = os.getenv("LAB_OUTPUT_MODE", "json").lower()
+        self.parse_stats = ParseStats()
+        
+    async def analyze_report(self, image_b64: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Analyze a lab report image and return structured results
         
         Args:
             image_b64: Base64 encoded image string
+            deadline: Absolute time.monotonic() by which the analysis must finish
             
         Returns:
             Dictionary containing structured analysis results
         """
         try:
-            prompt = self._get_analysis_prompt()
+            # Well-formatted tables can be read locally without calling the remote model
+            fast_result = await self._try_fast_path(image_b64)
+            if fast_result is not None:
+                return fast_result
+            
+            structured = self.output_mode == "json"
+            prompt = self._get_structured_prompt() if structured else self._get_analysis_prompt()
+            if deadline is None:
+                deadline = time.monotonic() + self.default_timeout
             
-            # Run the inference in a thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            completion = await loop.run_in_executor(
-                None, 
-                self._run_inference, 
-                image_b64, 
-                prompt
-            )
+            # The router runs the blocking client in a thread pool and handles failover
+            with observe("remote_inference"):
+                completion = await self.router.complete(self._build_messages(image_b64, prompt), deadline=deadline)
             
             # Extract and parse the response
             analysis_text = completion.choices[0].message.content.strip()
             
+            if structured:
+                return await self._parse_structured_with_repair(analysis_text, deadline)
+            
             # Parse the structured response
-            parsed_result = self._parse_analysis_result(analysis_text)
+            with observe("parse"):
+                parsed_result = self._parse_analysis_result(analysis_text)
             
             return parsed_result
             
         except Exception as e:
+            ERRORS.labels("analysis").inc()
             logger.error(f"Error in analyze_report: {str(e)}")
             return {
                 "error": True,
@@ -56,25 +80,200 @@ class LabReportAnalyzer:
                 "raw_response": ""
             }
     
-    def _run_inference(self, image_b64: str, prompt: str):
-        """Run the Hugging Face inference synchronously"""
-        return self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_b64}"
-                            }
+    async def stream_report(self, image_b64: str, deadline: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze a lab report image, yielding output as the model generates it
+        
+        Args:
+            image_b64: Base64 encoded image string
+            deadline: Absolute time.monotonic() by which the analysis must finish
+            
+        Yields:
+            {"type": "token", "text": ...} for every generated chunk,
+            {"type": "section", ...} whenever a parsed section changes, and
+            finally {"type": "result", "analysis": ...} with the full parsed result,
+            or {"type": "error", ...} if the deadline passes first
+        """
+        fast_result = await self._try_fast_path(image_b64)
+        if fast_result is not None:
+            yield {"type": "result", "analysis": fast_result}
+            return
+        
+        if deadline is None:
+            deadline = time.monotonic() + self.default_timeout
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+        prompt = self._get_analysis_prompt()
+        
+        def produce():
+            # Iterate the blocking stream in a worker thread and hand chunks to the loop
+            try:
+                stream = self.router.open_stream(self._build_messages(image_b64, prompt), deadline=deadline)
+                for chunk in stream:
+                    if cancelled.is_set():
+                        break
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        producer = loop.run_in_executor(None, produce)
+        parser = IncrementalAnalysisParser()
+        expired = False
+        
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    item = DeadlineExceeded("Request deadline exceeded while streaming")
+                if isinstance(item, DeadlineExceeded):
+                    expired = True
+                    ERRORS.labels("stream").inc()
+                    logger.warning(f"Streaming analysis stopped: {str(item)}")
+                    yield {"type": "error", "message": str(item), "raw_response": parser.raw_response}
+                    return
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    ERRORS.labels("stream").inc()
+                    logger.error(f"Error in stream_report: {str(item)}")
+                    yield {
+                        "type": "result",
+                        "analysis": {
+                            "error": True,
+                            "message": f"Analysis failed: {str(item)}",
+                            "raw_response": parser.raw_response
                         }
-                    ]
-                }
-            ],
-        )
+                    }
+                    return
+                
+                yield {"type": "token", "text": item}
+                for update in parser.feed(item):
+                    yield {"type": "section", **update}
+            
+            for update in parser.close():
+                yield {"type": "section", **update}
+            yield {"type": "result", "analysis": parser.build_result()}
+        finally:
+            cancelled.set()
+            # Past the deadline the worker may still be blocked on the provider; it
+            # stops at its next chunk, or when the client's request timeout fires
+            if not expired:
+                await producer
+    
+    async def _parse_structured_with_repair(self, analysis_text: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Validate a JSON response, asking the model once to repair it if needed
+        
+        Falls back to the line-based parser when the repaired response is still invalid.
+        """
+        if "The image text is unclear" in analysis_text:
+            self.parse_stats.record("unreadable")
+            return self._parse_analysis_result(analysis_text)
+        
+        try:
+            with observe("parse"):
+                result = self._parse_structured_result(analysis_text)
+            self.parse_stats.record("parsed")
+            return result
+        except ValueError as e:
+            first_error = str(e)
+        
+        logger.warning(f"Structured response invalid, attempting repair: {first_error}")
+        try:
+            with observe("repair_inference"):
+                completion = await self.router.complete(self._repair_messages(analysis_text, first_error), deadline=deadline)
+            repaired_text = completion.choices[0].message.content.strip()
+            result = self._parse_structured_result(repaired_text)
+            self.parse_stats.record("repaired")
+            return result
+        except Exception as e:
+            logger.error(f"Structured response repair failed: {str(e)}")
+        
+        self.parse_stats.record("failed")
+        return self._parse_analysis_result(analysis_text)
+    
+    def _parse_structured_result(self, analysis_text: str) -> Dict[str, Any]:
+        """
+        Parse and validate a JSON response against ParsedAnalysis
+        
+        Args:
+            analysis_text: Raw analysis text from the model
+            
+        Returns:
+            Structured dictionary with parsed components
+            
+        Raises:
+            ValueError: If no JSON object is found or it does not match the schema
+        """
+        # Models often wrap JSON in prose or ```json fences; take the outermost object
+        start_idx = analysis_text.find('{')
+        end_idx = analysis_text.rfind('}') + 1
+        if start_idx == -1 or end_idx == 0:
+            raise ValueError("No JSON object found in response")
+        
+        try:
+            data = json.loads(analysis_text[start_idx:end_idx])
+            parsed = ParsedAnalysis.model_validate(data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        except ValidationError as e:
+            raise ValueError(f"Response does not match schema: {str(e)}")
+        
+        result = parsed.model_dump(exclude={"message"})
+        result["error"] = False
+        result["raw_response"] = analysis_text
+        return result
+    
+    def _repair_messages(self, analysis_text: str, error: str) -> List[Dict[str, Any]]:
+        """Messages asking the model to turn an invalid response into valid JSON (text only, no image)"""
+        return [
+            {
+                "role": "user",
+                "content": (
+                    "The following response should be a single JSON object matching this schema:\n"
+                    f"{self._structured_schema()}\n\n"
+                    f"Validation error: {error}\n\n"
+                    f"Response:\n{analysis_text}\n\n"
+                    "Reply with only the corrected JSON object, keeping the same content."
+                )
+            }
+        ]
+    
+    async def _try_fast_path(self, image_b64: str) -> Optional[Dict[str, Any]]:
+        """Run the local OCR fast path; None means the remote model is needed"""
+        if self.fast_path is None:
+            return None
+        loop = asyncio.get_running_loop()
+        with observe("ocr_fast_path"):
+            result = await loop.run_in_executor(None, self.fast_path.analyze, image_b64)
+        FAST_PATH.labels("hit" if result is not None else "miss").inc()
+        return result
+    
+    def _build_messages(self, image_b64: str, prompt: str) -> List[Dict[str, Any]]:
+        """Build the chat messages carrying the prompt and the image"""
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_b64}"
+                        }
+                    }
+                ]
+            }
+        ]
     
     def _get_analysis_prompt(self) -> str:
         """Get the structured analysis prompt"""
@@ -103,6 +302,48 @@ Note: (One line disclaimer that it's not medical advice)
 Keep it short, clear, and professional — like a medical summary written for quick review.
 """
     
+    def _get_structured_prompt(self) -> str:
+        """Get the prompt asking for a JSON ParsedAnalysis object"""
+        return f"""
+You are a medical analysis assistant.
+
+Analyze the following lab report image:
+
+1. Extract every result with its unit and normal range if available.
+2. Flag each value as "low", "high" or "normal" against its range ("abnormal" for
+   out-of-range non-numeric results, "unknown" if no range is printed).
+3. Explain what the results suggest in simple terms.
+4. Provide an overall summary of health findings.
+
+If the image is unreadable, respond: "The image text is unclear."
+
+Otherwise respond with ONLY a JSON object, no other text, matching this schema:
+{self._structured_schema()}
+
+- summary: 2–3 sentences explaining what the report shows
+- key_findings: 3–5 short strings with the main abnormal or notable values
+- analytes: one entry per result in the report
+- interpretation: 1–2 sentences explaining what the findings suggest
+- note: "This analysis is for educational purposes only and should not replace professional medical advice."
+"""
+    
+    @staticmethod
+    def _structured_schema() -> str:
+        """Compact description of the JSON the model must return"""
+        return json.dumps({
+            "summary": "string",
+            "key_findings": ["string"],
+            "analytes": [{
+                "name": "string",
+                "value": "number or string",
+                "unit": "string",
+                "reference_range": "string",
+                "flag": "low | high | normal | abnormal | unknown"
+            }],
+            "interpretation": "string",
+            "note": "string"
+        }, indent=2)
+    
     def _parse_analysis_result(self, analysis_text: str) -> Dict[str, Any]:
         """
         Parse the structured analysis result into a dictionary
@@ -114,53 +355,10 @@ Keep it short, clear, and professional — like a medical summary written for qu
             Structured dictionary with parsed components
         """
         try:
-            result = {
-                "error": False,
-                "summary": "",
-                "key_findings": [],
-                "interpretation": "",
-                "note": "",
-                "raw_response": analysis_text
-            }
-            
-            # Check if image is unreadable
-            if "The image text is unclear" in analysis_text:
-                result["error"] = True
-                result["message"] = "The image text is unclear or unreadable"
-                return result
-            
-            lines = analysis_text.split('\n')
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Identify sections
-                if line.startswith('Summary:'):
-                    current_section = 'summary'
-                    result['summary'] = line.replace('Summary:', '').strip()
-                elif line.startswith('Key Findings:'):
-                    current_section = 'key_findings'
-                elif line.startswith('Interpretation:'):
-                    current_section = 'interpretation'
-                    result['interpretation'] = line.replace('Interpretation:', '').strip()
-                elif line.startswith('Note:'):
-                    current_section = 'note'
-                    result['note'] = line.replace('Note:', '').strip()
-                else:
-                    # Continue previous section
-                    if current_section == 'summary' and not result['summary']:
-                        result['summary'] = line
-                    elif current_section == 'key_findings' and line.startswith(('•', '-', '*')):
-                        result['key_findings'].append(line.lstrip('•-* '))
-                    elif current_section == 'interpretation' and not result['interpretation']:
-                        result['interpretation'] = line
-                    elif current_section == 'note' and not result['note']:
-                        result['note'] = line
-            
-            return result
+            parser = IncrementalAnalysisParser()
+            parser.feed(analysis_text)
+            parser.close()
+            return parser.build_result()
             
         except Exception as e:
             logger.error(f"Error parsing analysis result: {str(e)}")
@@ -168,4 +366,136 @@ Keep it short, clear, and professional — like a medical summary written for qu
                 "error": True,
                 "message": f"Failed to parse analysis: {str(e)}",
                 "raw_response": analysis_text
-            }
\ No newline at end of file
+            }
+
+
+class IncrementalAnalysisParser:
+    """
+    Line-based parser for the Summary / Key Findings / Interpretation / Note
+    response format that can be fed text as it streams in
+    """
+    
+    def __init__(self):
+        self.result = {
+            "error": False,
+            "summary": "",
+            "key_findings": [],
+            "interpretation": "",
+            "note": "",
+            "raw_response": ""
+        }
+        self._chunks: List[str] = []
+        self._buffer = ""
+        self._current_section: Optional[str] = None
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a piece of model output
+        
+        Args:
+            chunk: Next piece of text; may end in the middle of a line
+            
+        Returns:
+            Section updates produced by the lines completed by this chunk
+        """
+        self._chunks.append(chunk)
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        return [update for update in map(self._parse_line, lines) if update]
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """Parse the trailing partial line once the output is complete"""
+        line, self._buffer = self._buffer, ""
+        update = self._parse_line(line)
+        return [update] if update else []
+    
+    @property
+    def raw_response(self) -> str:
+        """All text fed so far"""
+        return "".join(self._chunks)
+    
+    def build_result(self) -> Dict[str, Any]:
+        """Return the parsed result for all text fed so far"""
+        raw_response = self.raw_response
+        
+        # Check if image is unreadable
+        if "The image text is unclear" in raw_response:
+            return {
+                "error": True,
+                "summary": "",
+                "key_findings": [],
+                "interpretation": "",
+                "note": "",
+                "raw_response": raw_response,
+                "message": "The image text is unclear or unreadable"
+            }
+        
+        return {**self.result, "key_findings": list(self.result["key_findings"]), "raw_response": raw_response}
+    
+    def _parse_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Apply one line to the result and describe what changed, if anything"""
+        line = line.strip()
+        if not line:
+            return None
+        
+        result = self.result
+        
+        # Identify sections
+        if line.startswith('Summary:'):
+            self._current_section = 'summary'
+            result['summary'] = line.replace('Summary:', '').strip()
+            return self._field_update('summary')
+        elif line.startswith('Key Findings:'):
+            self._current_section = 'key_findings'
+        elif line.startswith('Interpretation:'):
+            self._current_section = 'interpretation'
+            result['interpretation'] = line.replace('Interpretation:', '').strip()
+            return self._field_update('interpretation')
+        elif line.startswith('Note:'):
+            self._current_section = 'note'
+            result['note'] = line.replace('Note:', '').strip()
+            return self._field_update('note')
+        else:
+            # Continue previous section
+            section = self._current_section
+            if section == 'key_findings' and line.startswith(('•', '-', '*')):
+                finding = line.lstrip('•-* ')
+                result['key_findings'].append(finding)
+                return {"section": "key_findings", "item": finding}
+            elif section in ('summary', 'interpretation', 'note'):
+                # Wrapped text belongs to the current section until the next header
+                result[section] = f"{result[section]} {line}".lstrip()
+                return self._field_update(section)
+        return None
+    
+    def _field_update(self, section: str) -> Optional[Dict[str, Any]]:
+        value = self.result[section]
+        return {"section": section, "value": value} if value else None
+
+
+class ParseStats:
+    """Thread-safe counters for structured response parsing outcomes"""
+    
+    OUTCOMES = ("parsed", "repaired", "failed", "unreadable")
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {outcome: 0 for outcome in self.OUTCOMES}
+    
+    def record(self, outcome: str):
+        PARSE_OUTCOMES.labels(outcome).inc()
+        with self._lock:
+            self.counts[outcome] += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Counts plus first-pass and final parse failure rates"""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        first_pass_failures = counts["repaired"] + counts["failed"]
+        return {
+            "total": total,
+            **counts,
+            "first_pass_failure_rate": round(first_pass_failures / total, 4) if total else 0.0,
+            "failure_rate": round(counts["failed"] / total, 4) if total else 0.0,
+        }
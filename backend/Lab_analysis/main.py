@@ -1,12 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, File, Form, Header, Request, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from typing import Any, Dict, List, Optional
+import asyncio
 import base64
 import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
 from PIL import Image
 from lab_analyzer import LabReportAnalyzer
+from job_queue import CallbackURLError, JobQueue, JobStore
+from document_ingest import DocumentError, load_document_pages, merge_page_results
+from rate_limit import AdmissionController, AdmissionMiddleware
+from metrics import HTTP_LATENCY, IN_FLIGHT, JOB_QUEUE_DEPTH, WARMUP_SECONDS, observe, render_metrics
+from readiness import check_provider, warmup_image_b64
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+# Middleware shared with the other backend services
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from service_common.http_metrics import MetricsMiddleware  # noqa: E402
+from service_common.profiling import ProfilingMiddleware  # noqa: E402
+from service_common.readiness import ReadinessGate  # noqa: E402
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +40,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-client rate limiting and in-flight caps for analysis requests.
+# Added before CORS so that rejections still carry CORS headers.
+admission = AdmissionController.from_env()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+IN_FLIGHT.set_function(lambda: admission.in_flight)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -27,9 +55,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histogram; wraps admission and CORS so rejected requests are counted too
+app.add_middleware(MetricsMiddleware, histogram=HTTP_LATENCY)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); outermost to cover the whole request
+app.add_middleware(ProfilingMiddleware)
+
 # Initialize the lab analyzer
 analyzer = LabReportAnalyzer()
 
+# Background job queue for asynchronous analyses
+job_queue = JobQueue(
+    store=JobStore(os.getenv("LAB_JOB_DB", "lab_jobs.db")),
+    handler=analyzer.analyze_report,
+    workers=int(os.getenv("LAB_JOB_WORKERS", "4")),
+)
+JOB_QUEUE_DEPTH.set_function(lambda: job_queue.depth)
+
+# Upper bound on concurrent page analyses for a single document request
+DOCUMENT_MAX_CONCURRENCY = int(os.getenv("LAB_DOCUMENT_CONCURRENCY", "4"))
+
+# Largest accepted uploads; bigger bodies are refused with 413 before they are fully read
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("LAB_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_DOCUMENT_UPLOAD_BYTES = int(os.getenv("LAB_DOCUMENT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# How often a non-streaming document request checks whether its client is still there
+DISCONNECT_POLL_SECONDS = float(os.getenv("LAB_DISCONNECT_POLL_SECONDS", "1"))
+
+# Opens after warmup and a successful provider check; served by /ready
+readiness = ReadinessGate()
+
+async def warm_up():
+    """Warm the local OCR path, then wait until the inference provider answers"""
+    loop = asyncio.get_running_loop()
+    if analyzer.fast_path is not None:
+        image_b64 = warmup_image_b64()
+        await loop.run_in_executor(None, readiness.step, "ocr_fast_path", lambda: analyzer.fast_path.analyze(image_b64))
+    
+    url = os.getenv("LAB_READY_URL")
+    if url:
+        timeout = float(os.getenv("LAB_READY_TIMEOUT", "5"))
+        interval = float(os.getenv("LAB_READY_RETRY_INTERVAL", "5"))
+        started = time.perf_counter()
+        while True:
+            error = await check_provider(url, timeout, os.getenv("HUGGINGFACE_API_KEY"))
+            if error is None:
+                break
+            readiness.fail(error)
+            logger.warning(f"{error}; retrying in {interval:g} s")
+            await asyncio.sleep(interval)
+        readiness.warmup_seconds["provider_check"] = round(time.perf_counter() - started, 4)
+    
+    readiness.open()
+    for step, seconds in readiness.warmup_seconds.items():
+        WARMUP_SECONDS.labels(step).set(seconds)
+    logger.info(f"Ready after {readiness.warmup_seconds['total']:.2f} s warmup")
+
+@app.on_event("startup")
+async def startup_event():
+    """Size the inference thread pool and start the background job workers"""
+    executor_threads = int(os.getenv("LAB_EXECUTOR_THREADS", "64"))
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=executor_threads))
+    await job_queue.start()
+    logger.info(f"Started {job_queue.workers} lab analysis job workers")
+    # /ready stays 503 until warmup and the provider check have finished
+    app.state.warmup = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background job workers"""
+    app.state.warmup.cancel()
+    await job_queue.stop()
+    job_queue.store.close()
+
+def request_deadline(x_request_timeout: Optional[float] = Header(None)) -> Optional[float]:
+    """
+    Absolute deadline for the request's remote inference
+    
+    Clients (or a proxy) may send X-Request-Timeout in seconds to shorten the
+    budget; it is capped at LAB_REQUEST_TIMEOUT. Without the header each
+    analysis gets the default LAB_REQUEST_TIMEOUT budget.
+    """
+    if x_request_timeout is None or x_request_timeout <= 0:
+        return None
+    return time.monotonic() + min(analyzer.default_timeout, x_request_timeout)
+
+async def _read_upload(file: UploadFile, limit: int) -> bytes:
+    """
+    Read an uploaded file, refusing it with 413 as soon as it exceeds `limit` bytes
+
+    Args:
+        file: Uploaded file
+        limit: Largest accepted size in bytes
+
+    Returns:
+        Raw file bytes
+    """
+    too_large = HTTPException(status_code=413, detail=f"File too large, the limit is {limit} bytes")
+    if file.size is not None and file.size > limit:
+        raise too_large
+    chunks, total = [], 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def _read_image_upload(file: UploadFile) -> bytes:
+    """
+    Read an uploaded file and make sure it is a non-empty, valid image
+
+    Args:
+        file: Uploaded image file
+
+    Returns:
+        Raw image bytes
+    """
+    # Validate file type
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=400, 
+            detail="File must be an image (jpg, jpeg, png, bmp, tiff, webp)"
+        )
+    
+    # Read and validate image
+    with observe("upload_read"):
+        contents = await _read_upload(file, MAX_IMAGE_UPLOAD_BYTES)
+    if len(contents) == 0:
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    
+    # Validate image can be opened
+    try:
+        with observe("image_validation"):
+            image = Image.open(io.BytesIO(contents))
+            image.verify()  # Verify it's a valid image
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+    
+    return contents
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -40,8 +212,41 @@ async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "lab-report-analyzer"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once warmed up and the provider is reachable, 503 before"""
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content={
+            "status": "ready" if readiness.ready else "not_ready",
+            "service": "lab-report-analyzer",
+            **readiness.status()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats/providers")
+async def provider_stats():
+    """Circuit breaker state of each inference provider, in priority order"""
+    return {"providers": analyzer.router.status()}
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Requests in flight and rejections from rate limiting and admission control"""
+    return admission.stats()
+
+@app.get("/stats/parsing")
+async def parsing_stats():
+    """Structured response parse outcomes and failure rates since startup"""
+    return {"output_mode": analyzer.output_mode, **analyzer.parse_stats.snapshot()}
+
 @app.post("/analyze")
-async def analyze_lab_report(file: UploadFile = File(...)):
+async def analyze_lab_report(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline)):
     """
     Analyze a lab report image and return structured results
     
@@ -52,31 +257,15 @@ async def analyze_lab_report(file: UploadFile = File(...)):
         JSON response with analysis results
     """
     try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=400, 
-                detail="File must be an image (jpg, jpeg, png, bmp, tiff, webp)"
-            )
-        
-        # Read and validate image
-        contents = await file.read()
-        if len(contents) == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-        
-        # Validate image can be opened
-        try:
-            image = Image.open(io.BytesIO(contents))
-            image.verify()  # Verify it's a valid image
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+        contents = await _read_image_upload(file)
         
         # Convert to base64 for analysis
-        image_b64 = base64.b64encode(contents).decode("utf-8")
+        with observe("base64_encode"):
+            image_b64 = base64.b64encode(contents).decode("utf-8")
         
         # Analyze the lab report
         logger.info(f"Analyzing lab report: {file.filename}")
-        analysis_result = await analyzer.analyze_report(image_b64)
+        analysis_result = await analyzer.analyze_report(image_b64, deadline)
         
         return JSONResponse(
             status_code=200,
@@ -94,7 +283,7 @@ async def analyze_lab_report(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.post("/analyze-base64")
-async def analyze_lab_report_base64(data: dict):
+async def analyze_lab_report_base64(data: dict, deadline: Optional[float] = Depends(request_deadline)):
     """
     Analyze a lab report from base64 encoded image
     
@@ -116,15 +305,17 @@ async def analyze_lab_report_base64(data: dict):
         
         # Validate base64 and image
         try:
-            image_bytes = base64.b64decode(image_b64)
-            image = Image.open(io.BytesIO(image_bytes))
-            image.verify()
+            with observe("base64_decode"):
+                image_bytes = base64.b64decode(image_b64)
+            with observe("image_validation"):
+                image = Image.open(io.BytesIO(image_bytes))
+                image.verify()
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid base64 image: {str(e)}")
         
         # Analyze the lab report
         logger.info("Analyzing lab report from base64 data")
-        analysis_result = await analyzer.analyze_report(image_b64)
+        analysis_result = await analyzer.analyze_report(image_b64, deadline)
         
         return JSONResponse(
             status_code=200,
@@ -140,16 +331,237 @@ async def analyze_lab_report_base64(data: dict):
         logger.error(f"Error analyzing base64 lab report: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/jobs", status_code=202)
+async def create_analysis_job(file: UploadFile = File(...), callback_url: Optional[str] = Form(None)):
+    """
+    Queue a lab report image for asynchronous analysis
+    
+    Args:
+        file: Uploaded image file (jpg, jpeg, png, bmp, tiff, webp)
+        callback_url: Optional URL that receives the finished job as a JSON POST
+    
+    Returns:
+        JSON response with the job id to poll at /jobs/{job_id}
+    """
+    if callback_url:
+        try:
+            await asyncio.to_thread(job_queue.check_callback, callback_url)
+        except CallbackURLError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid callback_url: {str(e)}")
+    
+    contents = await _read_image_upload(file)
+    with observe("base64_encode"):
+        image_b64 = base64.b64encode(contents).decode("utf-8")
+    
+    try:
+        job_id = await job_queue.submit(image_b64, file.filename, callback_url)
+    except CallbackURLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid callback_url: {str(e)}")
+    logger.info(f"Queued lab analysis job {job_id}: {file.filename}")
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}"
+        }
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Get the status of an analysis job, including its result once finished
+    
+    Args:
+        job_id: Id returned by POST /jobs
+    
+    Returns:
+        JSON response with job status and, when finished, the analysis
+    """
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "analysis": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+
+@app.post("/analyze/stream")
+async def analyze_lab_report_stream(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline)):
+    """
+    Analyze a lab report image, streaming the output as server-sent events
+    
+    Emits "token" events with generated text, "section" events whenever a
+    parsed section (summary, key finding, interpretation, note) becomes
+    available, and a final "result" event with the full analysis. If the
+    request deadline passes first, the stream ends with an "error" event.
+    
+    Args:
+        file: Uploaded image file (jpg, jpeg, png, bmp, tiff, webp)
+    
+    Returns:
+        text/event-stream response
+    """
+    contents = await _read_image_upload(file)
+    with observe("base64_encode"):
+        image_b64 = base64.b64encode(contents).decode("utf-8")
+    logger.info(f"Streaming lab report analysis: {file.filename}")
+    
+    async def event_stream():
+        async for event in analyzer.stream_report(image_b64, deadline):
+            event_type = event.pop("type")
+            if event_type == "result":
+                event = {"success": not event["analysis"].get("error"), "filename": file.filename, **event}
+            yield _sse_event(event_type, event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _gather_while_connected(request: Request, tasks: List[asyncio.Task]) -> List[Any]:
+    """
+    Results of `tasks`, in order
+
+    The tasks are cancelled if one fails, the request is cancelled, or the client
+    disconnects (checked every DISCONNECT_POLL_SECONDS), so an abandoned request
+    stops spending OCR and provider calls on its remaining pages.
+    """
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=DISCONNECT_POLL_SECONDS, return_when=asyncio.FIRST_EXCEPTION
+            )
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            if pending and await request.is_disconnected():
+                logger.info("Client disconnected; cancelling remaining document pages")
+                raise HTTPException(status_code=499, detail="Client closed request")
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/analyze-document")
+async def analyze_lab_document(
+    request: Request,
+    file: UploadFile = File(...),
+    stream: bool = False,
+    max_concurrency: int = DOCUMENT_MAX_CONCURRENCY,
+    deadline: Optional[float] = Depends(request_deadline)
+):
+    """
+    Analyze a multi-page lab report (PDF or zip of page scans)
+    
+    Pages are rasterized locally and analyzed concurrently, then merged into
+    one structured report.
+    
+    Args:
+        request: Incoming request, checked for client disconnects
+        file: Uploaded PDF or zip file
+        stream: Stream per-page progress as server-sent events
+        max_concurrency: Pages analyzed at once, capped at LAB_DOCUMENT_CONCURRENCY
+    
+    Returns:
+        JSON response with the merged analysis, or an event stream when stream=true
+    """
+    contents = await _read_upload(file, MAX_DOCUMENT_UPLOAD_BYTES)
+    if len(contents) == 0:
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    
+    try:
+        pages = await asyncio.to_thread(load_document_pages, contents)
+    except DocumentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Analyzing {len(pages)}-page lab document: {file.filename}")
+    semaphore = asyncio.Semaphore(max(1, min(max_concurrency, DOCUMENT_MAX_CONCURRENCY)))
+    
+    async def analyze_page(index: int, name: str, page_bytes: bytes):
+        async with semaphore:
+            image_b64 = base64.b64encode(page_bytes).decode("utf-8")
+            return index, name, await analyzer.analyze_report(image_b64, deadline)
+    
+    tasks = [
+        asyncio.create_task(analyze_page(index, name, page_bytes))
+        for index, (name, page_bytes) in enumerate(pages)
+    ]
+    
+    if not stream:
+        results = await _gather_while_connected(request, tasks)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "filename": file.filename,
+                "analysis": merge_page_results([(name, result) for _, name, result in results])
+            }
+        )
+    
+    async def event_stream():
+        results = [None] * len(tasks)
+        try:
+            yield _sse_event("start", {"filename": file.filename, "total_pages": len(tasks)})
+            for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+                index, name, result = await task
+                results[index] = (name, result)
+                yield _sse_event("page", {
+                    "page": name,
+                    "completed": completed,
+                    "total_pages": len(tasks),
+                    "analysis": result
+                })
+            yield _sse_event("result", {
+                "success": True,
+                "filename": file.filename,
+                "analysis": merge_page_results(results)
+            })
+        finally:
+            # Client went away: don't keep burning remote inference on its pages
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # Flutter-friendly endpoint aliases
 @app.post("/api/analyze-lab")
-async def analyze_lab_api(file: UploadFile = File(...)):
+async def analyze_lab_api(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline)):
     """Flutter-friendly endpoint for lab analysis"""
-    return await analyze_lab_report(file)
+    return await analyze_lab_report(file, deadline)
+
+@app.post("/api/analyze-lab/stream")
+async def analyze_lab_stream_api(file: UploadFile = File(...), deadline: Optional[float] = Depends(request_deadline)):
+    """Flutter-friendly endpoint for streaming lab analysis"""
+    return await analyze_lab_report_stream(file, deadline)
 
 @app.post("/api/analyze-lab-base64")
-async def analyze_lab_base64_api(data: dict):
+async def analyze_lab_base64_api(data: dict, deadline: Optional[float] = Depends(request_deadline)):
     """Flutter-friendly endpoint for base64 lab analysis"""
-    return await analyze_lab_report_base64(data)
+    return await analyze_lab_report_base64(data, deadline)
+
+@app.post("/api/analyze-lab-document")
+async def analyze_lab_document_api(
+    request: Request,
+    file: UploadFile = File(...),
+    stream: bool = False,
+    max_concurrency: int = DOCUMENT_MAX_CONCURRENCY,
+    deadline: Optional[float] = Depends(request_deadline)
+):
+    """Flutter-friendly endpoint for multi-page lab analysis"""
+    return await analyze_lab_document(request, file, stream, max_concurrency, deadline)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,61 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Remote inference dominates at 5-30 s; local stages are sub-millisecond to tens of ms
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_LATENCY = Histogram(
+    "lab_stage_seconds",
+    "Latency of each lab analysis stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HTTP_LATENCY = Histogram(
+    "lab_http_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+ERRORS = Counter(
+    "lab_errors_total",
+    "Errors by stage",
+    ["stage"],
+)
+PROVIDER_ATTEMPTS = Counter(
+    "lab_provider_attempts_total",
+    "Remote inference attempts by provider and outcome",
+    ["provider", "outcome"],
+)
+PARSE_OUTCOMES = Counter(
+    "lab_parse_outcomes_total",
+    "Structured response parse outcomes",
+    ["outcome"],
+)
+FAST_PATH = Counter(
+    "lab_ocr_fast_path_total",
+    "OCR fast path results (hit = answered locally, miss = fell back to the remote model)",
+    ["outcome"],
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "lab_job_queue_depth",
+    "Jobs waiting for a background worker",
+)
+IN_FLIGHT = Gauge(
+    "lab_requests_in_flight",
+    "Requests admitted and not yet finished",
+)
+
+WARMUP_SECONDS = Gauge(
+    "lab_warmup_seconds",
+    "Duration of each startup warmup step",
+    ["step"],
+)
+
+
+def observe(stage: str):
+    """Context manager timing one stage into lab_stage_seconds"""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def render_metrics():
+    """Return (body, content type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
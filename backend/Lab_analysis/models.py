@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import List, Literal, Optional, Any, Union
 
 class AnalysisRequest(BaseModel):
     """Request model for base64 image analysis"""
@@ -11,11 +11,22 @@ class AnalysisResponse(BaseModel):
     filename: Optional[str] = Field(None, description="Original filename if uploaded via file")
     analysis: dict = Field(..., description="Analysis results")
 
+class AnalyteResult(BaseModel):
+    """A single measured value from the lab report"""
+    name: str = Field(..., description="Analyte name, e.g. Hemoglobin")
+    value: Union[float, str] = Field(..., description="Measured value; text for non-numeric results")
+    unit: str = Field("", description="Unit of the measured value")
+    reference_range: str = Field("", description="Reference range as printed on the report")
+    flag: Literal["low", "high", "normal", "abnormal", "unknown"] = Field(
+        "unknown", description="Value compared against the reference range"
+    )
+
 class ParsedAnalysis(BaseModel):
     """Structured analysis result"""
     error: bool = Field(False, description="Whether an error occurred")
     summary: str = Field("", description="Summary of the lab report")
     key_findings: List[str] = Field(default_factory=list, description="Key findings from the report")
+    analytes: List[AnalyteResult] = Field(default_factory=list, description="Per-analyte results")
     interpretation: str = Field("", description="Medical interpretation")
     note: str = Field("", description="Disclaimer note")
     raw_response: str = Field("", description="Raw response from the AI model")
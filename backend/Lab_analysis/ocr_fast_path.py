@@ -0,0 +1,355 @@
+import base64
+import io
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+try:
+    import pytesseract
+except ImportError:  # pragma: no cover - optional dependency
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# Numbers as printed: "14", "9.1", "5,2" (decimal comma) or "250,000" / "1,250.5" (thousands separators)
+_NUMBER = r"(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:[.,]\d+)?)"
+_THOUSANDS = re.compile(r"^\d{1,3}(?:,\d{3})+(?:\.\d+)?$")
+_FLAG = r"(?:HH|LL|H|L|High|Low|HIGH|LOW|\*)"
+# The measured value: the first whitespace-separated token that is a number, optionally
+# qualified ("<5", "> 200") or with its flag attached ("14H")
+_VALUE_TOKEN = re.compile(rf"^(?P<qualifier>[<>≤≥]?)(?P<number>{_NUMBER})(?P<flag>{_FLAG})?$")
+_QUALIFIER_TOKEN = re.compile(r"^[<>≤≥]$")
+_FLAG_TOKEN = re.compile(rf"^{_FLAG}$")
+# Everything after the value: flag, unit, flag, reference range, flag - each optional except the range.
+# e.g. "L g/dL 13.5 - 17.5", "pg/mL 200-900", "g/dL 12-16 H", "H mg/dL < 130", "/µL (150,000-450,000)"
+TAIL_PATTERN = re.compile(
+    rf"^(?:(?P<flag_before_unit>{_FLAG})\s+)?"
+    rf"(?:(?P<unit>(?:[A-Za-z%µμ/]|10\^)[^\s()]*)\s+)?"
+    rf"(?:(?P<flag_after_unit>{_FLAG})\s+)?"
+    rf"\(?\s*(?:"
+    rf"(?P<low>{_NUMBER})\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER})"
+    rf"|(?P<lt>[<≤])\s*(?P<upper>{_NUMBER})"
+    rf"|(?P<gt>[>≥])\s*(?P<lower>{_NUMBER})"
+    rf")\s*\)?"
+    rf"(?:\s+(?P<flag_after_range>{_FLAG}))?$"
+)
+# A printed reference range somewhere after the value marks the line as a result row
+_RANGE_HINT = re.compile(rf"{_NUMBER}\s*(?:-|–|—|to)\s*{_NUMBER}|[<>≤≥]\s*{_NUMBER}")
+_HAS_DIGIT = re.compile(r"\d")
+_HAS_LETTER = re.compile(r"[A-Za-z]")
+
+PRINTED_FLAGS = {"H": "high", "HH": "high", "High": "high", "HIGH": "high", "L": "low", "LL": "low", "Low": "low", "LOW": "low"}
+
+DISCLAIMER = "This analysis is for educational purposes only and should not replace professional medical advice."
+
+
+class AmbiguousRow(ValueError):
+    """A line that looks like a result row but cannot be read with certainty"""
+
+
+def parse_number(text: str) -> float:
+    """Parse a printed number, treating "250,000" as thousands and "5,2" as a decimal comma"""
+    if _THOUSANDS.match(text):
+        return float(text.replace(",", ""))
+    return float(text.replace(",", "."))
+
+
+def possible_flags(value: float, qualifier: str, low: Optional[float], high: Optional[float]) -> Set[str]:
+    """
+    Flags consistent with a value against its reference range
+
+    An exact value has one flag; "<5" or ">200" only bounds the value, so it may be
+    consistent with several.
+    """
+    if not qualifier:
+        return {flag_value(value, low, high)}
+    if qualifier in "<≤":
+        # The true value lies anywhere at or below `value`
+        flags = set()
+        if low is not None and value <= low:
+            return {"low"}
+        # Measured quantities are not negative, so a range starting at 0 cannot be undercut
+        if low is not None and low > 0:
+            flags.add("low")
+        if high is None or value <= high:
+            flags.add("normal")
+        else:
+            flags.update({"normal", "high"})
+        return flags
+    flags = set()
+    if high is not None and value >= high:
+        return {"high"}
+    if high is not None:
+        flags.add("high")
+    if low is None or value >= low:
+        flags.add("normal")
+    else:
+        flags.update({"normal", "low"})
+    return flags
+
+
+def parse_row(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse one OCR line into an analyte row
+
+    The analyte name is everything before the first standalone number, which is the
+    measured value ("Vitamin B12 300 pg/mL 200-900" is B12 = 300). A printed H/L flag
+    is the lab's own call (it may use age- or sex-specific ranges) and is kept as is;
+    otherwise the flag comes from the printed range.
+
+    Args:
+        line: Text of a single table line
+
+    Returns:
+        Dict with name, value, qualifier, unit, reference_range, low, high and flag, or
+        None if the line is not a result row
+
+    Raises:
+        AmbiguousRow: The line has a name, a value and a reference range but some field
+            cannot be read with certainty (unparsed text, conflicting printed flags, a
+            reversed range, a qualified value the range cannot classify)
+    """
+    tokens = line.strip().split()
+    value_at = next((i for i, token in enumerate(tokens) if _VALUE_TOKEN.match(token)), None)
+    if value_at is None or value_at == 0:
+        return None
+
+    name_tokens = tokens[:value_at]
+    value_match = _VALUE_TOKEN.match(tokens[value_at])
+    qualifier = value_match.group("qualifier")
+    # "Glucose < 70 ..." - the qualifier printed as its own token
+    if not qualifier and _QUALIFIER_TOKEN.match(name_tokens[-1]):
+        qualifier = name_tokens.pop()
+    printed = []
+    # "Hemoglobin H 18.2 g/dL 12-16" - a flag printed between name and value
+    if len(name_tokens) > 1 and _FLAG_TOKEN.match(name_tokens[-1]):
+        printed.append(name_tokens.pop())
+    name = " ".join(name_tokens).rstrip(":").strip()
+    tail = " ".join(tokens[value_at + 1:])
+
+    if not _HAS_LETTER.search(name) or not _RANGE_HINT.search(tail):
+        return None
+
+    match = TAIL_PATTERN.match(tail)
+    if not match:
+        raise AmbiguousRow(f"Unreadable fields after the value: {line.strip()!r}")
+
+    try:
+        value = parse_number(value_match.group("number"))
+        if match.group("low") is not None:
+            low, high = parse_number(match.group("low")), parse_number(match.group("high"))
+            reference_range = f"{match.group('low')}-{match.group('high')}"
+        elif match.group("upper") is not None:
+            low, high = None, parse_number(match.group("upper"))
+            reference_range = f"< {match.group('upper')}"
+        else:
+            low, high = parse_number(match.group("lower")), None
+            reference_range = f"> {match.group('lower')}"
+    except ValueError:
+        raise AmbiguousRow(f"Unreadable number: {line.strip()!r}")
+
+    if low is not None and high is not None and low > high:
+        raise AmbiguousRow(f"Reference range is reversed: {line.strip()!r}")
+
+    printed += [value_match.group("flag")] if value_match.group("flag") else []
+    printed += [match.group(g) for g in ("flag_before_unit", "flag_after_unit", "flag_after_range") if match.group(g)]
+    printed_flags = {PRINTED_FLAGS[f] for f in printed if f in PRINTED_FLAGS}
+    if len(printed_flags) > 1:
+        raise AmbiguousRow(f"Conflicting printed flags: {line.strip()!r}")
+
+    candidates = possible_flags(value, qualifier, low, high)
+    if printed_flags:
+        flag = printed_flags.pop()
+    elif len(candidates) == 1:
+        flag = candidates.pop()
+        if printed and flag == "normal":
+            # "*" marks the value abnormal but the range says it is not
+            raise AmbiguousRow(f"Abnormal marker on an in-range value: {line.strip()!r}")
+    else:
+        raise AmbiguousRow(f"Qualified value {qualifier}{value:g} is not classified by the range: {line.strip()!r}")
+
+    return {
+        "name": name,
+        "value": value,
+        "qualifier": {"≤": "<", "≥": ">"}.get(qualifier, qualifier),
+        "unit": match.group("unit") or "",
+        "reference_range": reference_range,
+        "low": low,
+        "high": high,
+        "flag": flag,
+    }
+
+
+def flag_value(value: float, low: Optional[float], high: Optional[float]) -> str:
+    """Return "low", "high" or "normal" for a value against its reference range"""
+    if low is not None and value < low:
+        return "low"
+    if high is not None and value > high:
+        return "high"
+    return "normal"
+
+
+def parse_table_rows(lines: List[Tuple[str, float]]) -> Tuple[List[Dict[str, Any]], float, float, List[str]]:
+    """
+    Extract analyte rows from OCR lines
+
+    Args:
+        lines: List of (line text, mean OCR word confidence 0-100)
+
+    Returns:
+        (rows, mean OCR confidence of matched rows, fraction of numeric lines that
+        matched, lines that looked like rows but were ambiguous)
+    """
+    rows = []
+    confidences = []
+    ambiguous = []
+    numeric_lines = 0
+    for text, confidence in lines:
+        if not _HAS_DIGIT.search(text):
+            continue
+        numeric_lines += 1
+        try:
+            row = parse_row(text)
+        except AmbiguousRow:
+            ambiguous.append(text)
+            continue
+        if row is not None:
+            rows.append(row)
+            confidences.append(confidence)
+
+    mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    coverage = len(rows) / numeric_lines if numeric_lines else 0.0
+    return rows, mean_confidence, coverage, ambiguous
+
+
+def format_finding(row: Dict[str, Any]) -> str:
+    unit = f" {row['unit']}" if row["unit"] else ""
+    text = f"{row['name']}: {row['qualifier']}{row['value']:g}{unit} (reference {row['reference_range']})"
+    if row["flag"] != "normal":
+        text += f" - {row['flag'].upper()}"
+    return text
+
+
+def build_analysis(rows: List[Dict[str, Any]], confidence: float) -> Dict[str, Any]:
+    """Turn extracted rows into the same structure as a parsed model response"""
+    abnormal = [row for row in rows if row["flag"] != "normal"]
+    # Abnormal values first, then the rest in report order
+    findings = [format_finding(row) for row in abnormal + [row for row in rows if row["flag"] == "normal"]]
+
+    if abnormal:
+        names = ", ".join(f"{row['name']} ({row['flag']})" for row in abnormal)
+        verb = "falls" if len(abnormal) == 1 else "fall"
+        summary = f"The report lists {len(rows)} measured values; {len(abnormal)} {verb} outside the reference range: {names}."
+        interpretation = "Values outside their reference ranges should be reviewed with a healthcare provider in the context of symptoms and history."
+    else:
+        summary = f"The report lists {len(rows)} measured values, all within their reference ranges."
+        interpretation = "No values outside the printed reference ranges were found."
+
+    return {
+        "error": False,
+        "summary": summary,
+        "key_findings": findings,
+        "interpretation": interpretation,
+        "note": DISCLAIMER,
+        "raw_response": "",
+        "source": "ocr",
+        "confidence": round(confidence, 3),
+        "analytes": [
+            {key: row[key] for key in ("name", "value", "qualifier", "unit", "reference_range", "flag")}
+            for row in rows
+        ],
+    }
+
+
+class LabTableExtractor:
+    """Local OCR + rule-based analysis for lab reports printed as clean tables"""
+
+    def __init__(self, min_confidence: float = 0.8, min_rows: int = 3, min_coverage: float = 0.6):
+        """
+        Args:
+            min_confidence: Minimum mean OCR confidence (0-1) of the extracted rows
+            min_rows: Minimum number of analyte rows for the layout to count as recognized
+            min_coverage: Minimum fraction of numeric lines that must parse as rows
+        """
+        self.min_confidence = min_confidence
+        self.min_rows = min_rows
+        self.min_coverage = min_coverage
+
+    @classmethod
+    def from_env(cls) -> Optional["LabTableExtractor"]:
+        """Build an extractor from LAB_OCR_* settings, or None when disabled or unavailable"""
+        if os.getenv("LAB_OCR_FAST_PATH", "1").lower() in ("0", "false", "no"):
+            return None
+        if pytesseract is None:
+            logger.info("pytesseract not installed, OCR fast path disabled")
+            return None
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception as e:
+            logger.info(f"Tesseract binary not available, OCR fast path disabled: {str(e)}")
+            return None
+        return cls(
+            min_confidence=float(os.getenv("LAB_OCR_MIN_CONFIDENCE", "0.8")),
+            min_rows=int(os.getenv("LAB_OCR_MIN_ROWS", "3")),
+            min_coverage=float(os.getenv("LAB_OCR_MIN_COVERAGE", "0.6")),
+        )
+
+    def analyze(self, image_b64: str) -> Optional[Dict[str, Any]]:
+        """
+        Try to analyze a report locally
+
+        Args:
+            image_b64: Base64 encoded image string
+
+        Returns:
+            Analysis dict, or None when the layout is unrecognized, a row is ambiguous
+            or OCR confidence is too low and the remote model should be used instead
+        """
+        try:
+            image = Image.open(io.BytesIO(base64.b64decode(image_b64)))
+            lines = self._ocr_lines(image)
+        except Exception as e:
+            logger.warning(f"OCR fast path failed, falling back to remote model: {str(e)}")
+            return None
+
+        rows, ocr_confidence, coverage, ambiguous = parse_table_rows(lines)
+        confidence = ocr_confidence / 100.0
+        if ambiguous:
+            # One misread value is worse than a slower answer: let the model read the whole report
+            logger.info(f"OCR fast path declined: {len(ambiguous)} ambiguous rows, e.g. {ambiguous[0]!r}")
+            return None
+        if len(rows) < self.min_rows or coverage < self.min_coverage or confidence < self.min_confidence:
+            logger.info(
+                f"OCR fast path declined: rows={len(rows)} coverage={coverage:.2f} confidence={confidence:.2f}"
+            )
+            return None
+
+        return build_analysis(rows, confidence)
+
+    @staticmethod
+    def _ocr_lines(image: Image.Image) -> List[Tuple[str, float]]:
+        """Run Tesseract and group recognized words into (line text, mean confidence)"""
+        image = ImageOps.grayscale(ImageOps.exif_transpose(image))
+        if image.width < 1000:
+            # Tesseract does much better on small scans when they are upscaled
+            scale = 1000 / image.width
+            image = image.resize((1000, int(image.height * scale)), Image.LANCZOS)
+
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, config="--psm 6")
+        grouped: Dict[Tuple[int, int, int], List[Tuple[int, str, float]]] = {}
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if not word.strip() or confidence < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            grouped.setdefault(key, []).append((data["left"][i], word, confidence))
+
+        lines = []
+        for key in sorted(grouped):
+            words = sorted(grouped[key])
+            text = " ".join(word for _, word, _ in words)
+            lines.append((text, sum(conf for _, _, conf in words) / len(words)))
+        return lines
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+# Result of an admission check: (admitted, HTTP status on rejection, Retry-After seconds, reason)
+Decision = Tuple[bool, int, int, str]
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Try to spend tokens
+
+        Returns:
+            (taken, seconds until enough tokens are available when not taken)
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class _ClientState:
+    __slots__ = ("bucket", "in_flight")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.in_flight = 0
+
+
+def _key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class AdmissionController:
+    """
+    Per-client and global token-bucket rate limiting plus per-client and global in-flight caps
+
+    Rate or per-client concurrency violations are answered with 429, a full server
+    (global bucket empty or too many requests in flight) with 503, both carrying
+    Retry-After. The global bucket bounds total load however many client ids a
+    caller spreads its requests over.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: float = 5.0,
+        client_max_in_flight: int = 4,
+        global_max_in_flight: int = 32,
+        max_clients: int = 10000,
+        global_rate: float = 20.0,
+        global_burst: float = 40.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.client_max_in_flight = client_max_in_flight
+        self.global_max_in_flight = global_max_in_flight
+        self.max_clients = max_clients
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.in_flight = 0
+        self.rejected: Dict[int, int] = {429: 0, 503: 0}
+        self._clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            rate=float(os.getenv("LAB_RATE_LIMIT_RPS", "1")),
+            burst=float(os.getenv("LAB_RATE_LIMIT_BURST", "5")),
+            client_max_in_flight=int(os.getenv("LAB_CLIENT_MAX_INFLIGHT", "4")),
+            global_max_in_flight=int(os.getenv("LAB_GLOBAL_MAX_INFLIGHT", "32")),
+            global_rate=float(os.getenv("LAB_GLOBAL_RATE_LIMIT_RPS", "20")),
+            global_burst=float(os.getenv("LAB_GLOBAL_RATE_LIMIT_BURST", "40")),
+        )
+
+    def acquire(self, client_id: str) -> Decision:
+        """Admit a request for `client_id`; on success the caller must call release()"""
+        with self._lock:
+            if self.in_flight >= self.global_max_in_flight:
+                self.rejected[503] += 1
+                return False, 503, 1, "Server is at capacity, retry shortly"
+
+            state = self._client(client_id)
+            if state.in_flight >= self.client_max_in_flight:
+                self.rejected[429] += 1
+                return False, 429, 1, "Too many concurrent requests for this client"
+
+            taken, wait = state.bucket.take()
+            if not taken:
+                self.rejected[429] += 1
+                return False, 429, max(1, math.ceil(wait)), "Rate limit exceeded"
+
+            taken, wait = self.global_bucket.take()
+            if not taken:
+                # Not the client's fault: give its token back
+                state.bucket.tokens += 1
+                self.rejected[503] += 1
+                return False, 503, max(1, math.ceil(wait)), "Server is at capacity, retry shortly"
+
+            state.in_flight += 1
+            self.in_flight += 1
+            return True, 200, 0, ""
+
+    def release(self, client_id: str):
+        with self._lock:
+            self.in_flight -= 1
+            state = self._clients.get(client_id)
+            if state is not None:
+                state.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "tracked_clients": len(self._clients),
+                "rejected_429": self.rejected[429],
+                "rejected_503": self.rejected[503],
+            }
+
+    def _client(self, client_id: str) -> _ClientState:
+        state = self._clients.get(client_id)
+        if state is None:
+            state = _ClientState(TokenBucket(self.rate, self.burst))
+            self._clients[client_id] = state
+            self._evict()
+        else:
+            self._clients.move_to_end(client_id)
+        return state
+
+    def _evict(self):
+        # Drop the least recently seen idle clients; their buckets would be full again anyway
+        while len(self._clients) > self.max_clients:
+            for client_id, state in self._clients.items():
+                if state.in_flight == 0:
+                    del self._clients[client_id]
+                    break
+            else:
+                return
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to POST requests
+
+    The slot is held until the response body has been fully sent, so streaming
+    responses count as in flight for their whole duration.
+
+    Clients get their own bucket per API key only for keys in the configured set
+    (LAB_API_KEYS); any other or missing key is keyed on the client IP, so sending
+    random keys does not buy fresh buckets.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        trust_forwarded: Optional[bool] = None,
+        api_keys: Optional[Iterable[str]] = None,
+    ):
+        self.app = app
+        self.controller = controller
+        if trust_forwarded is None:
+            trust_forwarded = os.getenv("LAB_TRUST_FORWARDED", "0").lower() in ("1", "true", "yes")
+        self.trust_forwarded = trust_forwarded
+        if api_keys is None:
+            api_keys = os.getenv("LAB_API_KEYS", "").split(",")
+        # Only digests are kept, and they double as the client id
+        self.api_key_digests: FrozenSet[str] = frozenset(_key_digest(k.strip()) for k in api_keys if k.strip())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        client_id = self._client_id(scope)
+        admitted, status, retry_after, reason = self.controller.acquire(client_id)
+        if not admitted:
+            body = json.dumps({"detail": reason}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(client_id)
+
+    def _client_id(self, scope) -> str:
+        """Configured API key if the client sent one, otherwise its IP address"""
+        headers = dict(scope.get("headers") or [])
+        api_key = headers.get(b"x-api-key")
+        if api_key and self.api_key_digests:
+            digest = _key_digest(api_key.decode("latin-1"))
+            if digest in self.api_key_digests:
+                return "key:" + digest[:16]
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
@@ -0,0 +1,38 @@
+"""Lab service warmup helpers; the gate itself is service_common.readiness.ReadinessGate"""
+import base64
+import io
+import logging
+from typing import Optional
+
+import httpx
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_image_b64() -> str:
+    """Small blank report-sized PNG for exercising the local OCR path"""
+    buffer = io.BytesIO()
+    Image.new("L", (400, 200), color=255).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+async def check_provider(url: str, timeout: float, api_key: Optional[str] = None) -> Optional[str]:
+    """
+    Check that the inference provider endpoint answers
+
+    Any HTTP response below 500 counts as reachable (a 401 or 404 still proves the
+    network path and TLS work); connection errors, timeouts and 5xx do not.
+
+    Returns:
+        None when reachable, otherwise the reason
+    """
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        return f"Provider check {url} failed: {type(e).__name__}: {str(e)}"
+    if response.status_code >= 500:
+        return f"Provider check {url} returned HTTP {response.status_code}"
+    return None
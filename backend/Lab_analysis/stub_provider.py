@@ -0,0 +1,206 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions provider
+
+Answers every request with a canned lab analysis after a configurable delay and
+fails a configurable fraction of calls, so the API can be load tested without
+spending on the real provider. Point the app at it with:
+
+    LAB_PROVIDERS='[{"base_url": "http://localhost:9000", "model": "stub"}]'
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STRUCTURED_ANSWER = {
+    "summary": "Complete blood count with mildly low hemoglobin; other values within reference ranges.",
+    "key_findings": ["Hemoglobin slightly below reference range"],
+    "interpretation": "Findings may indicate mild anemia. Correlate clinically.",
+    "note": "This analysis is for informational purposes only and is not a medical diagnosis.",
+    "analytes": [
+        {"name": "Hemoglobin", "value": 12.1, "unit": "g/dL", "reference_range": "13.5-17.5", "flag": "low"},
+        {"name": "WBC", "value": 6.4, "unit": "10^3/uL", "reference_range": "4.0-11.0", "flag": "normal"},
+        {"name": "Platelets", "value": 250, "unit": "10^3/uL", "reference_range": "150-400", "flag": "normal"},
+    ],
+}
+
+TEXT_ANSWER = (
+    "Summary: Complete blood count with mildly low hemoglobin; other values within reference ranges.\n"
+    "Key Findings:\n"
+    "- Hemoglobin slightly below reference range\n"
+    "Interpretation: Findings may indicate mild anemia. Correlate clinically.\n"
+    "Note: This analysis is for informational purposes only and is not a medical diagnosis.\n"
+)
+
+
+class StubBehavior:
+    """Latency and error distribution of the stub"""
+
+    def __init__(
+        self,
+        latency_median: float = 2.0,
+        latency_sigma: float = 0.4,
+        latency_max: float = 30.0,
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        hang_rate: float = 0.0,
+        hang_seconds: float = 120.0,
+        stream_chunks: int = 20,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            latency_median: Median response time in seconds (log-normal distribution)
+            latency_sigma: Log-normal shape; 0 gives a fixed latency
+            latency_max: Upper bound for a single response time
+            error_rate: Fraction of calls answered with an error status
+            error_statuses: Statuses to pick from for errors
+            hang_rate: Fraction of calls that stall for `hang_seconds` (client timeouts)
+            hang_seconds: How long a stalled call takes
+            stream_chunks: Number of chunks for streaming responses
+            seed: Random seed
+        """
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.latency_max = latency_max
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.stream_chunks = max(1, stream_chunks)
+        self.rng = random.Random(seed)
+
+    def latency(self) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_median
+        return min(self.latency_max, self.rng.lognormvariate(0, self.latency_sigma) * self.latency_median)
+
+    def outcome(self) -> str:
+        """"hang", an error status as a string, or "ok" """
+        roll = self.rng.random()
+        if roll < self.hang_rate:
+            return "hang"
+        if roll < self.hang_rate + self.error_rate:
+            return str(self.rng.choice(self.error_statuses))
+        return "ok"
+
+
+def create_app(behavior: StubBehavior) -> FastAPI:
+    app = FastAPI(title="Stub Chat Completions Provider")
+    stats: Counter = Counter()
+    state = {"in_flight": 0, "max_in_flight": 0, "started": time.time()}
+
+    def _answer_for(body: Dict[str, Any]) -> str:
+        # The structured prompt asks for JSON; anything else gets the line-based format
+        prompt = json.dumps(body.get("messages", []))
+        return json.dumps(STRUCTURED_ANSWER) if "JSON" in prompt else TEXT_ANSWER
+
+    def _completion(body: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": len(content.split())},
+        }
+
+    def _chunk(body: Dict[str, Any], completion_id: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    async def _stream(body: Dict[str, Any], content: str, duration: float):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        step = max(1, len(content) // behavior.stream_chunks)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        for piece in pieces:
+            await asyncio.sleep(duration / len(pieces))
+            yield _chunk(body, completion_id, {"role": "assistant", "content": piece})
+        yield _chunk(body, completion_id, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        outcome = behavior.outcome()
+        stats["requests"] += 1
+        stats[outcome] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            if outcome == "hang":
+                await asyncio.sleep(behavior.hang_seconds)
+                return JSONResponse(status_code=504, content={"error": "Stub provider timed out"})
+
+            delay = behavior.latency()
+            content = _answer_for(body)
+            if body.get("stream") and outcome == "ok":
+                return StreamingResponse(_stream(body, content, delay), media_type="text/event-stream")
+
+            await asyncio.sleep(delay)
+            if outcome != "ok":
+                return JSONResponse(status_code=int(outcome), content={"error": f"Stub provider error {outcome}"})
+            return JSONResponse(content=_completion(body, content))
+        finally:
+            state["in_flight"] -= 1
+
+    # InferenceClient with a base_url posts to /v1/chat/completions; accept the bare path as well
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return {
+            "counts": dict(stats),
+            "in_flight": state["in_flight"],
+            "max_in_flight": state["max_in_flight"],
+            "uptime_seconds": round(time.time() - state["started"], 1),
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat completions provider for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-median", type=float, default=2.0, help="Median response time in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal spread (0 for fixed latency)")
+    parser.add_argument("--latency-max", type=float, default=30.0, help="Maximum response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with an error")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503], help="Error statuses to return")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of calls that stall")
+    parser.add_argument("--hang-seconds", type=float, default=120.0, help="How long stalled calls take")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        latency_max=args.latency_max,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed,
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(behavior), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
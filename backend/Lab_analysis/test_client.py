@@ -1,7 +1,20 @@
-import requests
+import argparse
+import asyncio
 import base64
+import io
 import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import Counter
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+from PIL import Image, ImageDraw
 
 class LabReportAPIClient:
     """Client for testing the Lab Report Analysis API"""
@@ -59,10 +72,357 @@ class LabReportAPIClient:
         except Exception as e:
             return {"error": f"Failed to analyze base64 image: {str(e)}"}
 
+def make_report_image(width: int, height: int, seed: int = 0) -> bytes:
+    """
+    Render a synthetic lab report as JPEG bytes
+
+    The table layout roughly matches a printed report so upload size and decode
+    cost scale realistically with the requested resolution.
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((width * 0.05, height * 0.03), "COMPLETE BLOOD COUNT", fill="black")
+    analytes = [
+        ("Hemoglobin", "g/dL", "13.5 - 17.5"),
+        ("WBC", "10^3/uL", "4.0 - 11.0"),
+        ("Platelets", "10^3/uL", "150 - 400"),
+        ("Glucose", "mg/dL", "70 - 99"),
+        ("Sodium", "mmol/L", "135 - 145"),
+        ("Potassium", "mmol/L", "3.5 - 5.1"),
+        ("Creatinine", "mg/dL", "0.7 - 1.3"),
+        ("ALT", "U/L", "7 - 56"),
+    ]
+    row_height = max(12, height // (len(analytes) + 6))
+    for i, (name, unit, reference) in enumerate(analytes):
+        y = height * 0.1 + i * row_height
+        value = f"{rng.uniform(0.5, 200):.1f}"
+        for x_frac, text in ((0.05, name), (0.4, value), (0.55, unit), (0.75, reference)):
+            draw.text((width * x_frac, y), text, fill="black")
+    # Scanner-like noise so the JPEG does not compress to almost nothing
+    for _ in range(width * height // 400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.point((x, y), fill=(rng.randrange(180, 256),) * 3)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values) * 1000, 1) if values else None,
+        "p50_ms": round(_percentile(values, 0.50) * 1000, 1) if values else None,
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 1) if values else None,
+        "p99_ms": round(_percentile(values, 0.99) * 1000, 1) if values else None,
+        "max_ms": round(values[-1] * 1000, 1) if values else None,
+    }
+
+
+class LoadGenerator:
+    """
+    Async load generator for the Lab Report Analysis API
+
+    Runs `concurrency` virtual users in a closed loop (or an open loop at `rate`
+    requests per second), mixing multipart and base64 uploads of different image
+    sizes, while sampling the server's memory from /metrics.
+    """
+
+    METRIC_PATTERN = re.compile(r"^(process_resident_memory_bytes|lab_requests_in_flight)\s+([0-9.eE+]+)$", re.MULTILINE)
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        concurrency: int = 8,
+        total_requests: Optional[int] = 100,
+        duration: Optional[float] = None,
+        multipart_fraction: float = 0.5,
+        image_sizes: Optional[List[Tuple[int, int]]] = None,
+        clients: Optional[int] = None,
+        rate: Optional[float] = None,
+        timeout: float = 120.0,
+        server_pid: Optional[int] = None,
+        memory_interval: float = 1.0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            base_url: API base URL
+            concurrency: Number of virtual users (requests in flight at most)
+            total_requests: Stop after this many requests (None to run for `duration`)
+            duration: Stop after this many seconds
+            multipart_fraction: Share of requests sent to /analyze as multipart; the rest go to /analyze-base64
+            image_sizes: (width, height) pairs to pick uploads from
+            clients: Distinct X-API-Key values to spread requests over (default: one per virtual user)
+            rate: Open-loop arrival rate in requests per second (default: closed loop)
+            timeout: Per-request timeout in seconds
+            server_pid: Read RSS from /proc for this PID instead of the server's /metrics
+            memory_interval: Seconds between memory samples
+            seed: Random seed for the request mix
+        """
+        if total_requests is None and duration is None:
+            raise ValueError("Set total_requests or duration")
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.total_requests = total_requests
+        self.duration = duration
+        self.multipart_fraction = multipart_fraction
+        self.image_sizes = image_sizes or [(1240, 1754)]
+        self.clients = clients or self.concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.server_pid = server_pid
+        self.memory_interval = memory_interval
+        self.rng = random.Random(seed)
+        self.images = {size: make_report_image(*size, seed=seed) for size in self.image_sizes}
+        self.images_b64 = {size: base64.b64encode(data).decode("utf-8") for size, data in self.images.items()}
+        self.records: List[Dict[str, Any]] = []
+        self.memory_samples: List[int] = []
+        self.in_flight_samples: List[float] = []
+        self._issued = 0
+
+    def _next_request(self) -> Optional[Dict[str, Any]]:
+        if self.total_requests is not None and self._issued >= self.total_requests:
+            return None
+        if self.duration is not None and time.monotonic() - self._started >= self.duration:
+            return None
+        index = self._issued
+        self._issued += 1
+        return {
+            "index": index,
+            "kind": "multipart" if self.rng.random() < self.multipart_fraction else "base64",
+            "size": self.rng.choice(self.image_sizes),
+            "client": f"loadtest-{index % self.clients}",
+        }
+
+    async def _send(self, http: httpx.AsyncClient, spec: Dict[str, Any]):
+        size = spec["size"]
+        headers = {"X-API-Key": spec["client"]}
+        start = time.perf_counter()
+        status, outcome = 0, "ok"
+        try:
+            if spec["kind"] == "multipart":
+                files = {"file": (f"report_{size[0]}x{size[1]}.jpg", self.images[size], "image/jpeg")}
+                response = await http.post(f"{self.base_url}/analyze", files=files, headers=headers)
+            else:
+                response = await http.post(
+                    f"{self.base_url}/analyze-base64", json={"image": self.images_b64[size]}, headers=headers
+                )
+            status = response.status_code
+            if status != 200:
+                outcome = f"http_{status}"
+            elif (response.json().get("analysis") or {}).get("error"):
+                # The API answers 200 with an error payload when inference failed
+                outcome = "analysis_error"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        self.records.append({
+            "kind": spec["kind"],
+            "size": f"{size[0]}x{size[1]}",
+            "status": status,
+            "outcome": outcome,
+            "latency": time.perf_counter() - start,
+        })
+
+    async def _user(self, http: httpx.AsyncClient):
+        while True:
+            spec = self._next_request()
+            if spec is None:
+                return
+            await self._send(http, spec)
+
+    async def _open_loop(self, http: httpx.AsyncClient):
+        # Poisson arrivals; `concurrency` still caps requests in flight
+        limit = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def bounded(spec):
+            async with limit:
+                await self._send(http, spec)
+
+        while True:
+            spec = self._next_request()
+            if spec is None:
+                break
+            task = asyncio.create_task(bounded(spec))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            await asyncio.sleep(self.rng.expovariate(self.rate))
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _sample_memory(self, http: httpx.AsyncClient, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                if self.server_pid is not None:
+                    with open(f"/proc/{self.server_pid}/status", "r") as f:
+                        match = re.search(r"VmRSS:\s+(\d+) kB", f.read())
+                    if match:
+                        self.memory_samples.append(int(match.group(1)) * 1024)
+                else:
+                    response = await http.get(f"{self.base_url}/metrics", timeout=5)
+                    for name, value in self.METRIC_PATTERN.findall(response.text):
+                        if name == "process_resident_memory_bytes":
+                            self.memory_samples.append(int(float(value)))
+                        else:
+                            self.in_flight_samples.append(float(value))
+            except (OSError, httpx.HTTPError):
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.memory_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the load test and return a summary"""
+        limits = httpx.Limits(max_connections=self.concurrency + 2, max_keepalive_connections=self.concurrency + 2)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as http:
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(self._sample_memory(http, stop))
+            self._started = time.monotonic()
+            if self.rate:
+                await self._open_loop(http)
+            else:
+                await asyncio.gather(*(self._user(http) for _ in range(self.concurrency)))
+            elapsed = time.monotonic() - self._started
+            stop.set()
+            await sampler
+        return self.summary(elapsed)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ok = [r for r in self.records if r["outcome"] == "ok"]
+        by_kind = {}
+        for kind in sorted({r["kind"] for r in self.records}):
+            by_kind[kind] = _latency_summary([r["latency"] for r in ok if r["kind"] == kind])
+        by_size = {}
+        for size in sorted({r["size"] for r in self.records}):
+            by_size[size] = _latency_summary([r["latency"] for r in ok if r["size"] == size])
+        return {
+            "config": {
+                "base_url": self.base_url,
+                "concurrency": self.concurrency,
+                "total_requests": self.total_requests,
+                "duration": self.duration,
+                "rate": self.rate,
+                "multipart_fraction": self.multipart_fraction,
+                "image_sizes": [f"{w}x{h}" for w, h in self.image_sizes],
+                "image_bytes": {f"{w}x{h}": len(data) for (w, h), data in self.images.items()},
+                "clients": self.clients,
+            },
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": len(self.records),
+            "succeeded": len(ok),
+            "outcomes": dict(Counter(r["outcome"] for r in self.records)),
+            "throughput_rps": round(len(self.records) / elapsed, 2) if elapsed > 0 else None,
+            "goodput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+            "latency": _latency_summary([r["latency"] for r in ok]),
+            "latency_by_kind": by_kind,
+            "latency_by_size": by_size,
+            "server_memory": {
+                "samples": len(self.memory_samples),
+                "rss_start_bytes": self.memory_samples[0] if self.memory_samples else None,
+                "rss_peak_bytes": max(self.memory_samples) if self.memory_samples else None,
+                "rss_end_bytes": self.memory_samples[-1] if self.memory_samples else None,
+                "peak_in_flight": max(self.in_flight_samples) if self.in_flight_samples else None,
+            },
+        }
+
+
+def print_load_summary(summary: Dict[str, Any]):
+    print("\n📊 Load Test Results")
+    print("=" * 50)
+    print(f"Requests: {summary['requests']} in {summary['elapsed_seconds']} s ({summary['succeeded']} succeeded)")
+    print(f"Outcomes: {summary['outcomes']}")
+    print(f"Throughput: {summary['throughput_rps']} req/s (goodput {summary['goodput_rps']} req/s)")
+    latency = summary["latency"]
+    print(f"Latency p50/p95/p99: {latency['p50_ms']} / {latency['p95_ms']} / {latency['p99_ms']} ms")
+    for kind, stats in summary["latency_by_kind"].items():
+        print(f"  {kind:<10} p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms ({stats['count']} ok)")
+    for size, stats in summary["latency_by_size"].items():
+        print(f"  {size:<10} p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms ({stats['count']} ok)")
+    memory = summary["server_memory"]
+    if memory["rss_peak_bytes"]:
+        print(
+            f"Server RSS: {memory['rss_start_bytes'] / 2**20:.1f} MiB -> peak {memory['rss_peak_bytes'] / 2**20:.1f} MiB, "
+            f"end {memory['rss_end_bytes'] / 2**20:.1f} MiB"
+        )
+    else:
+        print("Server RSS: unavailable (no /metrics and no --server-pid)")
+
+
+def _parse_size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
 def main():
-    """Test the API client"""
-    client = LabReportAPIClient()
-    
+    """Test the API client, or run a load test with `load`"""
+    parser = argparse.ArgumentParser(description="Lab Report Analysis API test client and load generator.")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    subparsers = parser.add_subparsers(dest="command")
+
+    analyze_parser = subparsers.add_parser("analyze", help="Analyze one image")
+    analyze_parser.add_argument("image_path", help="Lab report image")
+    analyze_parser.add_argument("--base64", action="store_true", help="Use /analyze-base64 instead of a multipart upload")
+
+    load_parser = subparsers.add_parser("load", help="Run a load test")
+    load_parser.add_argument("--concurrency", type=int, default=8, help="Virtual users / max requests in flight")
+    load_parser.add_argument("--requests", type=int, default=None, help="Total requests (default: 100 unless --duration)")
+    load_parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    load_parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in req/s (default: closed loop)")
+    load_parser.add_argument("--multipart-fraction", type=float, default=0.5, help="Share of multipart uploads; the rest use base64")
+    load_parser.add_argument("--image-sizes", nargs="+", default=["1240x1754"], help="Upload sizes as WxH (A4 at 150 dpi by default)")
+    load_parser.add_argument("--clients", type=int, default=None, help="Distinct X-API-Key values (default: one per virtual user)")
+    load_parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    load_parser.add_argument("--server-pid", type=int, default=None, help="Read server RSS from /proc instead of /metrics")
+    load_parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix")
+    load_parser.add_argument("--output", default=None, help="Write the JSON summary to this path")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        generator = LoadGenerator(
+            base_url=args.url,
+            concurrency=args.concurrency,
+            total_requests=args.requests if args.requests is not None or args.duration is not None else 100,
+            duration=args.duration,
+            multipart_fraction=args.multipart_fraction,
+            image_sizes=[_parse_size(s) for s in args.image_sizes],
+            clients=args.clients,
+            rate=args.rate,
+            timeout=args.timeout,
+            server_pid=args.server_pid,
+            seed=args.seed,
+        )
+        print(f"🚀 Load testing {args.url} with {generator.concurrency} virtual users")
+        summary = asyncio.run(generator.run())
+        print_load_summary(summary)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            print(f"\nSaved summary to {args.output}")
+        return
+
+    client = LabReportAPIClient(args.url)
+
+    if args.command == "analyze":
+        if args.base64:
+            result = client.analyze_base64_image(args.image_path)
+        else:
+            result = client.analyze_image_file(args.image_path)
+        print(json.dumps(result, indent=2))
+        return
+
     # Health check
     print("🏥 Testing Lab Report Analysis API")
     print("=" * 50)
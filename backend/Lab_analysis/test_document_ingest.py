@@ -0,0 +1,168 @@
+import asyncio
+import io
+import struct
+import zipfile
+
+import pymupdf
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+import main
+from document_ingest import DocumentError, extract_zip_pages, page_dpi, rasterize_pdf
+
+
+def png_bytes(size=(8, 8)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_zip(entries) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_pages_in_name_order():
+    image = png_bytes()
+    contents = make_zip([("page-2.png", image), ("page-1.png", image), ("notes.txt", b"skip"), (".hidden.png", image)])
+    assert [name for name, _ in extract_zip_pages(contents)] == ["page-1.png", "page-2.png"]
+
+
+def test_entry_over_limit_refused_before_reading():
+    # Highly compressible: tiny archive, large declared size
+    contents = make_zip([("page-1.png", b"\0" * 100_000)])
+    assert len(contents) < 1_000
+    with pytest.raises(DocumentError, match="uncompressed"):
+        extract_zip_pages(contents, max_entry_bytes=50_000)
+
+
+def test_total_over_limit_refused():
+    contents = make_zip([(f"page-{i}.png", b"\0" * 40_000) for i in range(3)])
+    with pytest.raises(DocumentError, match="uncompressed"):
+        extract_zip_pages(contents, max_entry_bytes=50_000, max_total_bytes=100_000)
+
+
+def test_understated_entry_size_not_trusted():
+    contents = bytearray(make_zip([("page-1.png", b"\0" * 100_000)]))
+    # Rewrite the central directory so the entry claims to be 10 bytes uncompressed
+    offset = contents.rfind(b"PK\x01\x02")
+    contents[offset + 24:offset + 28] = struct.pack("<I", 10)
+    with pytest.raises((DocumentError, zipfile.BadZipFile)):
+        extract_zip_pages(bytes(contents))
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, size=None):
+        self.stream = io.BytesIO(data)
+        self.size = size
+        self.reads = 0
+
+    async def read(self, n=-1):
+        self.reads += 1
+        return self.stream.read(n)
+
+
+def test_upload_over_limit_is_413_without_reading_it_all():
+    upload = FakeUpload(b"x" * (5 * main.UPLOAD_CHUNK_BYTES))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(main._read_upload(upload, main.UPLOAD_CHUNK_BYTES + 1))
+    assert exc.value.status_code == 413
+    assert upload.reads == 2
+
+
+def test_declared_upload_size_over_limit_is_413():
+    upload = FakeUpload(b"", size=10_000)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(main._read_upload(upload, 1_000))
+    assert exc.value.status_code == 413
+    assert upload.reads == 0
+
+
+def test_upload_within_limit_is_read_whole():
+    data = b"x" * (main.UPLOAD_CHUNK_BYTES + 10)
+    assert asyncio.run(main._read_upload(FakeUpload(data), len(data))) == data
+
+
+def make_pdf(*sizes) -> bytes:
+    document = pymupdf.open()
+    for width, height in sizes:
+        document.new_page(width=width, height=height)
+    return document.tobytes()
+
+
+def test_page_within_budget_keeps_the_dpi():
+    assert page_dpi(612, 792, 150, 25_000_000) == 150
+
+
+def test_oversized_page_is_rendered_at_lower_dpi():
+    # 2000x2000 pt at 150 dpi would be 4167x4167 pixels
+    pages = rasterize_pdf(make_pdf((612, 792), (2000, 2000)), dpi=150, max_pixels=4_000_000, min_dpi=50)
+    sizes = [Image.open(io.BytesIO(data)).size for _, data in pages]
+    assert sizes[0] == (1275, 1650)
+    assert sizes[1][0] * sizes[1][1] <= 4_000_000
+    assert sizes[1][0] >= 1900
+
+
+def test_huge_page_is_refused_before_rendering():
+    # A few hundred bytes of PDF declaring a 200x200 inch page
+    contents = make_pdf((14400, 14400))
+    assert len(contents) < 2_000
+    with pytest.raises(DocumentError, match="too large"):
+        rasterize_pdf(contents, dpi=150, max_pixels=25_000_000, min_dpi=72)
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: int):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks >= self.disconnect_after
+
+
+def test_disconnected_client_cancels_remaining_pages(monkeypatch):
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    async def scenario():
+        tasks = [asyncio.create_task(asyncio.sleep(0)), asyncio.create_task(asyncio.sleep(10))]
+        with pytest.raises(HTTPException) as exc:
+            await main._gather_while_connected(FakeRequest(disconnect_after=2), tasks)
+        await asyncio.sleep(0)
+        return exc.value.status_code, tasks
+
+    status, tasks = asyncio.run(scenario())
+    assert status == 499
+    assert tasks[1].cancelled()
+
+
+def test_failed_page_cancels_the_others():
+    async def fail():
+        raise RuntimeError("page failed")
+
+    async def scenario():
+        tasks = [asyncio.create_task(fail()), asyncio.create_task(asyncio.sleep(10))]
+        with pytest.raises(RuntimeError):
+            await main._gather_while_connected(FakeRequest(disconnect_after=100), tasks)
+        await asyncio.sleep(0)
+        return tasks
+
+    assert asyncio.run(scenario())[1].cancelled()
+
+
+def test_connected_client_gets_results_in_order(monkeypatch):
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    async def page(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    async def scenario():
+        tasks = [asyncio.create_task(page("a", 0.05)), asyncio.create_task(page("b", 0))]
+        return await main._gather_while_connected(FakeRequest(disconnect_after=100), tasks)
+
+    assert asyncio.run(scenario()) == ["a", "b"]
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import requests
+
+from inference_router import (
+    CircuitBreaker,
+    DeadlineExceeded,
+    InferenceRouter,
+    NoProviderAvailable,
+    ProviderBackend,
+    classify_error,
+)
+from lab_analyzer import LabReportAnalyzer
+
+FAKE_RESPONSE = """Summary: Fake provider response.
+Key Findings:
+- Hemoglobin 9.1 g/dL (low)
+Interpretation: Mild anemia.
+Note: Not medical advice."""
+
+
+class FakeHTTPError(Exception):
+    """Provider HTTP error carrying a response status, like huggingface_hub's HfHubHTTPError"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class APIStatusError(Exception):
+    """Error with the status on the exception itself, like openai's APIStatusError"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeChatClient:
+    """
+    Local stand-in for InferenceClient with scripted latency and failures
+
+    Like the real client it reads `self.timeout` on every call and gives up once it
+    passes. Calls are recorded on `log`, which copies of the client share.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_with: int = None, fail_times: int = -1, timeout: float = None):
+        self.latency = latency
+        self.fail_with = fail_with
+        self.fail_times = fail_times  # -1 = always fail
+        self.timeout = timeout
+        self.log = []
+
+    @property
+    def chat(self):
+        return SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def calls(self) -> int:
+        return len(self.log)
+
+    def create(self, model, messages, **kwargs):
+        self.log.append(self.timeout)
+        if self.timeout is not None and self.latency > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError("Inference call timed out")
+        time.sleep(self.latency)
+        if self.fail_with and (self.fail_times < 0 or self.calls <= self.fail_times):
+            raise FakeHTTPError(self.fail_with)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=FAKE_RESPONSE))])
+
+
+def make_analyzer(router: InferenceRouter) -> LabReportAnalyzer:
+    analyzer = LabReportAnalyzer(router=router)
+    analyzer.fast_path = None
+    analyzer.output_mode = "text"
+    return analyzer
+
+
+def analyze(router: InferenceRouter, deadline: float = None):
+    return asyncio.run(make_analyzer(router).analyze_report("ZmFrZQ==", deadline))
+
+
+@pytest.mark.parametrize("error, action", [
+    (FakeHTTPError(429), "retry"),
+    (FakeHTTPError(503), "retry"),
+    (FakeHTTPError(401), "next"),
+    (FakeHTTPError(404), "next"),
+    (FakeHTTPError(400), "fatal"),
+    (FakeHTTPError(422), "fatal"),
+    (APIStatusError(502), "retry"),
+    (TimeoutError(), "retry"),
+    (ConnectionResetError(), "retry"),
+    (asyncio.TimeoutError(), "retry"),
+    (requests.exceptions.ConnectTimeout(), "retry"),
+    (requests.exceptions.ConnectionError(), "retry"),
+    (httpx.ReadTimeout("slow"), "retry"),
+    (httpx.ConnectError("refused"), "retry"),
+    (httpx.RemoteProtocolError("closed"), "retry"),
+    (ValueError("bad payload"), "fatal"),
+    (KeyError("choices"), "fatal"),
+])
+def test_classify_error(error, action):
+    assert classify_error(error) == action
+
+
+def test_error_names_do_not_decide_the_action():
+    # Only the type decides: a name that merely mentions "Timeout" or "Connect" is not transient
+    for name in ("TimeoutConfigError", "ConnectorSchemaError", "TransportNotConfigured", "NetworkPolicyDenied"):
+        assert classify_error(type(name, (Exception,), {})()) == "fatal"
+
+
+def test_brownout_trips_breaker_and_fails_over():
+    browned_out = FakeChatClient(latency=0.05, fail_with=503)
+    flaky = FakeChatClient(fail_with=429, fail_times=1)
+    router = InferenceRouter(
+        [
+            ProviderBackend("fake-model", name="browned-out", client=browned_out, breaker=CircuitBreaker(3, 30)),
+            ProviderBackend("fake-model", name="flaky", client=flaky, breaker=CircuitBreaker(3, 30)),
+        ],
+        max_attempts=2,
+        base_delay=0.01,
+        max_delay=0.05,
+    )
+    results = [analyze(router) for _ in range(4)]
+
+    assert [r["error"] for r in results] == [False] * 4
+    assert all(r["summary"] == "Fake provider response." for r in results)
+    # The breaker stops calls to the browned-out provider after 3 failures
+    assert browned_out.calls == 3
+    assert [s["state"] for s in router.status()] == [CircuitBreaker.OPEN, CircuitBreaker.CLOSED]
+
+
+def test_request_error_is_not_retried_or_failed_over():
+    bad_request, backup = FakeChatClient(fail_with=400), FakeChatClient()
+    router = InferenceRouter([
+        ProviderBackend("fake-model", name="bad-request", client=bad_request),
+        ProviderBackend("fake-model", name="backup", client=backup),
+    ])
+    assert analyze(router)["error"]
+    assert (bad_request.calls, backup.calls) == (1, 0)
+
+
+def test_provider_specific_error_fails_over_without_retry():
+    unauthorized, backup = FakeChatClient(fail_with=401), FakeChatClient()
+    router = InferenceRouter([
+        ProviderBackend("fake-model", name="unauthorized", client=unauthorized),
+        ProviderBackend("fake-model", name="backup", client=backup),
+    ], max_attempts=3)
+    assert not analyze(router)["error"]
+    assert (unauthorized.calls, backup.calls) == (1, 1)
+
+
+def test_remaining_deadline_is_the_provider_timeout():
+    slow = FakeChatClient(latency=1.0, timeout=30.0)
+    router = InferenceRouter([ProviderBackend("fake-model", name="slow", client=slow)])
+
+    async def scenario():
+        began = time.monotonic()
+        result = await make_analyzer(router).analyze_report("ZmFrZQ==", deadline=began + 0.2)
+        return result, time.monotonic() - began
+
+    result, elapsed = asyncio.run(scenario())
+    assert result["error"] and elapsed < 0.5
+    # The call was made with the time left, not the client's 30 s, so the worker thread stops too
+    assert slow.log and slow.log[0] <= 0.2
+    assert slow.timeout == 30.0
+
+
+def test_backend_timeout_caps_the_deadline():
+    client = FakeChatClient(timeout=30.0)
+    backend = ProviderBackend("fake-model", name="capped", client=client, timeout=5.0)
+    backend.create([], timeout=60.0)
+    backend.create([], timeout=2.0)
+    backend.create([])
+    assert client.log == [5.0, 2.0, 30.0]
+
+
+def test_open_stream_respects_deadline():
+    client = FakeChatClient(timeout=30.0)
+    router = InferenceRouter([ProviderBackend("fake-model", name="stream", client=client)])
+    with pytest.raises(DeadlineExceeded):
+        router.open_stream([], deadline=time.monotonic() - 1)
+    router.open_stream([], deadline=time.monotonic() + 10)
+    assert client.calls == 1 and 9 < client.log[0] <= 10
+
+
+def test_all_providers_open_raises():
+    breaker = CircuitBreaker(1, 30)
+    breaker.record_failure()
+    router = InferenceRouter([ProviderBackend("fake-model", name="open", client=FakeChatClient(), breaker=breaker)])
+    with pytest.raises(NoProviderAvailable):
+        asyncio.run(router.complete([]))
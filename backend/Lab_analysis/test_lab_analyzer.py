@@ -0,0 +1,98 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from inference_router import InferenceRouter, ProviderBackend
+from lab_analyzer import IncrementalAnalysisParser, LabReportAnalyzer
+
+REPORT = """Summary: Mild iron deficiency anemia.
+Hemoglobin and ferritin are both below range,
+other counts are normal.
+Key Findings:
+- Hemoglobin: 10.9 g/dL (reference 12-16) - LOW
+- Ferritin: 8 ng/mL (reference 15-150) - LOW
+Interpretation: The pattern suggests low iron stores.
+Dietary intake or blood loss are common causes.
+
+Note: This is not a diagnosis.
+Discuss the results with your doctor.
+"""
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeCompletions:
+    """chat.completions stand-in that streams `pieces`, sleeping `delay` seconds before each"""
+
+    def __init__(self, pieces, delay=0.0):
+        self.pieces = pieces
+        self.delay = delay
+
+    def create(self, model, messages, stream=False, **kwargs):
+        def generate():
+            for piece in self.pieces:
+                time.sleep(self.delay)
+                yield chunk(piece)
+        return generate()
+
+
+def make_analyzer(pieces, delay=0.0):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(pieces, delay)))
+    analyzer = LabReportAnalyzer(router=InferenceRouter([ProviderBackend("fake", name="fake", client=client)]))
+    analyzer.fast_path = None
+    return analyzer
+
+
+async def collect(analyzer, deadline=None):
+    return [event async for event in analyzer.stream_report("", deadline)]
+
+
+def test_sections_keep_continuation_lines():
+    parser = IncrementalAnalysisParser()
+    parser.feed(REPORT)
+    parser.close()
+    result = parser.build_result()
+    assert result["summary"] == (
+        "Mild iron deficiency anemia. Hemoglobin and ferritin are both below range, other counts are normal."
+    )
+    assert result["interpretation"] == "The pattern suggests low iron stores. Dietary intake or blood loss are common causes."
+    assert result["note"] == "This is not a diagnosis. Discuss the results with your doctor."
+    assert len(result["key_findings"]) == 2
+
+
+def test_section_updates_carry_the_whole_value_so_far():
+    parser = IncrementalAnalysisParser()
+    updates = parser.feed("Summary: First line.\nSecond line.\nKey Findings:\n")
+    assert updates == [
+        {"section": "summary", "value": "First line."},
+        {"section": "summary", "value": "First line. Second line."},
+    ]
+
+
+def test_stream_splits_lines_across_chunks():
+    pieces = [REPORT[i:i + 7] for i in range(0, len(REPORT), 7)]
+    events = asyncio.run(collect(make_analyzer(pieces)))
+    assert events[-1]["type"] == "result"
+    assert events[-1]["analysis"]["summary"].endswith("other counts are normal.")
+
+
+def test_stream_ends_with_error_event_at_deadline():
+    analyzer = make_analyzer(["Summary: slow\n", "more\n", "and more\n"], delay=0.3)
+
+    async def timed():
+        began = time.monotonic()
+        events = await collect(analyzer, deadline=began + 0.45)
+        return events, time.monotonic() - began
+
+    # asyncio.run then waits for the worker thread; the stream itself must end on time
+    events, elapsed = asyncio.run(timed())
+    assert elapsed < 0.55
+    assert [e["type"] for e in events if e["type"] != "section"] == ["token", "error"]
+    assert events[-1]["raw_response"] == "Summary: slow\n"
+
+
+def test_stream_past_deadline_does_not_open_a_stream():
+    events = asyncio.run(collect(make_analyzer(["never\n"]), deadline=time.monotonic() - 1))
+    assert [e["type"] for e in events] == ["error"]
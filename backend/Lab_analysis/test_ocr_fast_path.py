@@ -0,0 +1,118 @@
+import pytest
+
+from ocr_fast_path import AmbiguousRow, LabTableExtractor, parse_number, parse_row, parse_table_rows
+
+# (OCR line, expected name, value, qualifier, unit, reference range, flag)
+ROWS = [
+    ("Hemoglobin 14.2 g/dL 13.5-17.5", "Hemoglobin", 14.2, "", "g/dL", "13.5-17.5", "normal"),
+    ("Hemoglobin  9.1 L  g/dL  13.5 - 17.5", "Hemoglobin", 9.1, "", "g/dL", "13.5-17.5", "low"),
+    ("Hemoglobin 14 g/dL 12-16 H", "Hemoglobin", 14.0, "", "g/dL", "12-16", "high"),
+    ("Hemoglobin 18.4 g/dL 12-16 H", "Hemoglobin", 18.4, "", "g/dL", "12-16", "high"),
+    ("Hemoglobin 18.4H g/dL 12-16", "Hemoglobin", 18.4, "", "g/dL", "12-16", "high"),
+    ("Ferritin 8 ng/mL 15-150 L", "Ferritin", 8.0, "", "ng/mL", "15-150", "low"),
+    ("Vitamin B12 300 pg/mL 200-900", "Vitamin B12", 300.0, "", "pg/mL", "200-900", "normal"),
+    ("25-OH Vitamin D 18 ng/mL 30-100", "25-OH Vitamin D", 18.0, "", "ng/mL", "30-100", "low"),
+    ("LDL Cholesterol 162 H mg/dL < 130", "LDL Cholesterol", 162.0, "", "mg/dL", "< 130", "high"),
+    ("HDL Cholesterol 55 mg/dL > 40", "HDL Cholesterol", 55.0, "", "mg/dL", "> 40", "normal"),
+    ("Platelets 250,000 /µL 150,000-450,000", "Platelets", 250000.0, "", "/µL", "150,000-450,000", "normal"),
+    ("WBC 12,400 /µL 4,000 - 11,000", "WBC", 12400.0, "", "/µL", "4,000-11,000", "high"),
+    ("Potassium 4,2 mmol/L 3,5-5,1", "Potassium", 4.2, "", "mmol/L", "3,5-5,1", "normal"),
+    ("TSH: 2.1 mIU/L (0.4 - 4.0)", "TSH", 2.1, "", "mIU/L", "0.4-4.0", "normal"),
+    ("Creatinine 1.0 mg/dL 0.7 to 1.3", "Creatinine", 1.0, "", "mg/dL", "0.7-1.3", "normal"),
+    ("CRP <5 mg/L < 10", "CRP", 5.0, "<", "mg/L", "< 10", "normal"),
+    ("CRP <5 mg/L 0-10", "CRP", 5.0, "<", "mg/L", "0-10", "normal"),
+    ("Troponin I < 0.01 ng/mL < 0.04", "Troponin I", 0.01, "<", "ng/mL", "< 0.04", "normal"),
+    ("eGFR >90 mL/min/1.73m2 > 60", "eGFR", 90.0, ">", "mL/min/1.73m2", "> 60", "normal"),
+    ("Glucose < 70 mg/dL 70-99", "Glucose", 70.0, "<", "mg/dL", "70-99", "low"),
+    ("HbA1c 6.1 % 4.0-5.6", "HbA1c", 6.1, "", "%", "4.0-5.6", "high"),
+    ("INR 1.1 0.8-1.2", "INR", 1.1, "", "", "0.8-1.2", "normal"),
+]
+
+
+@pytest.mark.parametrize("line, name, value, qualifier, unit, reference_range, flag", ROWS)
+def test_parse_row(line, name, value, qualifier, unit, reference_range, flag):
+    row = parse_row(line)
+    assert row is not None
+    assert (row["name"], row["value"], row["qualifier"], row["unit"], row["reference_range"], row["flag"]) == (
+        name, value, qualifier, unit, reference_range, flag
+    )
+
+
+@pytest.mark.parametrize("line", [
+    "Date: 2024-01-15",
+    "Collected 12/01/2024 08:30",
+    "Age 45 Sex M",
+    "Page 1 of 2",
+    "Hemoglobin 14 g/dL",
+    "Reference 10-20",
+    "2024 Annual Panel 10-20",
+])
+def test_non_result_lines(line):
+    assert parse_row(line) is None
+
+
+@pytest.mark.parametrize("line", [
+    # Text left over after the range
+    "Sodium 140 mmol/L 135-145 see note",
+    # Digits split by OCR: "1" is the first number, the rest does not fit
+    "Hemoglobin 1 4 g/dL 12-16",
+    # A stray number in the name shifts the value
+    "Vitamin B 12 300 pg/mL 200-900",
+    # Reversed range
+    "Glucose 90 mg/dL 110-70",
+    # Conflicting printed flags
+    "Glucose H 90 mg/dL 70-110 L",
+    # "<15" may or may not be below 10
+    "Ferritin <15 ng/mL 10-150",
+    # Abnormal marker on an in-range value
+    "Sodium 140 * mmol/L 135-145",
+])
+def test_ambiguous_rows(line):
+    with pytest.raises(AmbiguousRow):
+        parse_row(line)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("14", 14.0),
+    ("9.1", 9.1),
+    ("5,2", 5.2),
+    ("250,000", 250000.0),
+    ("1,250.5", 1250.5),
+    ("12,400", 12400.0),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
+
+
+def test_parse_table_rows_reports_ambiguous_lines():
+    lines = [
+        ("CITY LAB - COMPLETE BLOOD COUNT", 95.0),
+        ("Date: 2024-01-15", 92.0),
+        ("Hemoglobin 14.2 g/dL 13.5-17.5", 90.0),
+        ("Hemoglobin 1 4 g/dL 12-16", 80.0),
+        ("Platelets 250,000 /µL 150,000-450,000", 94.0),
+    ]
+    rows, confidence, coverage, ambiguous = parse_table_rows(lines)
+    assert [row["name"] for row in rows] == ["Hemoglobin", "Platelets"]
+    assert confidence == pytest.approx(92.0)
+    assert coverage == pytest.approx(2 / 4)
+    assert ambiguous == ["Hemoglobin 1 4 g/dL 12-16"]
+
+
+def test_extractor_declines_when_any_row_is_ambiguous(monkeypatch):
+    clean = [
+        ("Hemoglobin 14.2 g/dL 13.5-17.5", 95.0),
+        ("Platelets 250,000 /µL 150,000-450,000", 95.0),
+        ("Ferritin 8 ng/mL 15-150 L", 95.0),
+    ]
+    extractor = LabTableExtractor(min_confidence=0.8, min_rows=3, min_coverage=0.6)
+    monkeypatch.setattr(extractor, "_ocr_lines", lambda image: clean)
+    monkeypatch.setattr("ocr_fast_path.Image.open", lambda stream: None)
+
+    result = extractor.analyze("")
+    assert result["source"] == "ocr"
+    assert [a["flag"] for a in result["analytes"]] == ["normal", "normal", "low"]
+    assert result["key_findings"][0] == "Ferritin: 8 ng/mL (reference 15-150) - LOW"
+
+    monkeypatch.setattr(extractor, "_ocr_lines", lambda image: clean + [("Vitamin B 12 300 pg/mL 200-900", 95.0)])
+    assert extractor.analyze("") is None
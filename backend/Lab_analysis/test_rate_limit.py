@@ -0,0 +1,66 @@
+import asyncio
+
+from rate_limit import AdmissionController, AdmissionMiddleware
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def post(middleware, ip="203.0.113.7", api_key=None) -> int:
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    scope = {"type": "http", "method": "POST", "path": "/analyze", "headers": headers, "client": (ip, 5000)}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, None, send))
+    return sent[0]["status"]
+
+
+def make_middleware(api_keys=("good-key",), **limits):
+    controller = AdmissionController(**{"rate": 0.001, "burst": 2, "global_rate": 0.001, "global_burst": 100, **limits})
+    return AdmissionMiddleware(ok_app, controller, trust_forwarded=False, api_keys=api_keys)
+
+
+def test_configured_key_gets_its_own_bucket():
+    middleware = make_middleware()
+    assert [post(middleware) for _ in range(3)] == [200, 200, 429]
+    assert [post(middleware, api_key="good-key") for _ in range(3)] == [200, 200, 429]
+
+
+def test_unknown_keys_share_the_ip_bucket():
+    middleware = make_middleware()
+    statuses = [post(middleware, api_key=f"random-{i}") for i in range(3)]
+    assert statuses == [200, 200, 429]
+    assert post(middleware) == 429
+    assert post(middleware, ip="198.51.100.1", api_key="random-x") == 200
+
+
+def test_keys_ignored_when_none_configured():
+    middleware = make_middleware(api_keys=())
+    assert [post(middleware, api_key="good-key") for _ in range(3)] == [200, 200, 429]
+    assert middleware._client_id({"headers": [(b"x-api-key", b"good-key")], "client": ("203.0.113.7", 1)}) == "ip:203.0.113.7"
+
+
+def test_client_id_does_not_expose_the_key():
+    middleware = make_middleware()
+    client_id = middleware._client_id({"headers": [(b"x-api-key", b"good-key")], "client": ("203.0.113.7", 1)})
+    assert client_id.startswith("key:") and "good-key" not in client_id
+
+
+def test_global_bucket_bounds_total_load():
+    middleware = make_middleware(api_keys=(), global_burst=3)
+    statuses = [post(middleware, ip=f"198.51.100.{i}") for i in range(5)]
+    assert statuses == [200, 200, 200, 503, 503]
+    assert middleware.controller.stats()["rejected_503"] == 2
+
+
+def test_global_rejection_refunds_the_client_token():
+    controller = AdmissionController(rate=0.001, burst=1, global_rate=0.001, global_burst=1)
+    controller.global_bucket.tokens = 0
+    assert controller.acquire("ip:a")[1] == 503
+    controller.global_bucket.tokens = 1
+    assert controller.acquire("ip:a")[0]
@@ -1,65 +1,36 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any
-import numpy as np
-import xgboost as xgb
-from sklearn.preprocessing import LabelEncoder
+import asyncio
 import os
+import sys
+from pathlib import Path
 
-# --- Model Loading and Prediction Logic ---
-
-def load_artifacts(prefix: str):
-    """Load the trained model artifacts."""
-    model_path = f"{prefix}.json"
-    labels_path = f"{prefix}.labels.npy"
-    features_path = f"{prefix}.features.txt"
-
-    if not (os.path.exists(model_path) and os.path.exists(labels_path) and os.path.exists(features_path)):
-        raise FileNotFoundError(f"Missing artifacts. Expected: {model_path}, {labels_path}, {features_path}")
-
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
+# Shared with the symptom_checker service; symptom_core imports nothing else from that directory
+from symptom_checker.symptom_core import Predictor, get_predictor
 
-    label_encoder = LabelEncoder()
-    classes = np.load(labels_path, allow_pickle=True)
-    label_encoder.classes_ = classes
+# Readiness gate shared with the other backend services
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
 
-    with open(features_path, "r", encoding="utf-8") as f:
-        feature_names = [line.strip() for line in f if line.strip()]
+from service_common.readiness import ReadinessGate  # noqa: E402
 
-    return model, label_encoder, feature_names
-
-def build_feature_vector(symptom_names: List[str], selected_symptoms: List[str]) -> np.ndarray:
-    """Convert symptom list to feature vector."""
-    features = np.zeros(len(symptom_names), dtype=float)
-    name_to_index = {name.lower().strip(): idx for idx, name in enumerate(symptom_names)}
-    
-    for symptom in selected_symptoms:
-        key = symptom.lower().strip()
-        if key in name_to_index:
-            features[name_to_index[key]] = 1.0
-    
-    return features.reshape(1, -1)
+# --- Model Loading and Prediction Logic ---
 
-def get_predictions(symptoms: List[str], model, label_encoder, feature_names: List[str]) -> Dict[str, Any]:
+def get_predictions(symptoms: List[str], predictor: Predictor) -> Dict[str, Any]:
     """Return predictions."""
     if not symptoms:
         return {"error": "No symptoms provided"}
     
-    feature_vector = build_feature_vector(feature_names, symptoms)
-    
-    probabilities = model.predict_proba(feature_vector)[0]
-    
-    top_n = 5
-    top_indices = probabilities.argsort()[-top_n:][::-1]
-    
     predictions = [
         {
-            "disease": label_encoder.inverse_transform([idx])[0],
-            "probability": round(float(probabilities[idx]), 4),
+            "disease": p.disease,
+            "probability": round(p.confidence, 4),
         }
-        for idx in top_indices
+        for p in predictor.predict(symptoms)
     ]
     
     return {"predictions": predictions}
@@ -81,14 +52,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opens after the artifacts are loaded and a warmup batch has been scored
+readiness = ReadinessGate()
+
 # Load model and artifacts at startup
 try:
     MODEL_ARTIFACTS_PREFIX = "symptom_model"
-    model, label_encoder, feature_names = load_artifacts(MODEL_ARTIFACTS_PREFIX)
+    predictor = readiness.step("load", lambda: get_predictor(MODEL_ARTIFACTS_PREFIX))
 except FileNotFoundError as e:
     # This allows the app to start and show an error at the endpoint
     # if the model artifacts are not found.
-    model, label_encoder, feature_names = None, None, None
+    predictor = None
     startup_error = str(e)
 else:
     startup_error = None
@@ -97,14 +71,33 @@ else:
 class SymptomsRequest(BaseModel):
     symptoms: List[str]
 
+def warm_up():
+    """Build the symptom index and score a warmup batch so the first requests are not cold"""
+    rows = int(os.getenv("SYMPTOM_WARMUP_ROWS", "32"))
+    feature_names = predictor.feature_names
+    keys = readiness.step("symptom_index", lambda: [predictor.encode(feature_names[i % len(feature_names):][:3]) for i in range(rows)])
+    # Straight through the backend so the warmup rows stay out of the prediction cache
+    readiness.step(f"{predictor.backend.name}_predict", lambda: predictor.backend.predict_proba(keys))
+
+async def warm_up_in_background():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        readiness.open()
+        print(f"Warmup finished in {readiness.warmup_seconds['total']:.2f} s")
+    except Exception as e:
+        readiness.fail(f"Warmup failed: {str(e)}")
+        print(f"Warmup Error: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    # This is just to confirm startup logic has run.
-    # The actual loading is done above.
+    # The actual loading is done above; warmup runs in the background
+    # and /ready reports 503 until it has finished.
     if startup_error:
+        readiness.fail(startup_error)
         print(f"Startup Error: {startup_error}")
     else:
         print("Model and artifacts loaded successfully.")
+        app.state.warmup = asyncio.create_task(warm_up_in_background())
 
 @app.get("/")
 def read_root():
@@ -121,7 +114,7 @@ def predict(request: SymptomsRequest):
     if startup_error:
         return {"error": f"Could not process request due to a startup error: {startup_error}"}
         
-    predictions = get_predictions(request.symptoms, model, label_encoder, feature_names)
+    predictions = get_predictions(request.symptoms, predictor)
     return predictions
 
 @app.get("/symptoms", summary="List all available symptoms")
@@ -131,7 +124,7 @@ def list_symptoms():
     """
     if startup_error:
         return {"error": f"Could not retrieve symptoms due to a startup error: {startup_error}"}
-    return {"symptoms": feature_names}
+    return {"symptoms": predictor.feature_names}
 
 # Health check endpoint
 @app.get("/health")
@@ -143,6 +136,19 @@ def health_check():
         "model_loaded": startup_error is None
     }
 
+# Readiness probe for load balancers
+@app.get("/ready")
+def readiness_check():
+    """200 once the model is loaded and warmed up, 503 before or after a startup error"""
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content={
+            "status": "ready" if readiness.ready else "not_ready",
+            "service": "symptom-checker",
+            **readiness.status()
+        }
+    )
+
 # Flutter-friendly endpoints
 @app.post("/api/check-symptoms", summary="Check symptoms - Flutter friendly")
 def check_symptoms_api(request: SymptomsRequest):
@@ -163,7 +169,7 @@ def check_symptoms_api(request: SymptomsRequest):
         }
     
     # Get predictions using existing logic
-    result = get_predictions(request.symptoms, model, label_encoder, feature_names)
+    result = get_predictions(request.symptoms, predictor)
     
     # Format for Flutter with confidence percentages and ranks
     if "error" in result:
@@ -200,6 +206,6 @@ def get_symptoms_api():
     
     return {
         "success": True,
-        "symptoms": feature_names,
-        "total_symptoms": len(feature_names)
+        "symptoms": predictor.feature_names,
+        "total_symptoms": len(predictor.feature_names)
     }
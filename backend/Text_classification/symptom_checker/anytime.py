@@ -0,0 +1,136 @@
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+
+from metrics import ANYTIME_AGREEMENT, ANYTIME_ROUNDS, observe
+
+# Why evaluation stopped, also the values of the anytime_rounds "stop" label
+STOP_DECISIVE = "decisive"
+STOP_BUDGET = "budget"
+STOP_FULL = "full"
+
+
+def softmax(margins: np.ndarray) -> np.ndarray:
+    shifted = np.exp(margins - margins.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class AnytimePredictor:
+    """
+    Evaluates the booster in stages and stops once the top-1 class is decisive
+
+    Stage i adds boosting rounds [r(i-1), r(i)) via `iteration_range` to the running
+    margins, so no tree is evaluated twice. The last stage ends at the early-stopping
+    best iteration, so a full evaluation equals `predict_proba`. After each stage,
+    prediction stops when the top-1 margin leads the top-2 margin by `min_margin`
+    (log-odds) or the request's latency budget is spent; ambiguous inputs run every
+    round.
+
+    A `sample_rate` fraction of early stops is re-scored with the full model and
+    counted in symptom_anytime_agreement_total, giving the live agreement rate.
+    """
+
+    def __init__(
+        self,
+        booster: Callable[[], xgb.Booster],
+        stages: Optional[List[float]] = None,
+        min_margin: Optional[float] = None,
+        sample_rate: Optional[float] = None,
+    ):
+        """
+        Args:
+            booster: Returns the current booster
+            stages: Cumulative fractions of the boosting rounds evaluated per stage
+            min_margin: Top-1 minus top-2 margin that counts as decisive
+            sample_rate: Fraction of early stops checked against the full model
+        """
+        self.booster = booster
+        self.stages = stages or [float(s) for s in os.getenv("ANYTIME_STAGES", "0.1,0.25,0.5,1").split(",")]
+        self.min_margin = min_margin if min_margin is not None else float(os.getenv("ANYTIME_MIN_MARGIN", "2.0"))
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("ANYTIME_AGREEMENT_SAMPLE", "0.05"))
+        self._bounds: Optional[List[int]] = None
+        self._base_margin: Optional[np.ndarray] = None
+
+    def reset(self):
+        """Forget the stage plan after a model reload"""
+        self._bounds = None
+        self._base_margin = None
+
+    def _plan(self):
+        if self._bounds is None:
+            booster = self.booster()
+            # Stop where XGBClassifier.predict_proba (and BufferedScorer) stop: the
+            # early-stopping best iteration when there is one, else every round
+            best = booster.attr("best_iteration")
+            rounds = int(best) + 1 if best is not None else booster.num_boosted_rounds()
+            bounds = sorted({max(1, min(rounds, int(round(rounds * s)))) for s in self.stages} | {rounds})
+            # Every iteration_range margin includes the base score once; measure it so
+            # it can be subtracted from all stages after the first
+            zero = np.zeros((1, booster.num_features()), dtype=np.float32)
+            head = self._margins(booster, zero, 0, 1)
+            tail = self._margins(booster, zero, 1, rounds) if rounds > 1 else 0.0
+            self._base_margin = head + tail - self._margins(booster, zero, 0, rounds)
+            self._bounds = bounds
+        return self._bounds, self._base_margin
+
+    @staticmethod
+    def _margins(booster: xgb.Booster, X: np.ndarray, start: int, end: int) -> np.ndarray:
+        margins = booster.inplace_predict(X, predict_type="margin", iteration_range=(start, end), validate_features=False)
+        # Binary models return one margin per row; expand to two classes
+        if margins.ndim == 1:
+            margins = np.stack([np.zeros_like(margins), margins], axis=1)
+        return margins
+
+    def predict(self, feature_vector: np.ndarray, budget: Optional[float] = None) -> Dict:
+        """
+        Class probabilities for one encoded symptom set
+
+        Args:
+            feature_vector: Shape (1, n_features)
+            budget: Seconds after which to return the current stage's answer
+
+        Returns:
+            Dict with `probabilities`, `rounds` evaluated, `total_rounds` and `stop`
+            (decisive, budget or full)
+        """
+        started = time.perf_counter()
+        booster = self.booster()
+        bounds, base_margin = self._plan()
+        X = np.asarray(feature_vector, dtype=np.float32).reshape(1, -1)
+
+        with observe("anytime_predict"):
+            margins = None
+            previous = 0
+            stop = STOP_FULL
+            for end in bounds:
+                stage = self._margins(booster, X, previous, end)
+                margins = stage if margins is None else margins + stage - base_margin
+                previous = end
+                if end == bounds[-1]:
+                    break
+                top2 = np.partition(margins[0], -2)[-2:]
+                if top2[1] - top2[0] >= self.min_margin:
+                    stop = STOP_DECISIVE
+                    break
+                if budget is not None and time.perf_counter() - started >= budget:
+                    stop = STOP_BUDGET
+                    break
+
+        probabilities = softmax(margins)[0]
+        ANYTIME_ROUNDS.labels(stop).observe(previous / bounds[-1])
+
+        if stop != STOP_FULL and self.sample_rate > 0 and random.random() < self.sample_rate:
+            full = self._margins(booster, X, 0, bounds[-1])[0]
+            agrees = int(np.argmax(full)) == int(np.argmax(probabilities))
+            ANYTIME_AGREEMENT.labels("agree" if agrees else "disagree").inc()
+
+        return {
+            "probabilities": probabilities,
+            "rounds": previous,
+            "total_rounds": bounds[-1],
+            "stop": stop,
+        }
@@ -1,71 +1,26 @@
 import argparse
 import json
-import os
 from typing import List, Dict, Any
 
-import numpy as np
-import xgboost as xgb
-from sklearn.preprocessing import LabelEncoder
+from symptom_core import Predictor, get_predictor
 
 
-def load_artifacts(prefix: str):
-    """Load the trained model artifacts."""
-    model_path = f"{prefix}.json"
-    labels_path = f"{prefix}.labels.npy"
-    features_path = f"{prefix}.features.txt"
-
-    if not (os.path.exists(model_path) and os.path.exists(labels_path) and os.path.exists(features_path)):
-        raise FileNotFoundError(f"Missing artifacts. Expected: {model_path}, {labels_path}, {features_path}")
-
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
-
-    label_encoder = LabelEncoder()
-    classes = np.load(labels_path, allow_pickle=True)
-    label_encoder.classes_ = classes
-
-    with open(features_path, "r", encoding="utf-8") as f:
-        feature_names = [line.strip() for line in f if line.strip()]
-
-    return model, label_encoder, feature_names
-
-
-def build_feature_vector(symptom_names: List[str], selected_symptoms: List[str]) -> np.ndarray:
-    """Convert symptom list to feature vector."""
-    features = np.zeros(len(symptom_names), dtype=float)
-    name_to_index = {name.lower().strip(): idx for idx, name in enumerate(symptom_names)}
-    
-    for symptom in selected_symptoms:
-        key = symptom.lower().strip()
-        if key in name_to_index:
-            features[name_to_index[key]] = 1.0
-    
-    return features.reshape(1, -1)
-
-
-def predict_symptoms_json(symptoms: List[str], model, label_encoder, feature_names: List[str]) -> Dict[str, Any]:
+def predict_symptoms_json(symptoms: List[str], predictor: Predictor) -> Dict[str, Any]:
     """Return predictions in JSON format for API integration."""
     if not symptoms:
         return {"error": "No symptoms provided"}
     
-    # Build feature vector
-    x = build_feature_vector(feature_names, symptoms)
-    
-    # Get predictions
-    proba = model.predict_proba(x)[0]
-    top3_idx = np.argsort(proba)[-3:][::-1]
-    
-    # Format results
-    predictions = []
-    for rank, idx in enumerate(top3_idx, 1):
-        disease_name = label_encoder.inverse_transform([idx])[0]
-        confidence = float(proba[idx])
-        predictions.append({
-            "rank": rank,
-            "disease": disease_name,
-            "confidence": confidence,
-            "confidence_percent": round(confidence * 100, 2)
-        })
+    predictions = [
+        {
+            "rank": p.rank,
+            "disease": p.disease,
+            "confidence": p.confidence,
+            "confidence_percent": round(p.confidence * 100, 2)
+        }
+        for p in predictor.predict(symptoms, top_k=3)
+    ]
+    if not predictions:
+        return {"error": "No confident prediction", "input_symptoms": symptoms}
     
     return {
         "input_symptoms": symptoms,
@@ -75,37 +30,28 @@ def predict_symptoms_json(symptoms: List[str], model, label_encoder, feature_nam
     }
 
 
-def predict_symptoms_csv(symptoms: List[str], model, label_encoder, feature_names: List[str]) -> str:
+def predict_symptoms_csv(symptoms: List[str], predictor: Predictor) -> str:
     """Return predictions in CSV format."""
     if not symptoms:
         return "error,No symptoms provided"
     
-    x = build_feature_vector(feature_names, symptoms)
-    proba = model.predict_proba(x)[0]
-    top3_idx = np.argsort(proba)[-3:][::-1]
-    
     csv_lines = ["rank,disease,confidence,confidence_percent"]
-    for rank, idx in enumerate(top3_idx, 1):
-        disease_name = label_encoder.inverse_transform([idx])[0]
-        confidence = proba[idx]
-        csv_lines.append(f"{rank},{disease_name},{confidence:.4f},{confidence*100:.2f}")
+    for p in predictor.predict(symptoms, top_k=3):
+        csv_lines.append(f"{p.rank},{p.disease},{p.confidence:.4f},{p.confidence*100:.2f}")
     
     return "\n".join(csv_lines)
 
 
-def predict_symptoms_simple(symptoms: List[str], model, label_encoder, feature_names: List[str]) -> str:
+def predict_symptoms_simple(symptoms: List[str], predictor: Predictor) -> str:
     """Return simple text format."""
     if not symptoms:
         return "Error: No symptoms provided"
     
-    x = build_feature_vector(feature_names, symptoms)
-    proba = model.predict_proba(x)[0]
-    top1_idx = np.argmax(proba)
-    
-    disease_name = label_encoder.inverse_transform([top1_idx])[0]
-    confidence = proba[top1_idx]
+    predictions = predictor.predict(symptoms, top_k=1)
+    if not predictions:
+        return "Error: No confident prediction"
     
-    return f"Diagnosis: {disease_name} (Confidence: {confidence*100:.1f}%)"
+    return f"Diagnosis: {predictions[0].disease} (Confidence: {predictions[0].confidence*100:.1f}%)"
 
 
 def main():
@@ -117,17 +63,17 @@ def main():
 
     try:
         # Load the trained model
-        model, label_encoder, feature_names = load_artifacts(args.artifacts_prefix)
+        predictor = get_predictor(args.artifacts_prefix)
         
         # Get predictions in requested format
         if args.format == "json":
-            result = predict_symptoms_json(args.symptoms, model, label_encoder, feature_names)
+            result = predict_symptoms_json(args.symptoms, predictor)
             print(json.dumps(result, indent=2))
         elif args.format == "csv":
-            result = predict_symptoms_csv(args.symptoms, model, label_encoder, feature_names)
+            result = predict_symptoms_csv(args.symptoms, predictor)
             print(result)
         elif args.format == "simple":
-            result = predict_symptoms_simple(args.symptoms, model, label_encoder, feature_names)
+            result = predict_symptoms_simple(args.symptoms, predictor)
             print(result)
             
     except Exception as e:
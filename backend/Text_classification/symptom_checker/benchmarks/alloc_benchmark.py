@@ -0,0 +1,119 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic_data import generate_dataset  # noqa: E402
+from symptom_checker import train_model  # noqa: E402
+import main as api  # noqa: E402
+from symptom_core import ArtifactSet, Predictor  # noqa: E402
+
+
+def measure(fn: Callable[[], Any], repeats: int, warmup: int = 20) -> Dict[str, float]:
+    """
+    Python-heap allocation per call, as seen by tracemalloc
+
+    `peak_bytes` is the high-water mark above the starting heap during one call (every
+    temporary array counts, even if freed before the call returns); `retained_bytes`
+    is what is still allocated after all calls. Native allocations inside XGBoost are
+    not visible to tracemalloc.
+    """
+    for _ in range(warmup):
+        fn()
+    peaks = []
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    for _ in range(repeats):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peaks.sort()
+    return {
+        "repeats": repeats,
+        "mean_peak_bytes": round(statistics.fmean(peaks), 1),
+        "p50_peak_bytes": peaks[len(peaks) // 2],
+        "max_peak_bytes": peaks[-1],
+        "retained_bytes": end_current - start_current,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    data = generate_dataset(args.rows, args.features, args.classes, args.sparsity, seed=args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, label_encoder, symptom_names = train_model(data)
+    model.set_params(n_jobs=1)
+
+    # The API reads these module globals; point them at the benchmark model
+    api.model = model
+    api.feature_names = symptom_names
+    api.disease_labels = label_encoder.classes_
+    api.predictor = Predictor(ArtifactSet(model, symptom_names, label_encoder.classes_), backend="inplace")
+    scorer = api.predictor.backend.scorer
+
+    columns = np.array(data.columns[1:])
+    rows = data.iloc[:, 1:].values
+    symptom_lists: List[List[str]] = [columns[rows[i] > 0].tolist() for i in rng.integers(0, len(rows), 256)]
+    cursor = {"i": 0}
+
+    def next_symptoms() -> List[str]:
+        cursor["i"] = (cursor["i"] + 1) % len(symptom_lists)
+        return symptom_lists[cursor["i"]]
+
+    def predict_proba_path():
+        vector = api.create_feature_vector(next_symptoms())
+        return model.predict_proba(vector)[0]
+
+    def scorer_path():
+        return scorer.score([api.encode_symptoms(next_symptoms())])[0]
+
+    results = {}
+    # Both paths log matched symptoms; keep stdout out of the measurements
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["predict_proba"] = measure(predict_proba_path, args.repeats)
+        results["buffered_scorer"] = measure(scorer_path, args.repeats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request allocations of the symptom inference paths (tracemalloc).")
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic dataset rows")
+    parser.add_argument("--features", type=int, default=300, help="Number of symptom columns")
+    parser.add_argument("--classes", type=int, default=40, help="Number of diseases")
+    parser.add_argument("--sparsity", type=float, default=0.98, help="Fraction of zero cells")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and sampling")
+    parser.add_argument("--repeats", type=int, default=500, help="Measured calls per path")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON results to this path")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'path':<18}{'mean peak B':>14}{'p50 peak B':>14}{'max peak B':>14}{'retained B':>14}")
+    for name, stats in results.items():
+        print(
+            f"{name:<18}{stats['mean_peak_bytes']:>14.0f}{stats['p50_peak_bytes']:>14}"
+            f"{stats['max_peak_bytes']:>14}{stats['retained_bytes']:>14}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
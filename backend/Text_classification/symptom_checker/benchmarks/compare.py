@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+# (label, path into results, higher is better)
+METRICS: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("artifact load p50 (ms)", ("artifact_load", "p50_ms"), False),
+    ("api encoding p50 (ms)", ("feature_encoding", "api_create_feature_vector", "p50_ms"), False),
+    ("build_feature_vector p50 (ms)", ("feature_encoding", "build_feature_vector", "p50_ms"), False),
+    ("single-row predict p50 (ms)", ("single_row_predict_proba", "p50_ms"), False),
+    ("single-row predict p99 (ms)", ("single_row_predict_proba", "p99_ms"), False),
+    ("top-k format p50 (ms)", ("topk_format", "p50_ms"), False),
+    ("end-to-end p50 (ms)", ("end_to_end_single", "p50_ms"), False),
+    ("end-to-end p99 (ms)", ("end_to_end_single", "p99_ms"), False),
+    ("anytime p50 (ms)", ("anytime", "latency", "p50_ms"), False),
+    ("anytime agreement rate", ("anytime", "agreement_rate"), True),
+    ("peak RSS (bytes)", ("memory", "peak_rss_bytes"), False),
+]
+
+
+def _lookup(results: Dict[str, Any], path: Tuple[str, ...]):
+    value: Any = results
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Compare two benchmark reports
+
+    Returns:
+        (rows with baseline/candidate/change per metric, whether any metric regressed by more than `threshold`)
+    """
+    rows = []
+    metrics = list(METRICS)
+    base_batches = {b["batch_size"]: b for b in baseline["results"].get("batch_throughput", [])}
+    for b in candidate["results"].get("batch_throughput", []):
+        if b["batch_size"] in base_batches:
+            metrics.append((f"batch {b['batch_size']} rows/s", ("batch_throughput", str(b["batch_size"]), "rows_per_second"), True))
+
+    def value_of(report, path):
+        if path[0] == "batch_throughput":
+            for b in report["results"].get("batch_throughput", []):
+                if str(b["batch_size"]) == path[1]:
+                    return b.get(path[2])
+            return None
+        return _lookup(report["results"], path)
+
+    regressed = False
+    for label, path, higher_is_better in metrics:
+        old = value_of(baseline, path)
+        new = value_of(candidate, path)
+        if old is None or new is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        is_regression = worse > threshold
+        regressed = regressed or is_regression
+        rows.append({"metric": label, "baseline": old, "candidate": new, "change": change, "regression": is_regression})
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports.")
+    parser.add_argument("baseline", help="Report from the reference commit")
+    parser.add_argument("candidate", help="Report from the commit under test")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    if baseline.get("config") != candidate.get("config"):
+        print("⚠️  Reports were produced with different configs; numbers may not be comparable")
+
+    print(f"Baseline:  {baseline['meta'].get('git_commit')}")
+    print(f"Candidate: {candidate['meta'].get('git_commit')}")
+    rows, regressed = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        marker = "❌" if row["regression"] else "  "
+        print(f"{marker} {row['metric']:<32} {row['baseline']:>14} -> {row['candidate']:>14} ({row['change'] * 100:+.1f}%)")
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
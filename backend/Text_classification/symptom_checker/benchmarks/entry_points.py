@@ -0,0 +1,194 @@
+"""
+Latency and agreement of every symptom prediction entry point
+
+All entry points (the FastAPI services, the CLI helpers and the symptom_core batch
+and stream APIs) score through one shared symptom_core Predictor. This runs the same
+sampled symptom lists through each of them against one synthetic model, reports
+per-symptom-set latency with the prediction cache cleared before every call (so
+scoring, not cache hits, is measured), and checks that every entry point returns the
+same ranked diseases as `Predictor.predict`.
+
+    python benchmarks/entry_points.py --output benchmarks/results/entry_points.json
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic_data import generate_dataset  # noqa: E402
+from symptom_checker import save_artifacts, train_model  # noqa: E402
+from symptom_core import BACKENDS, Predictor, get_predictor, load_artifact_set  # noqa: E402
+import api_symptom_checker  # noqa: E402
+import main as api  # noqa: E402
+import main_old  # noqa: E402
+import symptom_core  # noqa: E402
+
+
+def load_text_classification_service():
+    """
+    backend/Text_classification/main.py, which shares the module name `main` with this service
+
+    It imports `symptom_checker.symptom_core`. Here `symptom_checker` is the CLI
+    module on sys.path, not the directory, so that name is pointed at the copy this
+    process already loaded.
+    """
+    sys.modules.setdefault("symptom_checker.symptom_core", symptom_core)
+    path = os.path.join(os.path.dirname(os.path.dirname(HERE)), "main.py")
+    spec = importlib.util.spec_from_file_location("text_classification_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_per_item(
+    fn: Callable[[Sequence[List[str]]], List[List[str]]],
+    symptom_lists: List[List[str]],
+    chunk: int,
+    clear: Callable[[], None],
+) -> Dict[str, Any]:
+    """
+    Run `fn` over `symptom_lists` in chunks and summarize latency per symptom set in milliseconds
+
+    `fn` returns the ranked disease names per input; `clear` runs untimed before each chunk.
+    """
+    samples, ranked = [], []
+    for start in range(0, len(symptom_lists), chunk):
+        batch = symptom_lists[start:start + chunk]
+        clear()
+        began = time.perf_counter_ns()
+        ranked.extend(fn(batch))
+        samples.append((time.perf_counter_ns() - began) / 1e6 / len(batch))
+    samples.sort()
+    return {
+        "items": len(symptom_lists),
+        "chunk": chunk,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "ranked": ranked,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    data = generate_dataset(args.rows, args.features, args.classes, args.sparsity, seed=args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, label_encoder, symptom_names = train_model(data)
+    if args.threads:
+        model.set_params(n_jobs=args.threads)
+
+    columns = np.array(data.columns[1:])
+    rows = data.iloc[:, 1:].values
+    symptom_lists: List[List[str]] = [columns[rows[i] > 0].tolist() for i in rng.integers(0, len(rows), args.repeats)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, "symptom_model")
+        save_artifacts(model, label_encoder, symptom_names, prefix)
+        predictor = get_predictor(prefix, backend=args.backend)
+        # Same artifacts through the other backends, for comparison
+        alternates = {name: Predictor(load_artifact_set(prefix), backend=name) for name in sorted(BACKENDS) if name != args.backend}
+
+    # The FastAPI service reads these module globals; point them at the shared predictor
+    api.predictor = predictor
+    api.model = predictor.artifacts.model
+    api.feature_names = predictor.feature_names
+    api.disease_labels = predictor.artifacts.labels
+    text_service = load_text_classification_service()
+
+    def names(predictions) -> List[str]:
+        return [p.disease for p in predictions]
+
+    # One loop for all calls: the endpoint is a coroutine, loop setup is not part of a request
+    loop = asyncio.new_event_loop()
+
+    def service_check(batch):
+        responses = [loop.run_until_complete(api.check_symptoms(api.SymptomRequest(symptoms=s))) for s in batch]
+        return [[p.disease for p in r.predictions] for r in responses]
+
+    entry_points: Dict[str, Callable[[Sequence[List[str]]], List[List[str]]]] = {
+        "core.predict": lambda batch: [names(predictor.predict(s)) for s in batch],
+        "core.predict_batch": lambda batch: [names(p) for p in predictor.predict_batch(batch)],
+        "core.predict_stream": lambda batch: [names(p) for p in predictor.predict_stream(iter(batch), batch_size=args.stream_batch)],
+        "service.check_symptoms": service_check,
+        "text_classification.get_predictions": lambda batch: [
+            [p["disease"] for p in text_service.get_predictions(s, predictor)["predictions"]] for s in batch
+        ],
+        "main_old.get_predictions": lambda batch: [
+            [p["disease"] for p in main_old.get_predictions(s, predictor)["predictions"]] for s in batch
+        ],
+        "cli.predict_symptoms_json": lambda batch: [
+            [p["disease"] for p in api_symptom_checker.predict_symptoms_json(s, predictor).get("top_predictions", [])] for s in batch
+        ],
+    }
+    for name, alternate in alternates.items():
+        entry_points[f"core.predict[{name}]"] = lambda batch, alternate=alternate: [names(alternate.predict(s)) for s in batch]
+
+    results = {}
+    batched = {"core.predict_batch", "core.predict_stream"}
+    # The service logs matched symptoms; keep stdout out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, fn in entry_points.items():
+            clear = alternates[name[len("core.predict["):-1]].cache.clear if name.endswith("]") else predictor.cache.clear
+            fn(symptom_lists[:args.warmup])
+            results[name] = time_per_item(fn, symptom_lists, args.batch if name in batched else 1, clear)
+    loop.close()
+
+    # Top-k lists shorter than the reference (the CLI shows 3) are compared on their length
+    reference = results["core.predict"]["ranked"]
+    for name, stats in results.items():
+        ranked = stats.pop("ranked")
+        stats["top1_agreement"] = round(statistics.fmean(
+            bool(a) == bool(b) and (not a or a[0] == b[0]) for a, b in zip(ranked, reference)
+        ), 4)
+        stats["ranking_agreement"] = round(statistics.fmean(
+            a == b[:len(a)] if len(a) < len(b) else a == b for a, b in zip(ranked, reference)
+        ), 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and agreement of every symptom prediction entry point.")
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic dataset rows")
+    parser.add_argument("--features", type=int, default=300, help="Number of symptom columns")
+    parser.add_argument("--classes", type=int, default=40, help="Number of diseases")
+    parser.add_argument("--sparsity", type=float, default=0.98, help="Fraction of zero cells")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and sampling")
+    parser.add_argument("--repeats", type=int, default=512, help="Symptom lists run through each entry point")
+    parser.add_argument("--warmup", type=int, default=32, help="Untimed symptom lists per entry point")
+    parser.add_argument("--batch", type=int, default=64, help="Symptom lists per call for the batch and stream APIs")
+    parser.add_argument("--stream-batch", type=int, default=16, help="batch_size passed to predict_stream")
+    parser.add_argument("--backend", type=str, default="inplace", help="Backend of the shared predictor")
+    parser.add_argument("--threads", type=int, default=0, help="XGBoost threads (0 = library default)")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON results to this path")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'entry point':<38}{'chunk':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'top-1 agree':>13}{'ranking agree':>15}")
+    for name, stats in results.items():
+        print(
+            f"{name:<38}{stats['chunk']:>7}{stats['mean_ms']:>10.4f}{stats['p50_ms']:>10.4f}{stats['p95_ms']:>10.4f}"
+            f"{stats['top1_agreement']:>13.2%}{stats['ranking_agreement']:>15.2%}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
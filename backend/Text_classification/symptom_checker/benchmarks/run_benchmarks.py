@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from synthetic_data import generate_dataset  # noqa: E402
+from anytime import AnytimePredictor  # noqa: E402
+from symptom_checker import build_feature_vector, load_artifacts, save_artifacts, train_model  # noqa: E402
+import main as api  # noqa: E402
+from symptom_core import ArtifactSet, Predictor  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
+DEFAULT_BATCH_SIZES = [1, 8, 32, 128, 512, 2048]
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, if it can be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def time_calls(fn: Callable[[], Any], repeats: int, warmup: int = 10) -> Dict[str, float]:
+    """Call `fn` repeatedly and summarize per-call latency in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    samples.sort()
+    return {
+        "repeats": repeats,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 4),
+        "min_ms": round(samples[0], 4),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def sample_symptoms(data, rng: np.random.Generator, count: int) -> List[List[str]]:
+    """Symptom name lists taken from real rows, as a client would send them"""
+    columns = np.array(data.columns[1:])
+    rows = data.iloc[:, 1:].values
+    picks = rng.integers(0, len(rows), count)
+    return [columns[rows[i] > 0].tolist() for i in picks]
+
+
+def run(args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    results: Dict[str, Any] = {}
+
+    print("Generating dataset...")
+    data = generate_dataset(args.rows, args.features, args.classes, args.sparsity, seed=args.seed)
+    feature_names = data.columns[1:].tolist()
+
+    print("Training model...")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, label_encoder, symptom_names = train_model(data)
+    results["train_seconds"] = round(time.perf_counter() - start, 3)
+    if args.threads:
+        model.set_params(n_jobs=args.threads)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, "symptom_model")
+        paths = save_artifacts(model, label_encoder, symptom_names, prefix)
+        results["artifact_bytes"] = {os.path.basename(p): os.path.getsize(p) for p in paths}
+
+        print("Measuring artifact load time...")
+        gc.collect()
+        rss_before = rss_bytes()
+        loaded, loaded_encoder, loaded_features = load_artifacts(prefix)
+        rss_after = rss_bytes()
+        results["artifact_load"] = time_calls(lambda: load_artifacts(prefix), args.load_repeats, warmup=1)
+
+    if args.threads:
+        loaded.set_params(n_jobs=args.threads)
+    booster = loaded.get_booster()
+    results["memory"] = {
+        "rss_bytes": rss_after,
+        "model_load_rss_delta_bytes": None if rss_before is None or rss_after is None else rss_after - rss_before,
+        "booster_raw_bytes": len(booster.save_raw("ubj")),
+        "trees": len(booster.get_dump()),
+    }
+
+    # The API reads these module globals; point them at the benchmark model
+    api.model = loaded
+    api.feature_names = loaded_features
+    api.disease_labels = loaded_encoder.classes_
+    api.predictor = Predictor(ArtifactSet(loaded, loaded_features, loaded_encoder.classes_))
+
+    symptom_lists = sample_symptoms(data, rng, args.repeats)
+    cursor = {"i": 0}
+
+    def next_symptoms() -> List[str]:
+        cursor["i"] = (cursor["i"] + 1) % len(symptom_lists)
+        return symptom_lists[cursor["i"]]
+
+    print("Measuring feature encoding...")
+    # create_feature_vector logs every match; keep stdout out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["feature_encoding"] = {
+            "api_create_feature_vector": time_calls(lambda: api.create_feature_vector(next_symptoms()), args.repeats),
+            "build_feature_vector": time_calls(lambda: build_feature_vector(feature_names, next_symptoms()), args.repeats),
+        }
+
+    print("Measuring single-row latency...")
+    row = build_feature_vector(feature_names, symptom_lists[0])
+    results["single_row_predict_proba"] = time_calls(lambda: loaded.predict_proba(row), args.repeats)
+
+    print("Measuring top-k formatting...")
+    probabilities = loaded.predict_proba(row)[0]
+    results["topk_format"] = time_calls(lambda: api.format_predictions(probabilities), args.repeats)
+
+    print("Measuring end-to-end single request...")
+
+    def end_to_end():
+        vector = api.create_feature_vector(next_symptoms())
+        api.format_predictions(loaded.predict_proba(vector)[0])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["end_to_end_single"] = time_calls(end_to_end, args.repeats)
+
+    X_all = data.iloc[:, 1:].values.astype(np.float32)
+
+    print("Measuring anytime inference...")
+    rows = X_all[rng.integers(0, len(X_all), args.repeats)]
+    anytime = AnytimePredictor(lambda: booster, sample_rate=0.0)
+    full_top1 = np.argmax(loaded.predict_proba(rows), axis=1)
+    outcomes = [anytime.predict(rows[i:i + 1]) for i in range(len(rows))]
+    stops: Dict[str, int] = {}
+    for outcome in outcomes:
+        stops[outcome["stop"]] = stops.get(outcome["stop"], 0) + 1
+    row_cursor = {"i": 0}
+
+    def next_row() -> np.ndarray:
+        row_cursor["i"] = (row_cursor["i"] + 1) % len(rows)
+        return rows[row_cursor["i"]:row_cursor["i"] + 1]
+
+    results["anytime"] = {
+        "agreement_rate": round(float(np.mean([np.argmax(o["probabilities"]) == t for o, t in zip(outcomes, full_top1)])), 4),
+        "mean_rounds_fraction": round(float(np.mean([o["rounds"] / o["total_rounds"] for o in outcomes])), 4),
+        "stops": stops,
+        "min_margin": anytime.min_margin,
+        "stages": anytime.stages,
+        "latency": time_calls(lambda: anytime.predict(next_row()), args.repeats),
+        "full_latency": time_calls(lambda: loaded.predict_proba(next_row()), args.repeats),
+    }
+
+    print("Measuring batch throughput...")
+    throughput = []
+    peak_rss = rss_bytes()
+    for batch_size in args.batch_sizes:
+        picks = rng.integers(0, len(X_all), batch_size)
+        batch = X_all[picks]
+        repeats = max(5, min(args.repeats, (args.repeats * 32) // batch_size))
+        stats = time_calls(lambda: loaded.predict_proba(batch), repeats, warmup=3)
+        stats["batch_size"] = batch_size
+        stats["rows_per_second"] = round(batch_size / (stats["p50_ms"] / 1000), 1) if stats["p50_ms"] > 0 else None
+        throughput.append(stats)
+        current = rss_bytes()
+        if current is not None and (peak_rss is None or current > peak_rss):
+            peak_rss = current
+    results["batch_throughput"] = throughput
+    results["memory"]["peak_rss_bytes"] = peak_rss
+
+    return results
+
+
+def build_report(args, results: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "xgboost": xgb.__version__,
+            "numpy": np.__version__,
+        },
+        "config": {
+            "rows": args.rows,
+            "features": args.features,
+            "classes": args.classes,
+            "sparsity": args.sparsity,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "batch_sizes": args.batch_sizes,
+            "threads": args.threads,
+        },
+        "results": results,
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    results = report["results"]
+    print("\n" + "=" * 60)
+    print("📊 Symptom inference benchmark")
+    print("=" * 60)
+    print(f"Commit: {report['meta']['git_commit']}")
+    print(f"Train: {results['train_seconds']:.2f} s, trees: {results['memory']['trees']}")
+    print(f"Artifact load p50: {results['artifact_load']['p50_ms']:.2f} ms")
+    for name, stats in results["feature_encoding"].items():
+        print(f"Encoding ({name}) p50: {stats['p50_ms']:.4f} ms")
+    print(f"Single-row predict_proba p50/p99: {results['single_row_predict_proba']['p50_ms']:.3f} / {results['single_row_predict_proba']['p99_ms']:.3f} ms")
+    print(f"Top-k format p50: {results['topk_format']['p50_ms']:.4f} ms")
+    print(f"End-to-end single p50/p99: {results['end_to_end_single']['p50_ms']:.3f} / {results['end_to_end_single']['p99_ms']:.3f} ms")
+    anytime = results["anytime"]
+    print(
+        f"Anytime p50: {anytime['latency']['p50_ms']:.3f} ms vs full {anytime['full_latency']['p50_ms']:.3f} ms, "
+        f"{anytime['mean_rounds_fraction'] * 100:.0f}% of rounds, agreement {anytime['agreement_rate'] * 100:.1f}%"
+    )
+    print("Batch throughput:")
+    for stats in results["batch_throughput"]:
+        print(f"  batch {stats['batch_size']:>5}: p50 {stats['p50_ms']:.3f} ms, {stats['rows_per_second']} rows/s")
+    rss = results["memory"]["peak_rss_bytes"]
+    if rss is not None:
+        print(f"Peak RSS: {rss / 2**20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark symptom inference on a synthetic dataset.")
+    parser.add_argument("--rows", type=int, default=5000, help="Synthetic dataset rows")
+    parser.add_argument("--features", type=int, default=300, help="Number of symptom columns")
+    parser.add_argument("--classes", type=int, default=40, help="Number of diseases")
+    parser.add_argument("--sparsity", type=float, default=0.98, help="Fraction of zero cells")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and sampling")
+    parser.add_argument("--repeats", type=int, default=500, help="Timed calls per single-row measurement")
+    parser.add_argument("--load-repeats", type=int, default=10, help="Timed artifact loads")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES, help="Batch sizes to measure")
+    parser.add_argument("--threads", type=int, default=None, help="XGBoost n_jobs for inference (default: library default)")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = build_report(args, results)
+    print_summary(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
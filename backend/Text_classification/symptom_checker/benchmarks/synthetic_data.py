@@ -0,0 +1,92 @@
+import argparse
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+TARGET_COLUMN = "diseases"
+
+
+def symptom_columns(n_features: int) -> List[str]:
+    """Feature column names, standardized like preprocess_data.py output"""
+    return [f"symptom_{i:04d}" for i in range(n_features)]
+
+
+def generate_dataset(
+    n_rows: int = 5000,
+    n_features: int = 300,
+    n_classes: int = 40,
+    sparsity: float = 0.98,
+    signal: float = 0.8,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Generate a synthetic symptom dataset in the cleaned CSV schema
+
+    The first column is the disease label, the remaining columns are 0/1 symptom
+    indicators. Each disease has a fixed set of characteristic symptoms that are
+    present with probability `signal`; background noise fills the rest so that the
+    overall fraction of zeros is close to `sparsity`.
+
+    Args:
+        n_rows: Number of records
+        n_features: Number of symptom columns
+        n_classes: Number of diseases
+        sparsity: Target fraction of zero cells
+        signal: Probability that a characteristic symptom is present
+        seed: Random seed; the same arguments always produce the same dataset
+
+    Returns:
+        DataFrame with TARGET_COLUMN followed by the symptom columns
+    """
+    if not 0.0 < sparsity < 1.0:
+        raise ValueError("sparsity must be between 0 and 1 (exclusive)")
+    if n_rows < 5 * n_classes:
+        raise ValueError("Need at least 5 rows per class so every class survives preprocessing")
+
+    rng = np.random.default_rng(seed)
+    density = 1.0 - sparsity
+    per_class = max(1, int(round(n_features * density)))
+
+    # Characteristic symptoms per disease
+    prototypes = np.zeros((n_classes, n_features), dtype=bool)
+    for c in range(n_classes):
+        prototypes[c, rng.choice(n_features, size=per_class, replace=False)] = True
+
+    # Every class gets at least 5 rows (the limit_classes threshold), the rest at random
+    labels = np.concatenate([np.repeat(np.arange(n_classes), 5), rng.integers(0, n_classes, n_rows - 5 * n_classes)])
+    rng.shuffle(labels)
+
+    # Background noise rate that keeps the expected density on target
+    noise = max(0.0, (density - per_class * signal / n_features) / (1.0 - per_class / n_features))
+    signal_mask = prototypes[labels] & (rng.random((n_rows, n_features)) < signal)
+    noise_mask = rng.random((n_rows, n_features)) < noise
+    X = (signal_mask | noise_mask).astype(np.int8)
+
+    # preprocess_data.py drops rows without any symptom; keep the schema equally clean
+    empty = X.sum(axis=1) == 0
+    X[empty, rng.integers(0, n_features, int(empty.sum()))] = 1
+
+    data = pd.DataFrame(X, columns=symptom_columns(n_features))
+    data.insert(0, TARGET_COLUMN, [f"disease_{c:03d}" for c in labels])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic symptom dataset (cleaned CSV schema).")
+    parser.add_argument("--output", default="synthetic_dataset.csv", help="Path to save the CSV")
+    parser.add_argument("--rows", type=int, default=5000, help="Number of records")
+    parser.add_argument("--features", type=int, default=300, help="Number of symptom columns")
+    parser.add_argument("--classes", type=int, default=40, help="Number of diseases")
+    parser.add_argument("--sparsity", type=float, default=0.98, help="Fraction of zero cells")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    data = generate_dataset(args.rows, args.features, args.classes, args.sparsity, seed=args.seed)
+    data.to_csv(args.output, index=False)
+    density = data.iloc[:, 1:].values.mean()
+    print(f"Saved {data.shape} to {args.output} (density {density:.4f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import bisect
+import gzip
+import hashlib
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi.responses import Response
+
+from symptom_core.symptom_matcher import normalize
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def artifact_checksum(paths: Iterable[str]) -> str:
+    """SHA-256 over the model artifacts, so the catalog version changes whenever they do"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class SymptomCatalog:
+    """
+    Precomputed symptom vocabulary responses and prefix completion
+
+    The JSON bodies for /api/symptoms and the legacy /symptoms are serialized and
+    compressed once at load time. Each variant gets a strong ETag derived from the
+    artifact checksum, so clients holding the current vocabulary get a bodyless 304.
+    """
+
+    def __init__(self, feature_names: List[str], checksum: str):
+        """
+        Args:
+            feature_names: Model feature names
+            checksum: Artifact checksum (see artifact_checksum)
+        """
+        self.feature_names = list(feature_names)
+        self.version = checksum[:32]
+        self._bodies: Dict[Tuple[str, str], bytes] = {}
+        documents = {
+            "api": {"success": True, "symptoms": self.feature_names, "total_symptoms": len(self.feature_names), "error": None},
+            "legacy": {"symptoms": self.feature_names},
+        }
+        for variant, document in documents.items():
+            raw = json.dumps(document, separators=(",", ":")).encode("utf-8")
+            self._bodies[(variant, "identity")] = raw
+            # mtime=0 keeps the gzip bytes (and so the ETag's meaning) identical across restarts
+            self._bodies[(variant, "gzip")] = gzip.compress(raw, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self._bodies[(variant, "br")] = brotli.compress(raw)
+
+        # Sorted (key, name) arrays for prefix search: whole names, and names by each later word
+        names = sorted((normalize(name), name) for name in self.feature_names)
+        words = sorted(
+            (" ".join(tokens[i:]), name)
+            for key, name in names
+            for tokens in [key.split()]
+            for i in range(1, len(tokens))
+        )
+        self._name_keys = [key for key, _ in names]
+        self._name_values = [name for _, name in names]
+        self._word_keys = [key for key, _ in words]
+        self._word_values = [name for _, name in words]
+
+    def etag(self, variant: str, encoding: str) -> str:
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.version}-{variant}{suffix}"'
+
+    def response(self, variant: str, accept_encoding: str = "", if_none_match: str = "") -> Response:
+        """
+        Catalog response for a request
+
+        Args:
+            variant: "api" or "legacy"
+            accept_encoding: The request's Accept-Encoding header
+            if_none_match: The request's If-None-Match header
+
+        Returns:
+            304 if the client already has this version, otherwise the precomputed body
+        """
+        encoding = self._pick_encoding(accept_encoding)
+        etag = self.etag(variant, encoding)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+        # Any encoding of the current version is up to date
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",") if tag.strip()}
+        if "*" in tags or any(tag.startswith(f'"{self.version}-{variant}') for tag in tags):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self._bodies[(variant, encoding)], media_type="application/json", headers=headers)
+
+    def complete(self, query: str, limit: int = 10) -> List[str]:
+        """
+        Symptoms starting with `query`, then symptoms with a later word starting with it
+
+        Args:
+            query: Typed prefix
+            limit: Maximum results
+
+        Returns:
+            Feature names, whole-name matches first, each group in alphabetical order
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        results: List[str] = []
+        seen = set()
+        for keys, values in ((self._name_keys, self._name_values), (self._word_keys, self._word_values)):
+            i = bisect.bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix) and len(results) < limit:
+                if values[i] not in seen:
+                    seen.add(values[i])
+                    results.append(values[i])
+                i += 1
+        return results
+
+    def _pick_encoding(self, header: str) -> str:
+        accepted = _accepted_encodings(header or "")
+        for encoding in ("br", "gzip"):
+            if ("api", encoding) in self._bodies and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return "identity"
+
@@ -0,0 +1,169 @@
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from metrics import QUEUE_DEPTH, observe
+from symptom_core.prediction_cache import LRUCache
+
+Key = Tuple[int, ...]
+
+
+class ContributionBatcher:
+    """
+    Computes TreeSHAP contributions for concurrent requests in shared batches
+
+    Callers await `contributions(key)`. Results are cached by symptom key; misses are
+    queued, and a single worker drains up to `max_batch` distinct keys (waiting at most
+    `max_wait` seconds for more to arrive) into one `pred_contribs` call run in the
+    default executor. Identical keys in flight share one computation.
+    """
+
+    def __init__(
+        self,
+        booster: Callable[[], xgb.Booster],
+        n_features: Callable[[], int],
+        cache: Optional[LRUCache] = None,
+        max_batch: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        """
+        Args:
+            booster: Returns the current booster
+            n_features: Returns the model's feature count
+            cache: Cache for contribution matrices
+            max_batch: Maximum distinct symptom sets per pred_contribs call
+            max_wait: Seconds to wait for a batch to fill
+        """
+        self.booster = booster
+        self.n_features = n_features
+        self.cache = cache or LRUCache("explanations", int(os.getenv("SYMPTOM_EXPLAIN_CACHE_SIZE", "2000")))
+        self.max_batch = max_batch or int(os.getenv("SYMPTOM_EXPLAIN_MAX_BATCH", "32"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("SYMPTOM_EXPLAIN_MAX_WAIT", "0.005"))
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Key, asyncio.Future] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    async def contributions(self, key: Key) -> np.ndarray:
+        """
+        Contributions for one symptom set
+
+        Returns:
+            Array of shape (n_classes, n_features + 1); the last column is the bias.
+            Values are in margin (log-odds) space and sum to the class margin.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._pending.get(key)
+        if future is None:
+            self._ensure_worker()
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._queue.put_nowait(key)
+            QUEUE_DEPTH.labels("explain").set(self._queue.qsize())
+        # shield: one caller going away must not cancel the shared result
+        return await asyncio.shield(future)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            keys = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(keys) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    keys.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            QUEUE_DEPTH.labels("explain").set(self._queue.qsize())
+
+            try:
+                results = await loop.run_in_executor(None, self._compute, keys)
+            except Exception as e:
+                for key in keys:
+                    future = self._pending.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+
+            for key, contribs in zip(keys, results):
+                # Copy so a cached row does not keep the whole batch array alive
+                contribs = contribs.copy()
+                self.cache.put(key, contribs)
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(contribs)
+
+    def _compute(self, keys: List[Key]) -> np.ndarray:
+        X = np.zeros((len(keys), self.n_features()), dtype=np.float32)
+        for row, key in enumerate(keys):
+            X[row, list(key)] = 1.0
+        with observe("pred_contribs"):
+            contribs = self.booster().predict(xgb.DMatrix(X), pred_contribs=True, validate_features=False)
+        # Binary models return (rows, features + 1); give every model a class axis
+        if contribs.ndim == 2:
+            contribs = contribs[:, np.newaxis, :]
+        return contribs
+
+
+def explain_classes(
+    contribs: np.ndarray,
+    key: Key,
+    classes: List[int],
+    feature_names: List[str],
+) -> List[Dict]:
+    """
+    Per-symptom contributions for the given classes
+
+    Args:
+        contribs: (n_classes, n_features + 1) contribution matrix
+        key: Present feature indices
+        classes: Class indices to explain, in output order
+        feature_names: Model feature names
+
+    Returns:
+        One dict per class with the bias, the contribution of each present symptom
+        (largest magnitude first) and the summed contribution of absent symptoms
+    """
+    present = list(key)
+    explanations = []
+    for class_idx in classes:
+        if contribs.shape[0] == 1:
+            # Binary model: one margin for class 1, negated for class 0
+            row = contribs[0] if class_idx == 1 else -contribs[0]
+        else:
+            row = contribs[class_idx]
+        symptom_contribs = sorted(
+            ({"symptom": feature_names[i], "contribution": round(float(row[i]), 6)} for i in present),
+            key=lambda item: abs(item["contribution"]),
+            reverse=True,
+        )
+        total = float(row[:-1].sum())
+        present_total = float(row[present].sum()) if present else 0.0
+        explanations.append({
+            "class_index": class_idx,
+            "bias": round(float(row[-1]), 6),
+            "contributions": symptom_contribs,
+            "absent_symptoms_contribution": round(total - present_total, 6),
+        })
+    return explanations
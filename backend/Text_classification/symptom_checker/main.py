@@ -1,12 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import json
 import numpy as np
-import xgboost as xgb
 import os
+import sys
 from pathlib import Path
+from anytime import STOP_FULL, AnytimePredictor
+from catalog import SymptomCatalog, artifact_checksum
+from explain import ContributionBatcher, explain_classes
+from metrics import ERRORS, HTTP_LATENCY, MATCHED_SYMPTOMS, WARMUP_SECONDS, observe, render_metrics
+from next_question import QuestionSelector
+from symptom_core.prediction_cache import symptom_key
+from registry import LoadedModel, ModelRegistry
+from sessions import SessionStore, TriageSession
+from shadow import ShadowEvaluator
+from symptom_core import Predictor, get_predictor
+from symptom_core.symptom_matcher import SymptomMatcher
+from triage import HybridTriage, load_llm_analyzer
+
+# Middleware shared with the other backend services
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from service_common.http_metrics import MetricsMiddleware  # noqa: E402
+from service_common.profiling import ProfilingMiddleware  # noqa: E402
+from service_common.readiness import ReadinessGate  # noqa: E402
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,9 +47,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histogram; wraps CORS so preflight responses are counted too
+app.add_middleware(MetricsMiddleware, histogram=HTTP_LATENCY)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); outermost to cover the whole request
+app.add_middleware(ProfilingMiddleware)
+
 # Request/Response models
 class SymptomRequest(BaseModel):
     symptoms: List[str]
+    mode: str = "full"
+    latency_budget_ms: Optional[float] = None
 
 class PredictionResult(BaseModel):
     rank: int
@@ -34,10 +65,114 @@ class PredictionResult(BaseModel):
     confidence: float
     confidence_percent: str
 
+class ExplainRequest(BaseModel):
+    symptoms: List[str]
+    top_k: int = 3
+
+class SymptomContribution(BaseModel):
+    symptom: str
+    contribution: float
+
+class DiseaseExplanation(BaseModel):
+    rank: int
+    disease: str
+    confidence: float
+    bias: float
+    contributions: List[SymptomContribution] = []
+    absent_symptoms_contribution: float
+
+class ExplainResponse(BaseModel):
+    success: bool
+    explanations: List[DiseaseExplanation] = []
+    matched_symptoms: List[str] = []
+    input_symptoms: List[str] = []
+    error: str = None
+
+class NextQuestionRequest(BaseModel):
+    symptoms: List[str] = []
+    asked: List[str] = []
+    top_k: int = 5
+    limit: int = 5
+
+class SuggestedQuestion(BaseModel):
+    symptom: str
+    information_gain: float
+    probability_yes: float
+
+class NextQuestionResponse(BaseModel):
+    success: bool
+    questions: List[SuggestedQuestion] = []
+    matched_symptoms: List[str] = []
+    base_entropy: float = 0.0
+    candidates_scored: int = 0
+    truncated: bool = False
+    error: str = None
+
+class InferenceDetails(BaseModel):
+    rounds: int
+    total_rounds: int
+    stop: str
+
 class SymptomResponse(BaseModel):
     success: bool
     predictions: List[PredictionResult] = []
+    inference: Optional[InferenceDetails] = None
     input_symptoms: List[str] = []
+    matched_symptoms: List[str] = []
+    unmatched_symptoms: List[str] = []
+    error: str = None
+
+class TriageRequest(BaseModel):
+    text: str
+
+class TriageResponse(BaseModel):
+    success: bool
+    path: Optional[str] = None
+    matched_symptoms: List[str] = []
+    predictions: List[PredictionResult] = []
+    llm_analysis: Optional[Dict[str, Any]] = None
+    llm_error: Optional[str] = None
+    error: str = None
+
+class SymptomMatch(BaseModel):
+    symptom: str
+    score: float
+
+class SymptomSearchResponse(BaseModel):
+    success: bool
+    query: str = ""
+    matches: List[SymptomMatch] = []
+    error: str = None
+
+class SymptomCompletionResponse(BaseModel):
+    success: bool
+    query: str = ""
+    completions: List[str] = []
+    error: str = None
+
+class SessionCreateRequest(BaseModel):
+    symptoms: List[str] = []
+
+class SessionUpdateRequest(BaseModel):
+    add: List[str] = []
+    remove: List[str] = []
+
+class SessionResponse(BaseModel):
+    success: bool
+    session_id: Optional[str] = None
+    symptoms: List[str] = []
+    unmatched_symptoms: List[str] = []
+    predictions: List[PredictionResult] = []
+    expires_in: float = 0.0
+    error: str = None
+
+class ModelInfo(BaseModel):
+    name: str
+    loaded: bool
+
+class ModelsListResponse(BaseModel):
+    success: bool
+    models: List[ModelInfo] = []
     error: str = None
 
 class SymptomsListResponse(BaseModel):
@@ -46,52 +181,75 @@ class SymptomsListResponse(BaseModel):
     total_symptoms: int = 0
     error: str = None
 
-# Global variables for model components
+# Global variables for model components (model, vocabulary and labels are the predictor's)
+predictor: Optional[Predictor] = None
 model = None
 feature_names = []
 disease_labels = []
+catalog = None
+triage = None
+shadow = None
+
+# Opens once the model is loaded and warmed up; served by /ready
+readiness = ReadinessGate()
+
+# SHAP contributions keyed by the encoded symptom set (probabilities are cached by the predictor)
+explainer = ContributionBatcher(lambda: model.get_booster(), lambda: len(feature_names))
+
+# Staged evaluation for mode="anytime" requests
+anytime = AnytimePredictor(lambda: model.get_booster())
+
+# Additional named models (region, age group) discovered under SYMPTOM_MODELS_DIR
+registry = ModelRegistry()
+
+# Interactive checks: encoded vector and last prediction per session
+sessions = SessionStore()
+
+# Next-question rankings per symptom set
+question_selector = QuestionSelector(
+    lambda X: model.predict_proba(X),
+    lambda: model.get_booster(),
+    lambda: feature_names,
+)
 
 def load_model_components():
     """Load all model components at startup"""
-    global model, feature_names, disease_labels
+    global predictor, model, feature_names, disease_labels, catalog, triage, shadow
     
     try:
-        # Get current directory
-        current_dir = Path(__file__).parent
-        
-        # Load XGBoost model
-        model_path = current_dir / "symptom_model.json"
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model file not found: {model_path}")
-        
-        model = xgb.XGBClassifier()
-        model.load_model(str(model_path))
-        print(f"✅ Loaded XGBoost model from {model_path}")
-        
-        # Load feature names
-        features_path = current_dir / "symptom_model.features.txt"
-        if not features_path.exists():
-            raise FileNotFoundError(f"Features file not found: {features_path}")
-        
-        with open(features_path, 'r') as f:
-            feature_names = [line.strip() for line in f.readlines()]
-        print(f"✅ Loaded {len(feature_names)} features")
-        
-        # Load disease labels - try different approaches
-        labels_path = current_dir / "symptom_model.labels.npy"
-        if not labels_path.exists():
-            raise FileNotFoundError(f"Labels file not found: {labels_path}")
-        
-        # Try to load labels with different methods
-        try:
-            disease_labels = np.load(str(labels_path), allow_pickle=True)
-            print(f"✅ Loaded {len(disease_labels)} disease labels")
-        except Exception as e:
-            print(f"❌ Failed to load labels with numpy: {e}")
-            # Fallback: create generic labels based on model classes
-            n_classes = model.n_classes_ if hasattr(model, 'n_classes_') else 10
-            disease_labels = [f"Disease_{i}" for i in range(n_classes)]
-            print(f"⚠️ Using fallback labels: {len(disease_labels)} generic disease names")
+        # Model, vocabulary, labels, fuzzy index and probability cache, shared with
+        # any other entry point in this process that loads the same artifacts
+        predictor = get_predictor(str(Path(__file__).parent / "symptom_model"))
+        model = predictor.artifacts.model
+        feature_names = predictor.feature_names
+        disease_labels = predictor.artifacts.labels
+        print(f"✅ Loaded XGBoost model from {predictor.artifacts.prefix}.json ({predictor.backend.name} backend)")
+        print(f"✅ Loaded {len(feature_names)} features and {len(disease_labels)} disease labels")
+        
+        # Cached results belong to the previous artifacts
+        explainer.cache.clear()
+        question_selector.reset()
+        anytime.reset()
+        sessions.clear()
+        
+        # Serialized, compressed vocabulary responses versioned by the artifact checksum
+        catalog = SymptomCatalog(feature_names, artifact_checksum(predictor.artifacts.paths))
+        print(f"✅ Symptom catalog version {catalog.version}")
+        
+        # Free-text triage: local model first, LLM only for unclear cases
+        triage = HybridTriage(
+            SymptomMatcher(feature_names),
+            lambda matched: predict_probabilities(create_feature_vector(matched)),
+            llm=load_llm_analyzer(),
+        )
+        print(f"✅ Triage ready (LLM fallback {'enabled' if triage.llm else 'disabled'})")
+        
+        # Candidate model scored on a sample of live requests, off the request path
+        shadow_prefix = os.getenv("SHADOW_MODEL_PREFIX")
+        if shadow_prefix:
+            candidate = LoadedModel(os.path.basename(shadow_prefix), shadow_prefix, max_batch=1, max_wait=0.0, cache_size=1)
+            shadow = ShadowEvaluator(candidate, score_symptoms, lambda: disease_labels)
+            print(f"✅ Shadowing {shadow.sample_rate:.0%} of requests to {shadow_prefix}")
         
         return True
         
@@ -99,32 +257,99 @@ def load_model_components():
         print(f"❌ Error loading model components: {e}")
         return False
 
+def encode_symptoms(input_symptoms: List[str]) -> Tuple[int, ...]:
+    """Sorted feature indices of the input symptoms (exact names, then typo/spacing-tolerant matches)"""
+    key = predictor.encode(input_symptoms)
+    print(f"Matched symptoms: {[feature_names[i] for i in key]}")
+    MATCHED_SYMPTOMS.observe(len(key))
+    return key
+
 def create_feature_vector(input_symptoms: List[str]) -> np.ndarray:
     """Create feature vector from input symptoms"""
-    # Convert input symptoms to lowercase for matching
-    input_symptoms_lower = [s.lower().strip() for s in input_symptoms]
-    
-    # Create binary vector
-    feature_vector = np.zeros(len(feature_names))
-    
-    matched_symptoms = []
-    for i, feature in enumerate(feature_names):
-        feature_lower = feature.lower().strip()
-        if feature_lower in input_symptoms_lower:
-            feature_vector[i] = 1
-            matched_symptoms.append(feature)
+    return predictor.vector(encode_symptoms(input_symptoms))
+
+def resolve_symptoms(input_symptoms: List[str]) -> Tuple[List[int], List[str]]:
+    """Feature indices for input symptoms, and the inputs that matched nothing"""
+    return predictor.resolve(input_symptoms)
+
+def score_symptoms(input_symptoms: List[str]) -> np.ndarray:
+    """Uncached class probabilities for raw input symptoms"""
+    return predictor.backend.predict_proba([predictor.encode(input_symptoms)])[0].copy()
+
+def predict_key(key: Tuple[int, ...]) -> np.ndarray:
+    """Class probabilities for a symptom set given as present feature indices, cached per set"""
+    return predictor.probabilities(key)
+
+def predict_probabilities(feature_vector: np.ndarray) -> np.ndarray:
+    """Class probabilities for one encoded symptom set, cached by the set of present symptoms"""
+    return predict_key(symptom_key(feature_vector))
+
+def top_classes(probabilities: np.ndarray, top_k: int = 5) -> List[int]:
+    """Indices of the top k classes above the predictor's confidence threshold, highest first"""
+    return [p.class_index for p in predictor.rank(probabilities, top_k)]
+
+def disease_name(class_idx: int) -> str:
+    return predictor.disease_name(class_idx)
+
+def format_predictions(probabilities: np.ndarray, top_k: Optional[int] = None, engine: Optional[Predictor] = None) -> List[PredictionResult]:
+    """Turn class probabilities into ranked predictions (ranking policy of `engine`, the live predictor by default)"""
+    return [
+        PredictionResult(
+            rank=p.rank,
+            disease=p.disease,
+            confidence=p.confidence,
+            confidence_percent=p.confidence_percent
+        )
+        for p in (engine or predictor).rank(probabilities, top_k)
+    ]
+
+def warm_up():
+    """Score a warmup batch through each prediction path so the first requests are not cold"""
+    rng = np.random.default_rng(0)
+    n_rows = int(os.getenv("SYMPTOM_WARMUP_ROWS", "32"))
+    keys = [tuple(sorted(rng.choice(len(feature_names), size=min(3, len(feature_names)), replace=False).tolist())) for _ in range(n_rows)]
+    X = np.zeros((n_rows, len(feature_names)), dtype=np.float32)
+    for row, key in enumerate(keys):
+        X[row, list(key)] = 1.0
     
-    print(f"Matched symptoms: {matched_symptoms}")
-    return feature_vector.reshape(1, -1)
+    readiness.step("symptom_index", lambda: predictor.resolve(feature_names))
+    readiness.step("predict_proba", lambda: model.predict_proba(X))
+    # Uncached: scores straight through the backend so random keys stay out of the cache
+    readiness.step(f"{predictor.backend.name}_predict", lambda: predictor.backend.predict_proba(keys))
+    for step, seconds in readiness.warmup_seconds.items():
+        WARMUP_SECONDS.labels(step).set(seconds)
+
+async def warm_up_in_background():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        readiness.open()
+        WARMUP_SECONDS.labels("total").set(readiness.warmup_seconds["total"])
+        print(f"🔥 Warmup finished in {readiness.warmup_seconds['total']:.2f} s")
+    except Exception as e:
+        readiness.fail(f"Warmup failed: {str(e)}")
+        print(f"❌ Warmup failed: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    """Load model on startup"""
-    success = load_model_components()
+    """Load model on startup (already done in the parent when forked by serve.py), then warm up"""
+    success = model is not None or readiness.step("load", load_model_components)
     if not success:
+        readiness.fail("Model components failed to load")
         print("❌ Failed to load model components!")
     else:
-        print("🚀 Symptom Checker API ready!")
+        # /ready stays 503 until the warmup batch has been scored
+        app.state.warmup = asyncio.create_task(warm_up_in_background())
+        print("🚀 Symptom Checker API started, warming up")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the LLM client connections"""
+    await explainer.close()
+    await registry.close()
+    if shadow is not None:
+        await shadow.close()
+    if triage is not None and triage.llm is not None:
+        await triage.llm.close()
 
 @app.get("/health")
 async def health_check():
@@ -137,10 +362,29 @@ async def health_check():
         "diseases_count": len(disease_labels)
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content={
+            "status": "ready" if readiness.ready else "not_ready",
+            "service": "Symptom Checker API",
+            **readiness.status()
+        }
+    )
+
 @app.get("/api/symptoms", response_model=SymptomsListResponse)
-async def get_available_symptoms():
-    """Get list of all available symptoms"""
+async def get_available_symptoms(request: Request):
+    """Get list of all available symptoms (ETag-validated, compressed when accepted)"""
     try:
+        if catalog is not None:
+            return catalog.response(
+                "api",
+                request.headers.get("accept-encoding", ""),
+                request.headers.get("if-none-match", "")
+            )
+        
         if not feature_names:
             raise HTTPException(status_code=500, detail="Model not loaded properly")
         
@@ -156,6 +400,52 @@ async def get_available_symptoms():
             error=str(e)
         )
 
+@app.get("/api/symptoms/complete", response_model=SymptomCompletionResponse)
+async def complete_symptoms(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    """Prefix completion over the symptom vocabulary"""
+    try:
+        if catalog is None:
+            raise HTTPException(status_code=500, detail="Model not loaded properly")
+        
+        with observe("symptom_complete"):
+            completions = catalog.complete(q, limit=limit)
+        
+        return SymptomCompletionResponse(
+            success=True,
+            query=q,
+            completions=completions
+        )
+    
+    except Exception as e:
+        return SymptomCompletionResponse(
+            success=False,
+            query=q,
+            error=str(e)
+        )
+
+@app.get("/api/symptoms/search", response_model=SymptomSearchResponse)
+async def search_symptoms(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    """Typo-tolerant symptom search for autocomplete"""
+    try:
+        if predictor is None:
+            raise HTTPException(status_code=500, detail="Model not loaded properly")
+        
+        with observe("symptom_search"):
+            matches = predictor.artifacts.index.search(q, limit=limit)
+        
+        return SymptomSearchResponse(
+            success=True,
+            query=q,
+            matches=[SymptomMatch(symptom=name, score=score) for name, score in matches]
+        )
+    
+    except Exception as e:
+        return SymptomSearchResponse(
+            success=False,
+            query=q,
+            error=str(e)
+        )
+
 @app.post("/api/check-symptoms", response_model=SymptomResponse)
 async def check_symptoms(request: SymptomRequest):
     """Analyze symptoms and return disease predictions"""
@@ -173,48 +463,343 @@ async def check_symptoms(request: SymptomRequest):
                 error="Model not loaded"
             )
         
-        # Create feature vector
-        feature_vector = create_feature_vector(request.symptoms)
+        if request.mode not in ("full", "anytime"):
+            return SymptomResponse(
+                success=False,
+                error=f"Unknown mode: {request.mode} (use 'full' or 'anytime')"
+            )
         
-        # Make prediction
-        probabilities = model.predict_proba(feature_vector)[0]
+        # Present feature indices; the backend encodes them into its own buffer
+        with observe("feature_encoding"):
+            indices, unmatched = resolve_symptoms(request.symptoms)
+            key = tuple(sorted(set(indices)))
+        MATCHED_SYMPTOMS.observe(len(key))
         
-        # Create predictions with confidence scores
-        predictions = []
-        for i, prob in enumerate(probabilities):
-            if prob > 0.01:  # Only include predictions with >1% confidence
-                disease_name = disease_labels[i] if i < len(disease_labels) else f"Disease_{i}"
-                predictions.append({
-                    "disease": str(disease_name),
-                    "confidence": float(prob),
-                    "confidence_percent": f"{prob * 100:.2f}%"
-                })
-        
-        # Sort by confidence (highest first)
-        predictions.sort(key=lambda x: x["confidence"], reverse=True)
-        
-        # Add rank and limit to top 5
-        ranked_predictions = []
-        for rank, pred in enumerate(predictions[:5], 1):
-            ranked_predictions.append(PredictionResult(
-                rank=rank,
-                disease=pred["disease"],
-                confidence=pred["confidence"],
-                confidence_percent=pred["confidence_percent"]
-            ))
+        inference = None
+        probabilities = predictor.cache.get(key) if request.mode == "anytime" else None
+        if request.mode == "anytime" and probabilities is None:
+            # Stop after the first decisive stage; only full evaluations are cached
+            budget = request.latency_budget_ms / 1000 if request.latency_budget_ms is not None else None
+            feature_vector = np.zeros((1, len(feature_names)), dtype=np.float32)
+            feature_vector[0, list(key)] = 1.0
+            # Staged predicts block; keep them off the event loop like the batched paths
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: anytime.predict(feature_vector, budget=budget)
+            )
+            probabilities = result["probabilities"]
+            if result["stop"] == STOP_FULL:
+                predictor.cache.put(key, probabilities)
+            inference = InferenceDetails(rounds=result["rounds"], total_rounds=result["total_rounds"], stop=result["stop"])
+        elif probabilities is None:
+            # Make prediction (cached per symptom set)
+            probabilities = predict_key(key)
+        
+        with observe("topk_format"):
+            ranked_predictions = format_predictions(probabilities)
+        
+        # Only enqueues; the comparison runs in the shadow worker
+        if shadow is not None:
+            shadow.submit(request.symptoms)
         
         return SymptomResponse(
             success=True,
             predictions=ranked_predictions,
-            input_symptoms=request.symptoms
+            inference=inference,
+            input_symptoms=request.symptoms,
+            matched_symptoms=[feature_names[i] for i in key],
+            unmatched_symptoms=unmatched
         )
     
     except Exception as e:
+        ERRORS.labels("prediction").inc()
         return SymptomResponse(
             success=False,
             error=f"Prediction error: {str(e)}"
         )
 
+@app.get("/api/shadow")
+async def shadow_summary():
+    """Agreement and latency of the shadow candidate against the live model"""
+    if shadow is None:
+        raise HTTPException(status_code=404, detail="No shadow model configured (set SHADOW_MODEL_PREFIX)")
+    return {"success": True, **shadow.summary()}
+
+@app.get("/api/models", response_model=ModelsListResponse)
+async def list_models():
+    """Models available under SYMPTOM_MODELS_DIR and whether they are loaded"""
+    try:
+        loaded = set(registry.loaded())
+        return ModelsListResponse(
+            success=True,
+            models=[ModelInfo(name=name, loaded=name in loaded) for name in sorted(registry.refresh())]
+        )
+    
+    except Exception as e:
+        return ModelsListResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/api/models/{name}/check-symptoms", response_model=SymptomResponse)
+async def check_symptoms_with_model(name: str, request: SymptomRequest):
+    """Analyze symptoms with a named model from the registry"""
+    try:
+        selected = await registry.get(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+    
+    try:
+        if not request.symptoms:
+            return SymptomResponse(
+                success=False,
+                error="No symptoms provided"
+            )
+        
+        with observe("feature_encoding"):
+            indices, unmatched = selected.predictor.resolve(request.symptoms)
+            key = tuple(sorted(set(indices)))
+        MATCHED_SYMPTOMS.observe(len(key))
+        
+        # Batched with concurrent requests for the same model and cached per symptom set
+        probabilities = await selected.predict(key)
+        
+        with observe("topk_format"):
+            ranked_predictions = format_predictions(probabilities, engine=selected.predictor)
+        
+        return SymptomResponse(
+            success=True,
+            predictions=ranked_predictions,
+            input_symptoms=request.symptoms,
+            matched_symptoms=[selected.feature_names[i] for i in key],
+            unmatched_symptoms=unmatched
+        )
+    
+    except Exception as e:
+        ERRORS.labels("prediction").inc()
+        return SymptomResponse(
+            success=False,
+            error=f"Prediction error: {str(e)}"
+        )
+
+@app.post("/api/triage", response_model=TriageResponse)
+async def triage_symptoms(request: TriageRequest):
+    """Triage a free-text symptom note, calling the LLM only when the local model is unsure"""
+    try:
+        if not request.text.strip():
+            return TriageResponse(
+                success=False,
+                error="No symptom text provided"
+            )
+        
+        if triage is None:
+            return TriageResponse(
+                success=False,
+                error="Model not loaded"
+            )
+        
+        result = await triage.triage(request.text)
+        predictions = []
+        if result["probabilities"] is not None:
+            with observe("topk_format"):
+                predictions = format_predictions(result["probabilities"])
+        
+        return TriageResponse(
+            success=True,
+            path=result["path"],
+            matched_symptoms=result["matched_symptoms"],
+            predictions=predictions,
+            llm_analysis=result["llm_analysis"],
+            llm_error=result["llm_error"]
+        )
+    
+    except Exception as e:
+        ERRORS.labels("triage").inc()
+        return TriageResponse(
+            success=False,
+            error=f"Triage error: {str(e)}"
+        )
+
+@app.post("/api/check-symptoms/explain", response_model=ExplainResponse)
+async def explain_symptoms(request: ExplainRequest):
+    """Per-symptom contributions (TreeSHAP, log-odds) behind each top-k disease"""
+    try:
+        if not request.symptoms:
+            return ExplainResponse(
+                success=False,
+                error="No symptoms provided"
+            )
+        
+        if model is None:
+            return ExplainResponse(
+                success=False,
+                error="Model not loaded"
+            )
+        
+        with observe("feature_encoding"):
+            feature_vector = create_feature_vector(request.symptoms)
+        key = symptom_key(feature_vector)
+        probabilities = predict_probabilities(feature_vector)
+        classes = top_classes(probabilities, max(1, min(request.top_k, 10)))
+        
+        # Batched with concurrent requests and cached per symptom set
+        contribs = await explainer.contributions(key)
+        
+        explanations = []
+        for rank, (class_idx, explanation) in enumerate(zip(classes, explain_classes(contribs, key, classes, feature_names)), 1):
+            explanations.append(DiseaseExplanation(
+                rank=rank,
+                disease=disease_name(class_idx),
+                confidence=float(probabilities[class_idx]),
+                bias=explanation["bias"],
+                contributions=[SymptomContribution(**c) for c in explanation["contributions"]],
+                absent_symptoms_contribution=explanation["absent_symptoms_contribution"]
+            ))
+        
+        return ExplainResponse(
+            success=True,
+            explanations=explanations,
+            matched_symptoms=[feature_names[i] for i in key],
+            input_symptoms=request.symptoms
+        )
+    
+    except Exception as e:
+        ERRORS.labels("explain").inc()
+        return ExplainResponse(
+            success=False,
+            error=f"Explanation error: {str(e)}"
+        )
+
+@app.post("/api/next-question", response_model=NextQuestionResponse)
+async def next_question(request: NextQuestionRequest):
+    """Unasked symptoms that would most reduce uncertainty over the top-k diseases"""
+    try:
+        if model is None:
+            return NextQuestionResponse(
+                success=False,
+                error="Model not loaded"
+            )
+        
+        with observe("feature_encoding"):
+            feature_vector = create_feature_vector(request.symptoms)
+        key = symptom_key(feature_vector)
+        asked, _ = resolve_symptoms(request.asked)
+        
+        # One batched predict_proba over the variant matrix, off the event loop
+        result = await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: question_selector.rank(
+                feature_vector,
+                key,
+                exclude=asked,
+                top_k=max(2, min(request.top_k, 20)),
+                limit=max(1, min(request.limit, 20)),
+            ),
+        )
+        
+        return NextQuestionResponse(
+            success=True,
+            questions=[
+                SuggestedQuestion(symptom=feature_names[i], information_gain=round(gain, 6), probability_yes=round(p_yes, 4))
+                for i, gain, p_yes in result["questions"]
+            ],
+            matched_symptoms=[feature_names[i] for i in key],
+            base_entropy=round(result["base_entropy"], 6),
+            candidates_scored=result["candidates_scored"],
+            truncated=result["truncated"]
+        )
+    
+    except Exception as e:
+        ERRORS.labels("next_question").inc()
+        return NextQuestionResponse(
+            success=False,
+            error=f"Next question error: {str(e)}"
+        )
+
+def session_response(session: TriageSession, unmatched: List[str]) -> SessionResponse:
+    """Current state of a session, predicting only when its symptoms changed"""
+    present = session.present()
+    predictions = []
+    if present:
+        if session.probabilities is None:
+            session.probabilities = predict_probabilities(session.feature_vector)
+        with observe("topk_format"):
+            predictions = format_predictions(session.probabilities)
+    
+    return SessionResponse(
+        success=True,
+        session_id=session.id,
+        symptoms=[feature_names[i] for i in present],
+        unmatched_symptoms=unmatched,
+        predictions=predictions,
+        expires_in=sessions.ttl
+    )
+
+@app.post("/sessions", response_model=SessionResponse)
+async def create_session(request: SessionCreateRequest):
+    """Start an interactive check; later changes are sent as deltas to PATCH /sessions/{id}"""
+    try:
+        if model is None:
+            return SessionResponse(
+                success=False,
+                error="Model not loaded"
+            )
+        
+        with observe("feature_encoding"):
+            indices, unmatched = resolve_symptoms(request.symptoms)
+        session = sessions.create(len(feature_names))
+        session.apply(add=indices)
+        return session_response(session, unmatched)
+    
+    except Exception as e:
+        ERRORS.labels("session").inc()
+        return SessionResponse(
+            success=False,
+            error=f"Session error: {str(e)}"
+        )
+
+@app.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Current symptoms and predictions of a session"""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session_response(session, [])
+
+@app.patch("/sessions/{session_id}", response_model=SessionResponse)
+async def update_session(session_id: str, request: SessionUpdateRequest):
+    """Add and/or remove symptoms; the stored vector is updated in place"""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    try:
+        with observe("feature_encoding"):
+            added, unmatched_added = resolve_symptoms(request.add)
+            removed, unmatched_removed = resolve_symptoms(request.remove)
+        session.apply(add=added, remove=removed)
+        return session_response(session, unmatched_added + unmatched_removed)
+    
+    except Exception as e:
+        ERRORS.labels("session").inc()
+        return SessionResponse(
+            success=False,
+            session_id=session_id,
+            error=f"Session error: {str(e)}"
+        )
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session early"""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"success": True}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Legacy endpoints for backward compatibility
 @app.post("/predict")
 async def legacy_predict(request: SymptomRequest):
@@ -234,9 +819,16 @@ async def legacy_predict(request: SymptomRequest):
         raise HTTPException(status_code=400, detail=response.error)
 
 @app.get("/symptoms")
-async def legacy_symptoms():
+async def legacy_symptoms(request: Request):
     """Legacy symptoms endpoint"""
-    response = await get_available_symptoms()
+    if catalog is not None:
+        return catalog.response(
+            "legacy",
+            request.headers.get("accept-encoding", ""),
+            request.headers.get("if-none-match", "")
+        )
+    
+    response = await get_available_symptoms(request)
     if response.success:
         return {"symptoms": response.symptoms}
     else:
@@ -1,64 +1,22 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Dict, Any
-import numpy as np
-import xgboost as xgb
-from sklearn.preprocessing import LabelEncoder
-import os
 
-# --- Model Loading and Prediction Logic ---
-
-def load_artifacts(prefix: str):
-    """Load the trained model artifacts."""
-    model_path = f"{prefix}.json"
-    labels_path = f"{prefix}.labels.npy"
-    features_path = f"{prefix}.features.txt"
-
-    if not (os.path.exists(model_path) and os.path.exists(labels_path) and os.path.exists(features_path)):
-        raise FileNotFoundError(f"Missing artifacts. Expected: {model_path}, {labels_path}, {features_path}")
-
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
-
-    label_encoder = LabelEncoder()
-    classes = np.load(labels_path, allow_pickle=True)
-    label_encoder.classes_ = classes
-
-    with open(features_path, "r", encoding="utf-8") as f:
-        feature_names = [line.strip() for line in f if line.strip()]
-
-    return model, label_encoder, feature_names
+from symptom_core import Predictor, get_predictor
 
-def build_feature_vector(symptom_names: List[str], selected_symptoms: List[str]) -> np.ndarray:
-    """Convert symptom list to feature vector."""
-    features = np.zeros(len(symptom_names), dtype=float)
-    name_to_index = {name.lower().strip(): idx for idx, name in enumerate(symptom_names)}
-    
-    for symptom in selected_symptoms:
-        key = symptom.lower().strip()
-        if key in name_to_index:
-            features[name_to_index[key]] = 1.0
-    
-    return features.reshape(1, -1)
+# --- Model Loading and Prediction Logic ---
 
-def get_predictions(symptoms: List[str], model, label_encoder, feature_names: List[str]) -> Dict[str, Any]:
+def get_predictions(symptoms: List[str], predictor: Predictor) -> Dict[str, Any]:
     """Return predictions."""
     if not symptoms:
         return {"error": "No symptoms provided"}
     
-    feature_vector = build_feature_vector(feature_names, symptoms)
-    
-    probabilities = model.predict_proba(feature_vector)[0]
-    
-    top_n = 5
-    top_indices = probabilities.argsort()[-top_n:][::-1]
-    
     predictions = [
         {
-            "disease": label_encoder.inverse_transform([idx])[0],
-            "probability": round(float(probabilities[idx]), 4),
+            "disease": p.disease,
+            "probability": round(p.confidence, 4),
         }
-        for idx in top_indices
+        for p in predictor.predict(symptoms)
     ]
     
     return {"predictions": predictions}
@@ -74,11 +32,11 @@ app = FastAPI(
 # Load model and artifacts at startup
 try:
     MODEL_ARTIFACTS_PREFIX = "symptom_model"
-    model, label_encoder, feature_names = load_artifacts(MODEL_ARTIFACTS_PREFIX)
+    predictor = get_predictor(MODEL_ARTIFACTS_PREFIX)
 except FileNotFoundError as e:
     # This allows the app to start and show an error at the endpoint
     # if the model artifacts are not found.
-    model, label_encoder, feature_names = None, None, None
+    predictor = None
     startup_error = str(e)
 else:
     startup_error = None
@@ -111,7 +69,7 @@ def predict(request: SymptomsRequest):
     if startup_error:
         return {"error": f"Could not process request due to a startup error: {startup_error}"}
         
-    predictions = get_predictions(request.symptoms, model, label_encoder, feature_names)
+    predictions = get_predictions(request.symptoms, predictor)
     return predictions
 
 @app.get("/symptoms", summary="List all available symptoms")
@@ -121,4 +79,4 @@ def list_symptoms():
     """
     if startup_error:
         return {"error": f"Could not retrieve symptoms due to a startup error: {startup_error}"}
-    return {"symptoms": feature_names}
+    return {"symptoms": predictor.feature_names}
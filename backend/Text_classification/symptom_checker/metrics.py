@@ -0,0 +1,145 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+from symptom_core import MetricsHook, set_metrics_hook
+
+# Model stages run in microseconds to a few milliseconds; LLM triage calls take seconds
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_LATENCY = Histogram(
+    "symptom_stage_seconds",
+    "Latency of each symptom prediction stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HTTP_LATENCY = Histogram(
+    "symptom_http_request_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+ERRORS = Counter(
+    "symptom_errors_total",
+    "Errors by stage",
+    ["stage"],
+)
+CACHE_REQUESTS = Counter(
+    "symptom_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+QUEUE_DEPTH = Gauge(
+    "symptom_queue_depth",
+    "Items waiting in a batching queue",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+ACTIVE_SESSIONS = Gauge(
+    "symptom_sessions_active",
+    "Live server-side triage sessions",
+    multiprocess_mode="livesum",
+)
+MATCHED_SYMPTOMS = Histogram(
+    "symptom_matched_inputs",
+    "Number of input symptoms that matched a model feature",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 20),
+)
+TRIAGE_DECISIONS = Counter(
+    "symptom_triage_decisions_total",
+    "Free-text triage outcomes by decision path",
+    ["path"],
+)
+LLM_CALLS_SAVED = Counter(
+    "symptom_triage_llm_calls_saved_total",
+    "Triage requests answered by the local model without an LLM call",
+)
+
+ANYTIME_ROUNDS = Histogram(
+    "symptom_anytime_rounds_fraction",
+    "Fraction of boosting rounds evaluated by anytime inference, by stop reason",
+    ["stop"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0),
+)
+ANYTIME_AGREEMENT = Counter(
+    "symptom_anytime_agreement_total",
+    "Sampled early-stopped predictions whose top-1 matches the full model",
+    ["result"],
+)
+
+MODEL_REQUESTS = Counter(
+    "symptom_model_requests_total",
+    "Predictions requested per registry model",
+    ["model"],
+)
+MODEL_MEMORY = Gauge(
+    "symptom_model_memory_bytes",
+    "Estimated footprint of each loaded registry model",
+    ["model"],
+    multiprocess_mode="livesum",
+)
+MODELS_LOADED = Gauge(
+    "symptom_models_loaded",
+    "Registry models currently loaded",
+    multiprocess_mode="livesum",
+)
+
+SHADOW_AGREEMENT = Counter(
+    "symptom_shadow_comparisons_total",
+    "Mirrored requests by whether the candidate's top-1 disease matched the live model",
+    ["result"],
+)
+SHADOW_RANK_CORRELATION = Histogram(
+    "symptom_shadow_rank_correlation",
+    "Spearman correlation between live and candidate disease rankings",
+    buckets=(-0.5, 0, 0.5, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0),
+)
+SHADOW_LATENCY_DELTA = Histogram(
+    "symptom_shadow_latency_delta_seconds",
+    "Candidate minus live model scoring latency for mirrored requests",
+    buckets=(-0.01, -0.001, -0.0001, 0, 0.0001, 0.001, 0.01, 0.1),
+)
+SHADOW_DROPPED = Counter(
+    "symptom_shadow_dropped_total",
+    "Sampled requests not mirrored because the shadow queue was full",
+)
+
+WARMUP_SECONDS = Gauge(
+    "symptom_warmup_seconds",
+    "Duration of each startup warmup step",
+    ["step"],
+    multiprocess_mode="max",
+)
+
+
+def observe(stage: str):
+    """Context manager timing one stage into symptom_stage_seconds"""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+class PrometheusMetricsHook(MetricsHook):
+    """Reports symptom_core stage timings and cache lookups to the metrics above"""
+
+    def observe(self, stage: str):
+        return observe(stage)
+
+    def cache_request(self, cache: str, hit: bool):
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# Any process serving the API imports this module, which routes the core's measurements here
+set_metrics_hook(PrometheusMetricsHook())
+
+
+def render_metrics():
+    """
+    Return (body, content type) for the /metrics endpoint
+
+    With PROMETHEUS_MULTIPROC_DIR set (serve.py with several workers) the body
+    aggregates every worker's metrics; otherwise it covers this process only.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
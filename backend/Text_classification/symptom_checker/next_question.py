@@ -0,0 +1,158 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from metrics import observe
+from symptom_core.prediction_cache import LRUCache
+
+Key = Tuple[int, ...]
+
+
+def entropy(p: np.ndarray) -> np.ndarray:
+    """Shannon entropy in bits along the last axis"""
+    p = np.clip(p, 1e-12, 1.0)
+    return -(p * np.log2(p)).sum(axis=-1)
+
+
+class QuestionSelector:
+    """
+    Ranks unasked symptoms by how much asking about them should narrow the diagnosis
+
+    For a base symptom set with top-k disease distribution p, each candidate symptom s
+    is added to the base vector and all variants are scored in one batched
+    `predict_proba`, giving q = p(. | base + s). Reading the model as a Bayesian
+    update, q_d is proportional to p_d * P(s | d), so P(s | d) = c * q_d / p_d where
+    c = P(yes). The largest c that keeps every P(s | d) <= 1 is min_d p_d / q_d; the
+    "no" posterior follows as (p - c * q) / (1 - c). The score is the expected entropy
+    drop H(p) - [c * H(q) + (1 - c) * H(no)], which is never negative.
+
+    Candidates are the `max_candidates` unasked features with the highest total gain
+    in the booster, scored in chunks until `budget` seconds have been spent. Complete
+    rankings are cached per (base set, top_k).
+    """
+
+    CHUNK = 32
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        booster: Callable[[], xgb.Booster],
+        feature_names: Callable[[], List[str]],
+        cache: Optional[LRUCache] = None,
+        max_candidates: Optional[int] = None,
+        budget: Optional[float] = None,
+    ):
+        """
+        Args:
+            predict: Batched class probabilities for a (rows, features) matrix
+            booster: Returns the current booster, for feature gains
+            feature_names: Returns the model's feature names
+            cache: Cache for rankings per base set
+            max_candidates: Highest-gain candidates to score per request
+            budget: Seconds to spend scoring before returning the best found so far
+        """
+        self.predict = predict
+        self.booster = booster
+        self.feature_names = feature_names
+        self.cache = cache or LRUCache("next_questions", int(os.getenv("NEXT_QUESTION_CACHE_SIZE", "2000")))
+        self.max_candidates = max_candidates or int(os.getenv("NEXT_QUESTION_MAX_CANDIDATES", "64"))
+        self.budget = budget if budget is not None else float(os.getenv("NEXT_QUESTION_BUDGET_MS", "100")) / 1000
+        self._gain_order: Optional[np.ndarray] = None
+
+    def reset(self):
+        """Forget gains and cached rankings after a model reload"""
+        self._gain_order = None
+        self.cache.clear()
+
+    def gain_order(self) -> np.ndarray:
+        """Feature indices used by the booster, highest total gain first"""
+        if self._gain_order is None:
+            names = self.feature_names()
+            position = {name: i for i, name in enumerate(names)}
+            gains = np.zeros(len(names))
+            for name, gain in self.booster().get_score(importance_type="total_gain").items():
+                # Boosters without feature names report "f<index>"
+                i = position.get(name)
+                if i is None and name.startswith("f") and name[1:].isdigit():
+                    i = int(name[1:])
+                if i is not None and i < len(gains):
+                    gains[i] = gain
+            order = np.argsort(-gains, kind="stable")
+            self._gain_order = order[gains[order] > 0]
+        return self._gain_order
+
+    def rank(
+        self,
+        base: np.ndarray,
+        key: Key,
+        exclude: Iterable[int] = (),
+        top_k: int = 5,
+        limit: int = 5,
+    ) -> Dict:
+        """
+        Best next questions for one symptom set
+
+        Args:
+            base: Encoded symptom vector, shape (1, n_features)
+            key: Present feature indices (see symptom_core.prediction_cache.symptom_key)
+            exclude: Feature indices already asked about
+            top_k: Diseases the uncertainty is measured over
+            limit: Questions to return
+
+        Returns:
+            Dict with `questions` ((feature index, information gain, P(yes)) tuples,
+            best first), `base_entropy`, `candidates_scored` and `truncated` (True when
+            the latency budget ran out before every candidate was scored)
+        """
+        ranking = self.cache.get((key, top_k))
+        if ranking is None:
+            ranking = self._score(base, key, top_k)
+            if not ranking["truncated"]:
+                self.cache.put((key, top_k), ranking)
+
+        excluded = set(exclude)
+        questions = [q for q in ranking["questions"] if q[0] not in excluded][:limit]
+        return {**ranking, "questions": questions}
+
+    def _score(self, base: np.ndarray, key: Key, top_k: int) -> Dict:
+        started = time.perf_counter()
+        present = set(key)
+        candidates = np.array([i for i in self.gain_order() if i not in present][:self.max_candidates], dtype=int)
+
+        base = np.asarray(base, dtype=np.float32).reshape(1, -1)
+        with observe("next_question_scoring"):
+            p_full = self.predict(base)[0]
+            classes = np.argsort(-p_full, kind="stable")[:top_k]
+            p = p_full[classes] / p_full[classes].sum()
+            base_entropy = float(entropy(p))
+
+            scored: List[Tuple[int, float, float]] = []
+            truncated = False
+            for start in range(0, len(candidates), self.CHUNK):
+                if start and time.perf_counter() - started > self.budget:
+                    truncated = True
+                    break
+                chunk = candidates[start:start + self.CHUNK]
+                variants = np.repeat(base, len(chunk), axis=0)
+                variants[np.arange(len(chunk)), chunk] = 1.0
+                q = self.predict(variants)[:, classes]
+                q = q / q.sum(axis=1, keepdims=True)
+
+                p_yes = np.clip(np.min(p / np.maximum(q, 1e-12), axis=1), 0.0, 1.0)
+                c = p_yes[:, np.newaxis]
+                p_no = np.clip(p - c * q, 0.0, None)
+                p_no = p_no / np.maximum(p_no.sum(axis=1, keepdims=True), 1e-12)
+                expected = p_yes * entropy(q) + (1 - p_yes) * entropy(p_no)
+                gain = np.maximum(base_entropy - expected, 0.0)
+                scored.extend(zip(chunk.tolist(), gain.tolist(), p_yes.tolist()))
+
+        scored.sort(key=lambda item: -item[1])
+        return {
+            "questions": scored,
+            "base_entropy": base_entropy,
+            "candidates_scored": len(scored),
+            "truncated": truncated,
+        }
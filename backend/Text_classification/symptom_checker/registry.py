@@ -0,0 +1,226 @@
+import asyncio
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import MODEL_MEMORY, MODEL_REQUESTS, MODELS_LOADED, QUEUE_DEPTH, STAGE_LATENCY
+from symptom_core import InplaceBackend, Predictor, load_artifact_set
+
+Key = Tuple[int, ...]
+
+ARTIFACT_SUFFIXES = (".json", ".labels.npy", ".features.txt")
+
+
+def discover(directory: Path) -> Dict[str, str]:
+    """
+    Artifact sets under a directory, by model name
+
+    A set is either `<name>.json` + `<name>.labels.npy` + `<name>.features.txt`
+    directly in the directory, or `<name>/symptom_model.*` in a subdirectory.
+
+    Returns:
+        Model name -> artifact prefix (path without the suffixes)
+    """
+    prefixes = {}
+    if not directory.is_dir():
+        return prefixes
+    for features in sorted(directory.glob("*.features.txt")) + sorted(directory.glob("*/symptom_model.features.txt")):
+        prefix = str(features)[:-len(".features.txt")]
+        if all(os.path.exists(prefix + suffix) for suffix in ARTIFACT_SUFFIXES):
+            name = features.parent.name if features.name == "symptom_model.features.txt" else features.name[:-len(".features.txt")]
+            prefixes.setdefault(name, prefix)
+    return prefixes
+
+
+class LoadedModel:
+    """
+    One symptom model (a symptom_core Predictor) with its batching queue
+
+    Concurrent `predict` calls are collected by a single worker into batches of up
+    to `max_batch` distinct symptom sets (waiting at most `max_wait` seconds) and
+    scored with one `inplace_predict` call in the default executor.
+    """
+
+    def __init__(self, name: str, prefix: str, max_batch: int, max_wait: float, cache_size: int):
+        self.name = name
+        self.prefix = prefix
+        artifacts = load_artifact_set(prefix, name=name, cache_size=cache_size)
+        self.predictor = Predictor(artifacts, backend=InplaceBackend(artifacts, max_batch=max_batch), batch_size=max_batch)
+        self.model = artifacts.model
+        self.feature_names = artifacts.feature_names
+        self.disease_labels = artifacts.labels
+        self.cache = artifacts.cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # Serialized booster size: a lower bound on its in-memory footprint
+        self.memory_bytes = len(artifacts.booster.save_raw("ubj")) + 2 * max_batch * len(self.feature_names) * 4
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Key, asyncio.Future] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    def encode(self, input_symptoms: List[str]) -> Key:
+        """Sorted feature indices of the input symptoms"""
+        return self.predictor.encode(input_symptoms)
+
+    def disease_name(self, class_idx: int) -> str:
+        return self.predictor.disease_name(class_idx)
+
+    async def predict(self, key: Key) -> np.ndarray:
+        """Class probabilities for one symptom set, cached and batched with concurrent calls"""
+        MODEL_REQUESTS.labels(self.name).inc()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._pending.get(key)
+        if future is None:
+            if self._worker is None or self._worker.done():
+                self._queue = asyncio.Queue()
+                self._worker = asyncio.create_task(self._run())
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._queue.put_nowait(key)
+            QUEUE_DEPTH.labels(f"model:{self.name}").set(self._queue.qsize())
+        return await asyncio.shield(future)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"Model '{self.name}' was unloaded"))
+        self._pending.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            keys = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(keys) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    keys.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            QUEUE_DEPTH.labels(f"model:{self.name}").set(self._queue.qsize())
+
+            try:
+                results = await loop.run_in_executor(None, self._score, keys)
+            except Exception as e:
+                for key in keys:
+                    future = self._pending.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+
+            for key, probabilities in zip(keys, results):
+                self.cache.put(key, probabilities)
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(probabilities)
+
+    def _score(self, keys: List[Key]) -> List[np.ndarray]:
+        with STAGE_LATENCY.labels(f"predict:{self.name}").time():
+            scored = self.predictor.backend.predict_proba(keys)
+        # The backend reuses its output buffer, and a cached view would pin the whole batch
+        return [row.copy() for row in scored]
+
+
+class ModelRegistry:
+    """
+    Lazily loaded symptom models kept under a memory budget
+
+    Artifact sets are discovered under `directory` and loaded on first use (in the
+    default executor, one load per model at a time). When the estimated footprint of
+    the loaded models exceeds `memory_budget` bytes, the least recently used models
+    are unloaded; the model just requested is always kept.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        memory_budget: Optional[int] = None,
+        max_batch: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        """
+        Args:
+            directory: Directory holding artifact sets (SYMPTOM_MODELS_DIR, ./models)
+            memory_budget: Bytes of loaded models to keep (MODEL_MEMORY_BUDGET_MB, 512)
+            max_batch: Symptom sets per batched prediction (MODEL_MAX_BATCH, 32)
+            max_wait: Seconds to wait for a batch to fill (MODEL_MAX_WAIT, 0.002)
+        """
+        self.directory = Path(directory or os.getenv("SYMPTOM_MODELS_DIR", str(Path(__file__).parent / "models")))
+        self.memory_budget = memory_budget or int(float(os.getenv("MODEL_MEMORY_BUDGET_MB", "512")) * 2**20)
+        self.max_batch = max_batch or int(os.getenv("MODEL_MAX_BATCH", "32"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("MODEL_MAX_WAIT", "0.002"))
+        self.cache_size = int(os.getenv("MODEL_CACHE_SIZE", "2000"))
+        self.available: Dict[str, str] = {}
+        self._loaded: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.refresh()
+
+    def refresh(self) -> Dict[str, str]:
+        """Rescan the directory for artifact sets"""
+        self.available = discover(self.directory)
+        return self.available
+
+    def loaded(self) -> List[str]:
+        return list(self._loaded)
+
+    async def get(self, name: str) -> LoadedModel:
+        """
+        Loaded model by name, loading it first if needed
+
+        Raises:
+            KeyError: No artifact set with this name
+        """
+        model = self._loaded.get(name)
+        if model is not None:
+            self._loaded.move_to_end(name)
+            return model
+        if name not in self.available and name not in self.refresh():
+            raise KeyError(name)
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            model = self._loaded.get(name)
+            if model is None:
+                prefix = self.available[name]
+                with STAGE_LATENCY.labels("model_load").time():
+                    model = await asyncio.get_running_loop().run_in_executor(
+                        None, LoadedModel, name, prefix, self.max_batch, self.max_wait, self.cache_size
+                    )
+                self._loaded[name] = model
+                MODEL_MEMORY.labels(name).set(model.memory_bytes)
+                await self._evict(keep=name)
+            self._loaded.move_to_end(name)
+        return model
+
+    async def close(self):
+        for name in list(self._loaded):
+            await self._unload(name)
+
+    async def _evict(self, keep: str):
+        while sum(m.memory_bytes for m in self._loaded.values()) > self.memory_budget:
+            victim = next((name for name in self._loaded if name != keep), None)
+            if victim is None:
+                break
+            await self._unload(victim)
+        MODELS_LOADED.set(len(self._loaded))
+
+    async def _unload(self, name: str):
+        model = self._loaded.pop(name)
+        await model.close()
+        MODEL_MEMORY.remove(name)
+        MODELS_LOADED.set(len(self._loaded))
@@ -0,0 +1,224 @@
+"""
+Preload-then-fork server for the symptom service
+
+The parent process loads the model, feature names, labels and lookup indexes once,
+freezes them out of the garbage collector's reach, binds the listening socket and
+forks the workers. Workers share the loaded pages copy-on-write instead of each
+loading its own copy, so adding a worker costs its private memory only.
+
+    python serve.py --workers 4 --port 8002
+
+The parent must not run a prediction before forking: OpenMP thread pools do not
+survive fork. Each worker sets its own XGBoost thread count after the fork.
+
+With more than one worker, Prometheus metrics are written to a directory shared by
+all workers (PROMETHEUS_MULTIPROC_DIR, a fresh temporary directory if unset) and
+/metrics aggregates them, whichever worker serves the scrape.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+# `main` (and with it prometheus_client) is imported only after prepare_metrics_dir
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """
+    RSS, PSS and private (unshared) bytes of a process, from /proc/<pid>/smaps_rollup
+
+    RSS counts shared pages in full for every process that maps them; PSS splits them
+    between the sharers, and private bytes are what the process alone costs.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+def format_memory(label: str, usage: Optional[Dict[str, int]]) -> str:
+    if usage is None:
+        return f"{label}: memory usage unavailable (no /proc/<pid>/smaps_rollup)"
+    mib = {k: v / 2**20 for k, v in usage.items()}
+    return f"{label}: RSS {mib['rss']:.1f} MiB, PSS {mib['pss']:.1f} MiB, private {mib['private']:.1f} MiB, shared {mib['shared']:.1f} MiB"
+
+
+def prepare_metrics_dir(workers: int) -> Optional[str]:
+    """
+    Point prometheus_client at a directory shared by the workers
+
+    Must run before prometheus_client is first imported, which picks the metric value
+    storage once at import. Metric files left by an earlier run are removed.
+
+    Returns:
+        The directory, or None for a single worker (metrics stay in process)
+    """
+    if workers <= 1:
+        return None
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="symptom-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    return directory
+
+
+def preload() -> bool:
+    """
+    Load the model components in this (master) process and freeze them
+
+    Moves everything loaded so far into the garbage collector's permanent generation:
+    collections in the workers then never touch (and so never copy) these objects' pages.
+    """
+    import main
+
+    if not main.load_model_components():
+        return False
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+def run_worker(sock: socket.socket, threads: int, log_level: str):
+    """Serve the preloaded app on the inherited socket"""
+    import main
+
+    # Children inherit the parent's handlers; let uvicorn install its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    main.model.set_params(n_jobs=threads)
+    main.model.get_booster().set_param({"nthread": threads})
+    config = uvicorn.Config(main.app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    """Forks workers on a shared socket, restarts them if they die, and stops them on SIGTERM/SIGINT"""
+
+    def __init__(self, sock: socket.socket, workers: int, threads: int, log_level: str):
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.log_level = log_level
+        self.pids: List[int] = []
+        self.stopping = False
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.sock, self.threads, self.log_level)
+            finally:
+                os._exit(0)
+        self.pids.append(pid)
+        return pid
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self):
+        print(format_memory(f"master {os.getpid()}", memory_usage(os.getpid())))
+        for i, pid in enumerate(self.pids):
+            print(format_memory(f"worker {i} ({pid})", memory_usage(pid)))
+        sys.stdout.flush()
+
+    def run(self, report_after: float):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"🚀 Forked {self.workers} workers ({self.threads} XGBoost threads each)")
+
+        report_at = time.monotonic() + report_after if report_after > 0 else None
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.pids.remove(pid)
+                if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+                    from prometheus_client import multiprocess
+
+                    # Drops the dead worker's live gauges from the aggregate
+                    multiprocess.mark_process_dead(pid)
+                if not self.stopping:
+                    print(f"⚠️ Worker {pid} exited with status {status}, restarting")
+                    self.spawn()
+                continue
+            if report_at is not None and time.monotonic() >= report_at:
+                self.report_memory()
+                report_at = None
+            time.sleep(0.2)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Serve the symptom checker with preloaded, copy-on-write shared model state.")
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="Bind address")
+    parser.add_argument("--port", type=int, default=8002, help="Bind port")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "2")), help="Worker processes")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.getenv("SERVE_XGB_THREADS", "0")),
+        help="XGBoost threads per worker (default: CPUs / workers, at least 1)",
+    )
+    parser.add_argument("--log-level", type=str, default="info", help="uvicorn log level")
+    parser.add_argument(
+        "--report-memory-after",
+        type=float,
+        default=float(os.getenv("SERVE_REPORT_MEMORY_AFTER", "5")),
+        help="Print RSS/PSS/private memory of every process this many seconds after forking (0 to disable)",
+    )
+    args = parser.parse_args()
+
+    created_metrics_dir = args.workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    metrics_dir = prepare_metrics_dir(args.workers)
+    if metrics_dir:
+        print(f"✅ Aggregating worker metrics in {metrics_dir}")
+    if not preload():
+        sys.exit("❌ Failed to load model components")
+    print(format_memory("preloaded master", memory_usage(os.getpid())))
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    print(f"✅ Listening on {args.host}:{args.port}")
+
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    try:
+        Master(sock, args.workers, threads, args.log_level).run(args.report_memory_after)
+    finally:
+        if created_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_cli()
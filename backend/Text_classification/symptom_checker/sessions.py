@@ -0,0 +1,112 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from metrics import ACTIVE_SESSIONS
+
+
+class TriageSession:
+    """Symptoms of one interactive check, kept encoded together with the last prediction"""
+
+    __slots__ = ("id", "feature_vector", "probabilities", "expires_at")
+
+    def __init__(self, session_id: str, n_features: int, expires_at: float):
+        self.id = session_id
+        self.feature_vector = np.zeros((1, n_features))
+        self.probabilities: Optional[np.ndarray] = None
+        self.expires_at = expires_at
+
+    def apply(self, add: Iterable[int] = (), remove: Iterable[int] = ()) -> bool:
+        """
+        Set and clear feature indices in place
+
+        Returns:
+            True if the encoded vector changed (and the stored prediction is stale)
+        """
+        changed = False
+        for i in remove:
+            if self.feature_vector[0, i]:
+                self.feature_vector[0, i] = 0
+                changed = True
+        for i in add:
+            if not self.feature_vector[0, i]:
+                self.feature_vector[0, i] = 1
+                changed = True
+        if changed:
+            self.probabilities = None
+        return changed
+
+    def present(self) -> List[int]:
+        return [int(i) for i in np.flatnonzero(self.feature_vector[0])]
+
+
+class SessionStore:
+    """
+    Bounded in-memory session store with a sliding TTL
+
+    Sessions expire `ttl` seconds after their last use. When `max_sessions` is
+    reached, the least recently used session is evicted.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_sessions: Optional[int] = None):
+        """
+        Args:
+            ttl: Idle seconds before a session expires (SESSION_TTL_SECONDS, 1800)
+            max_sessions: Maximum live sessions (SESSION_MAX, 10000)
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX", "10000"))
+        self._sessions: "OrderedDict[str, TriageSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, n_features: int) -> TriageSession:
+        with self._lock:
+            self._expire(time.monotonic())
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            session = TriageSession(secrets.token_urlsafe(16), n_features, time.monotonic() + self.ttl)
+            self._sessions[session.id] = session
+            ACTIVE_SESSIONS.set(len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[TriageSession]:
+        """Live session by id, with its TTL extended; None if unknown or expired"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                del self._sessions[session_id]
+                ACTIVE_SESSIONS.set(len(self._sessions))
+                return None
+            session.expires_at = now + self.ttl
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            ACTIVE_SESSIONS.set(len(self._sessions))
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            ACTIVE_SESSIONS.set(0)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self, now: float):
+        # Least recently used first, so expired sessions sit at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from metrics import QUEUE_DEPTH, SHADOW_AGREEMENT, SHADOW_DROPPED, SHADOW_LATENCY_DELTA, SHADOW_RANK_CORRELATION
+from registry import LoadedModel
+
+logger = logging.getLogger(__name__)
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation of two score vectors (ties broken by position)"""
+    if len(a) < 2:
+        return 1.0
+    rank_a = np.argsort(np.argsort(a, kind="stable"), kind="stable").astype(float)
+    rank_b = np.argsort(np.argsort(b, kind="stable"), kind="stable").astype(float)
+    n = len(a)
+    return float(1 - 6 * np.sum((rank_a - rank_b) ** 2) / (n * (n * n - 1)))
+
+
+class ShadowEvaluator:
+    """
+    Mirrors a sample of live requests to a candidate model in the background
+
+    `submit` only enqueues the request's symptoms (dropping them if the queue is
+    full) and returns immediately. A single worker scores each mirrored request with
+    both the live and the candidate model in the default executor, so both latencies
+    are measured the same way off the request path, and records top-1 agreement,
+    Spearman rank correlation over the diseases both models know, and the latency
+    difference.
+    """
+
+    def __init__(
+        self,
+        candidate: LoadedModel,
+        primary_score: Callable[[List[str]], np.ndarray],
+        primary_labels: Callable[[], Sequence[str]],
+        sample_rate: Optional[float] = None,
+        queue_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            candidate: Candidate model
+            primary_score: Live model probabilities for raw input symptoms
+            primary_labels: Live model disease labels
+            sample_rate: Fraction of requests to mirror (SHADOW_SAMPLE_RATE, 0.1)
+            queue_size: Mirrored requests waiting before new ones are dropped (SHADOW_QUEUE_SIZE, 1000)
+        """
+        self.candidate = candidate
+        self.primary_score = primary_score
+        self.primary_labels = primary_labels
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+        self.queue_size = queue_size or int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+        self.compared = 0
+        self.agreed = 0
+        self.failed = 0
+        self._correlations: deque = deque(maxlen=1000)
+        self._latency_deltas: deque = deque(maxlen=1000)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, symptoms: List[str]) -> bool:
+        """
+        Mirror one request, if sampled
+
+        Returns:
+            True if the request was queued for comparison
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait(list(symptoms))
+        except asyncio.QueueFull:
+            SHADOW_DROPPED.inc()
+            return False
+        QUEUE_DEPTH.labels("shadow").set(self._queue.qsize())
+        return True
+
+    def summary(self) -> Dict:
+        """Agreement and latency statistics so far (correlation and latency over the last 1000 comparisons)"""
+        deltas = sorted(self._latency_deltas)
+        return {
+            "candidate": self.candidate.name,
+            "sample_rate": self.sample_rate,
+            "compared": self.compared,
+            "failed": self.failed,
+            "top1_agreement": self.agreed / self.compared if self.compared else None,
+            "mean_rank_correlation": float(np.mean(self._correlations)) if self._correlations else None,
+            "p50_latency_delta_ms": deltas[len(deltas) // 2] * 1000 if deltas else None,
+            "p95_latency_delta_ms": deltas[min(len(deltas) - 1, int(len(deltas) * 0.95))] * 1000 if deltas else None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.candidate.close()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            symptoms = await self._queue.get()
+            QUEUE_DEPTH.labels("shadow").set(self._queue.qsize())
+            try:
+                await loop.run_in_executor(None, self._compare, symptoms)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Shadow comparison failed: {str(e)}")
+
+    def _compare(self, symptoms: List[str]):
+        started = time.perf_counter()
+        primary = self.primary_score(symptoms)
+        primary_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        candidate = self.candidate.predictor.backend.predict_proba([self.candidate.encode(symptoms)])[0]
+        candidate_seconds = time.perf_counter() - started
+
+        # Compare by disease name; the models may not share a label set or order
+        labels = [str(label) for label in self.primary_labels()]
+        candidate_index = {str(label): i for i, label in enumerate(self.candidate.disease_labels)}
+        common = [(i, candidate_index[label]) for i, label in enumerate(labels) if label in candidate_index]
+
+        agrees = (
+            int(np.argmax(primary)) < len(labels)
+            and labels[int(np.argmax(primary))] == self.candidate.disease_name(int(np.argmax(candidate)))
+        )
+        correlation = spearman(
+            np.array([primary[i] for i, _ in common]),
+            np.array([candidate[j] for _, j in common]),
+        ) if common else 0.0
+        delta = candidate_seconds - primary_seconds
+
+        self.compared += 1
+        self.agreed += int(agrees)
+        self._correlations.append(correlation)
+        self._latency_deltas.append(delta)
+        SHADOW_AGREEMENT.labels("agree" if agrees else "disagree").inc()
+        SHADOW_RANK_CORRELATION.observe(correlation)
+        SHADOW_LATENCY_DELTA.observe(delta)
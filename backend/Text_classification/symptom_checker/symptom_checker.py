@@ -8,6 +8,9 @@ import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
+from symptom_core import ArtifactSet, Predictor, get_predictor, load_artifact_set
+from symptom_core.symptom_matcher import index_for
+
 
 def load_dataset(csv_path: str) -> pd.DataFrame:
     if not os.path.exists(csv_path):
@@ -104,40 +107,25 @@ def save_artifacts(model: xgb.XGBClassifier, label_encoder: LabelEncoder, featur
 
 
 def load_artifacts(prefix: str) -> Tuple[xgb.XGBClassifier, LabelEncoder, List[str]]:
-    model_path = f"{prefix}.json"
-    labels_path = f"{prefix}.labels.npy"
-    features_path = f"{prefix}.features.txt"
-
-    if not (os.path.exists(model_path) and os.path.exists(labels_path) and os.path.exists(features_path)):
-        raise FileNotFoundError(
-            f"Missing artifacts. Expected: '{model_path}', '{labels_path}', '{features_path}'."
-        )
-
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
-
+    artifacts = load_artifact_set(prefix)
     label_encoder = LabelEncoder()
-    # Load label encoder classes with allow_pickle=True since they contain strings
-    classes = np.load(labels_path, allow_pickle=True)
-    label_encoder.classes_ = classes
-
-    with open(features_path, "r", encoding="utf-8") as f:
-        feature_names = [line.strip() for line in f if line.strip()]
-
-    return model, label_encoder, feature_names
+    label_encoder.classes_ = np.asarray(artifacts.labels)
+    return artifacts.model, label_encoder, artifacts.feature_names
 
 
 def build_feature_vector(symptom_names: List[str], selected: List[str]) -> np.ndarray:
     features = np.zeros(len(symptom_names), dtype=float)
-    name_to_index = {name.lower().strip(): idx for idx, name in enumerate(symptom_names)}
+    # Exact names first, then typo/spacing-tolerant matches ("head ache", "feverish")
+    index = index_for(symptom_names)
     for s in selected:
-        key = s.lower().strip()
-        if key in name_to_index:
-            features[name_to_index[key]] = 1.0
+        idx = index.resolve_index(s)
+        if idx is not None:
+            features[idx] = 1.0
     return features.reshape(1, -1)
 
 
-def interactive_loop(model, label_encoder, symptom_names: List[str]):
+def interactive_loop(predictor: Predictor):
+    symptom_names = predictor.feature_names
     print("\n" + "=" * 60)
     print("🩺 Symptom Checker (XGBoost)")
     print("=" * 60)
@@ -161,22 +149,19 @@ def interactive_loop(model, label_encoder, symptom_names: List[str]):
                 print("⚠️  Please enter at least one symptom.")
                 continue
 
-            x = build_feature_vector(symptom_names, selected)
-            proba = model.predict_proba(x)[0]
-            top3_idx = np.argsort(proba)[-3:][::-1]
-            top1 = top3_idx[0]
-
-            top1_label = label_encoder.inverse_transform([top1])[0]
-            top1_conf = proba[top1]
+            predictions = predictor.predict(selected, top_k=3)
+            if not predictions:
+                print("⚠️  No condition above the confidence threshold.")
+                continue
+            top1 = predictions[0]
 
             print("\n📊 Prediction Results")
             print("-" * 60)
-            print(f"🏥 Primary Diagnosis: {top1_label}")
-            print(f"📈 Confidence: {top1_conf:.4f} ({top1_conf*100:.2f}%)")
+            print(f"🏥 Primary Diagnosis: {top1.disease}")
+            print(f"📈 Confidence: {top1.confidence:.4f} ({top1.confidence_percent})")
             print("\n🏆 Top 3 Possible Conditions:")
-            for rank, idx in enumerate(top3_idx, start=1):
-                label = label_encoder.inverse_transform([idx])[0]
-                print(f"  {rank}. {label}: {proba[idx]:.4f} ({proba[idx]*100:.2f}%)")
+            for p in predictions:
+                print(f"  {p.rank}. {p.disease}: {p.confidence:.4f} ({p.confidence_percent})")
 
         except KeyboardInterrupt:
             print("\n👋 Interrupted. Goodbye!")
@@ -219,12 +204,12 @@ def main():
 
     if args.interactive_only:
         try:
-            model, label_encoder, feature_names = load_artifacts(args.artifacts_prefix)
+            predictor = get_predictor(args.artifacts_prefix)
         except FileNotFoundError as e:
             print(str(e))
             print("Train and save first, e.g.:\n  python symptom_checker/symtom_checker.py --csv cleaned_dataset.csv --save-prefix symptom_checker/symptom_model")
             return
-        interactive_loop(model, label_encoder, feature_names)
+        interactive_loop(predictor)
         return
 
     if args.eval_only:
@@ -265,7 +250,7 @@ def main():
         for p in paths:
             print(f" - {p}")
 
-    interactive_loop(model, label_encoder, symptom_names)
+    interactive_loop(Predictor(ArtifactSet(model, symptom_names, label_encoder.classes_)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+"""
+Shared symptom model engine
+
+Artifact loading, symptom matching, encoding, scoring backends, the probability cache
+and the ranking policy used by every symptom prediction entry point (the FastAPI
+services, the CLIs and the benchmarks). The package only imports its own modules,
+numpy and xgboost; measurements go to a MetricsHook, a no-op until a service installs
+one with set_metrics_hook.
+"""
+from .artifacts import ArtifactSet, load_artifact_set
+from .backends import BACKENDS, Backend, ClassifierBackend, InplaceBackend, register_backend
+from .hooks import MetricsHook, set_metrics_hook
+from .predictor import DEFAULT_TOP_K, MIN_CONFIDENCE, Prediction, Predictor, get_predictor
+
+__all__ = [
+    "ArtifactSet",
+    "BACKENDS",
+    "Backend",
+    "ClassifierBackend",
+    "DEFAULT_TOP_K",
+    "InplaceBackend",
+    "MIN_CONFIDENCE",
+    "MetricsHook",
+    "Prediction",
+    "Predictor",
+    "get_predictor",
+    "load_artifact_set",
+    "register_backend",
+    "set_metrics_hook",
+]
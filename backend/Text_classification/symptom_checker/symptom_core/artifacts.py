@@ -0,0 +1,87 @@
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+import xgboost as xgb
+
+from .prediction_cache import LRUCache
+from .symptom_matcher import FuzzySymptomIndex, index_for
+
+
+class ArtifactSet:
+    """
+    A trained symptom model with its vocabulary and disease labels
+
+    Owns the fuzzy symptom index and the probability cache, so every Predictor built
+    on the same artifacts shares them.
+    """
+
+    def __init__(
+        self,
+        model: xgb.XGBClassifier,
+        feature_names: Sequence[str],
+        labels: Sequence,
+        prefix: Optional[str] = None,
+        name: Optional[str] = None,
+        cache_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            model: Trained classifier
+            feature_names: Feature names in model column order
+            labels: Disease label per class index
+            prefix: Artifact prefix the set was loaded from, if any
+            name: Model name; caches of named sets report as "predictions:<name>"
+            cache_size: Cached probability vectors (SYMPTOM_CACHE_SIZE by default)
+        """
+        self.model = model
+        self.feature_names: List[str] = list(feature_names)
+        self.labels = labels
+        self.prefix = prefix
+        self.name = name
+        self.index: FuzzySymptomIndex = index_for(self.feature_names)
+        self.cache = LRUCache("predictions" if name is None else f"predictions:{name}", cache_size)
+
+    @property
+    def booster(self) -> xgb.Booster:
+        return self.model.get_booster()
+
+    @property
+    def paths(self) -> List[str]:
+        return [] if self.prefix is None else [f"{self.prefix}{suffix}" for suffix in (".json", ".features.txt", ".labels.npy")]
+
+    def disease_name(self, class_idx: int) -> str:
+        return str(self.labels[class_idx]) if class_idx < len(self.labels) else f"Disease_{class_idx}"
+
+
+def load_artifact_set(prefix: str, name: Optional[str] = None, cache_size: Optional[int] = None) -> ArtifactSet:
+    """
+    Load `<prefix>.json`, `<prefix>.features.txt` and `<prefix>.labels.npy`
+
+    If the labels cannot be unpickled, generic "Disease_<i>" names are used so the
+    model still serves.
+
+    Raises:
+        FileNotFoundError: An artifact is missing
+    """
+    model_path = f"{prefix}.json"
+    labels_path = f"{prefix}.labels.npy"
+    features_path = f"{prefix}.features.txt"
+
+    if not (os.path.exists(model_path) and os.path.exists(labels_path) and os.path.exists(features_path)):
+        raise FileNotFoundError(f"Missing artifacts. Expected: {model_path}, {labels_path}, {features_path}")
+
+    model = xgb.XGBClassifier()
+    model.load_model(model_path)
+
+    with open(features_path, "r", encoding="utf-8") as f:
+        feature_names = [line.strip() for line in f if line.strip()]
+
+    try:
+        labels = np.load(labels_path, allow_pickle=True)
+    except Exception as e:
+        n_classes = model.n_classes_ if hasattr(model, "n_classes_") else 10
+        print(f"⚠️ Failed to load labels ({e}); using {n_classes} generic disease names")
+        labels = np.array([f"Disease_{i}" for i in range(n_classes)], dtype=object)
+
+    return ArtifactSet(model, feature_names, labels, prefix=prefix, name=name, cache_size=cache_size)
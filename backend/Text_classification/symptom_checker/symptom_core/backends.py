@@ -0,0 +1,88 @@
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .artifacts import ArtifactSet
+from .scorer import BufferedScorer
+
+Key = Tuple[int, ...]
+
+
+class Backend:
+    """Scores symptom sets, given as present feature indices, into class probabilities"""
+
+    name = "base"
+
+    def __init__(self, artifacts: ArtifactSet):
+        self.artifacts = artifacts
+
+    def predict_proba(self, rows: Sequence[Key]) -> np.ndarray:
+        """
+        Args:
+            rows: Present feature indices per row
+
+        Returns:
+            (len(rows), n_classes) array that may be reused by the calling thread's next
+            call on this backend; copy rows to keep them
+        """
+        raise NotImplementedError
+
+
+class ClassifierBackend(Backend):
+    """`XGBClassifier.predict_proba` on a dense float32 matrix (builds a DMatrix per call)"""
+
+    name = "classifier"
+
+    def predict_proba(self, rows: Sequence[Key]) -> np.ndarray:
+        X = np.zeros((len(rows), len(self.artifacts.feature_names)), dtype=np.float32)
+        for row, key in enumerate(rows):
+            X[row, list(key)] = 1.0
+        return self.artifacts.model.predict_proba(X)
+
+
+class InplaceBackend(Backend):
+    """
+    `Booster.inplace_predict` on per-thread preallocated buffers (see symptom_core.scorer.BufferedScorer)
+
+    Up to `max_batch` rows come back as a view into the scorer's output buffer. Larger
+    requests are scored in chunks into a per-thread output buffer that grows to the
+    largest request seen, so steady-state calls allocate no result arrays.
+    """
+
+    name = "inplace"
+
+    def __init__(self, artifacts: ArtifactSet, max_batch: Optional[int] = None):
+        super().__init__(artifacts)
+        booster = artifacts.booster
+        self.scorer = BufferedScorer(lambda: booster, lambda: len(artifacts.feature_names), max_batch=max_batch)
+        self._local = threading.local()
+
+    def _output(self, n_rows: int, n_classes: int) -> np.ndarray:
+        out = getattr(self._local, "out", None)
+        if out is None or len(out) < n_rows or out.shape[1] != n_classes:
+            out = self._local.out = np.empty((n_rows, n_classes), dtype=np.float32)
+        return out[:n_rows]
+
+    def predict_proba(self, rows: Sequence[Key]) -> np.ndarray:
+        chunk = self.scorer.max_batch
+        if len(rows) <= chunk:
+            return self.scorer.score(rows)
+        out = None
+        for start in range(0, len(rows), chunk):
+            scored = self.scorer.score(rows[start:start + chunk])
+            if out is None:
+                out = self._output(len(rows), scored.shape[1])
+            out[start:start + len(scored)] = scored
+        return out
+
+
+BACKENDS: Dict[str, Callable[[ArtifactSet], Backend]] = {
+    ClassifierBackend.name: ClassifierBackend,
+    InplaceBackend.name: InplaceBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[ArtifactSet], Backend]):
+    """Make a backend available to Predictor(backend=name)"""
+    BACKENDS[name] = factory
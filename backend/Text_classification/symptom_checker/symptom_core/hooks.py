@@ -0,0 +1,36 @@
+from contextlib import nullcontext
+from typing import ContextManager
+
+
+class MetricsHook:
+    """
+    Where the core reports stage timings and cache lookups
+
+    The default does nothing, so the core runs without prometheus_client (the CLIs,
+    notebooks, benchmarks). The service's metrics module installs a hook that
+    reports to Prometheus.
+    """
+
+    def observe(self, stage: str) -> ContextManager:
+        """Context manager timing one stage"""
+        return nullcontext()
+
+    def cache_request(self, cache: str, hit: bool):
+        """Record one lookup in the named cache"""
+
+
+_hook = MetricsHook()
+
+
+def set_metrics_hook(hook: MetricsHook):
+    """Send the core's measurements to `hook` from now on"""
+    global _hook
+    _hook = hook
+
+
+def observe(stage: str) -> ContextManager:
+    return _hook.observe(stage)
+
+
+def cache_request(cache: str, hit: bool):
+    _hook.cache_request(cache, hit)
@@ -0,0 +1,57 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .hooks import cache_request
+
+
+def symptom_key(feature_vector: np.ndarray) -> Tuple[int, ...]:
+    """
+    Cache key for an encoded symptom set: the sorted indices of present features
+
+    Different spellings of the same symptoms ("head ache", "Headache") encode to the
+    same vector and therefore share cache entries.
+    """
+    return tuple(int(i) for i in np.flatnonzero(feature_vector.reshape(-1)))
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache that reports hits and misses to the metrics hook"""
+
+    def __init__(self, name: str, maxsize: Optional[int] = None):
+        """
+        Args:
+            name: Cache name reported with each lookup
+            maxsize: Maximum entries; defaults to SYMPTOM_CACHE_SIZE (10000)
+        """
+        self.name = name
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv("SYMPTOM_CACHE_SIZE", "10000"))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                cache_request(self.name, False)
+                return None
+            self._data.move_to_end(key)
+        cache_request(self.name, True)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,199 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .artifacts import ArtifactSet, load_artifact_set
+from .backends import BACKENDS, Backend, Key
+from .hooks import observe
+
+DEFAULT_TOP_K = int(os.getenv("SYMPTOM_TOP_K", "5"))
+# Classes at or below this probability are left out of ranked predictions
+MIN_CONFIDENCE = float(os.getenv("SYMPTOM_MIN_CONFIDENCE", "0.01"))
+DEFAULT_BACKEND = os.getenv("SYMPTOM_BACKEND", "inplace")
+
+
+class Prediction(NamedTuple):
+    rank: int
+    class_index: int
+    disease: str
+    confidence: float
+
+    @property
+    def confidence_percent(self) -> str:
+        return f"{self.confidence * 100:.2f}%"
+
+
+class Predictor:
+    """
+    Encoding, scoring and ranking for one symptom model
+
+    The single place where symptom names become feature indices, indices become class
+    probabilities, and probabilities become ranked predictions. `predict`,
+    `predict_batch` and `predict_stream` apply the same encoding, cache and ranking
+    policy; batches score only the distinct uncached symptom sets, in one backend
+    call per `batch_size` sets.
+    """
+
+    def __init__(
+        self,
+        artifacts: ArtifactSet,
+        backend: Union[str, Backend] = DEFAULT_BACKEND,
+        top_k: Optional[int] = None,
+        min_confidence: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            artifacts: Model, vocabulary and labels
+            backend: Name registered in BACKENDS ("inplace", "classifier") or a Backend instance
+            top_k: Predictions per symptom set (SYMPTOM_TOP_K, 5)
+            min_confidence: Probability a prediction must exceed (SYMPTOM_MIN_CONFIDENCE, 0.01)
+            batch_size: Symptom sets per backend call in batch and stream mode (SYMPTOM_BATCH_SIZE, 256)
+        """
+        if isinstance(backend, str):
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown backend: {backend} (available: {', '.join(sorted(BACKENDS))})")
+            backend = BACKENDS[backend](artifacts)
+        self.artifacts = artifacts
+        self.backend = backend
+        self.top_k = top_k or DEFAULT_TOP_K
+        self.min_confidence = min_confidence if min_confidence is not None else MIN_CONFIDENCE
+        self.batch_size = batch_size or int(os.getenv("SYMPTOM_BATCH_SIZE", "256"))
+
+    @classmethod
+    def from_prefix(cls, prefix: str, **kwargs) -> "Predictor":
+        return cls(load_artifact_set(prefix), **kwargs)
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.artifacts.feature_names
+
+    @property
+    def cache(self):
+        return self.artifacts.cache
+
+    def disease_name(self, class_idx: int) -> str:
+        return self.artifacts.disease_name(class_idx)
+
+    def resolve(self, input_symptoms: Iterable[str]) -> Tuple[List[int], List[str]]:
+        """Feature index per matched input symptom (exact, then fuzzy), and the inputs that matched nothing"""
+        indices, unmatched = [], []
+        for symptom in input_symptoms:
+            i = self.artifacts.index.resolve_index(symptom)
+            if i is None:
+                unmatched.append(symptom)
+            else:
+                indices.append(i)
+        return indices, unmatched
+
+    def encode(self, input_symptoms: Iterable[str]) -> Key:
+        """Sorted, distinct feature indices of the input symptoms"""
+        return tuple(sorted(set(self.resolve(input_symptoms)[0])))
+
+    def vector(self, key: Key) -> np.ndarray:
+        """(1, n_features) binary feature vector for a symptom set"""
+        feature_vector = np.zeros((1, len(self.feature_names)))
+        feature_vector[0, list(key)] = 1
+        return feature_vector
+
+    def probabilities(self, key: Key) -> np.ndarray:
+        """Class probabilities for one symptom set, cached per set"""
+        probabilities = self.cache.get(key)
+        if probabilities is None:
+            with observe("predict_proba"):
+                probabilities = self.backend.predict_proba([key])[0].copy()
+            self.cache.put(key, probabilities)
+        return probabilities
+
+    def probabilities_batch(self, keys: Sequence[Key]) -> List[np.ndarray]:
+        """Class probabilities per symptom set; each distinct uncached set is scored once"""
+        found: Dict[Key, np.ndarray] = {}
+        missing: List[Key] = []
+        for key in dict.fromkeys(keys):
+            probabilities = self.cache.get(key)
+            if probabilities is None:
+                missing.append(key)
+            else:
+                found[key] = probabilities
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start:start + self.batch_size]
+            with observe("predict_proba"):
+                scored = self.backend.predict_proba(chunk)
+            for key, row in zip(chunk, scored):
+                # The backend may reuse `scored` on this thread's next call
+                probabilities = row.copy()
+                self.cache.put(key, probabilities)
+                found[key] = probabilities
+        return [found[key] for key in keys]
+
+    def rank(self, probabilities: np.ndarray, top_k: Optional[int] = None) -> List[Prediction]:
+        """Top k classes above the confidence threshold, highest first (ties keep class order)"""
+        order = np.argsort(-probabilities, kind="stable")[:top_k or self.top_k]
+        return [
+            Prediction(rank, int(i), self.disease_name(int(i)), float(probabilities[i]))
+            for rank, i in enumerate((i for i in order if probabilities[i] > self.min_confidence), 1)
+        ]
+
+    def predict(self, input_symptoms: Iterable[str], top_k: Optional[int] = None) -> List[Prediction]:
+        """Ranked predictions for one list of symptom names"""
+        return self.rank(self.probabilities(self.encode(input_symptoms)), top_k)
+
+    def predict_batch(self, batch: Sequence[Iterable[str]], top_k: Optional[int] = None) -> List[List[Prediction]]:
+        """Ranked predictions per list of symptom names"""
+        keys = [self.encode(symptoms) for symptoms in batch]
+        return [self.rank(probabilities, top_k) for probabilities in self.probabilities_batch(keys)]
+
+    def predict_stream(
+        self,
+        stream: Iterable[Iterable[str]],
+        batch_size: Optional[int] = None,
+        top_k: Optional[int] = None,
+    ) -> Iterator[List[Prediction]]:
+        """Ranked predictions per list of symptom names, scoring `batch_size` inputs at a time"""
+        batch_size = batch_size or self.batch_size
+        pending: List[Iterable[str]] = []
+        for symptoms in stream:
+            pending.append(symptoms)
+            if len(pending) >= batch_size:
+                yield from self.predict_batch(pending, top_k)
+                pending = []
+        if pending:
+            yield from self.predict_batch(pending, top_k)
+
+
+_lock = threading.Lock()
+_artifact_sets: Dict[Tuple[str, float], ArtifactSet] = {}
+_predictors: Dict[Tuple[str, float, str], Predictor] = {}
+
+
+def get_predictor(prefix: str, backend: str = DEFAULT_BACKEND) -> Predictor:
+    """
+    Shared Predictor for an artifact prefix
+
+    Every entry point in a process that asks for the same artifacts gets the same
+    loaded model, symptom index and probability cache. Artifacts are reloaded when
+    the model file changes.
+
+    Raises:
+        FileNotFoundError: An artifact is missing
+    """
+    path = os.path.abspath(prefix)
+    try:
+        version = os.path.getmtime(f"{path}.json")
+    except OSError:
+        version = 0.0
+    with _lock:
+        predictor = _predictors.get((path, version, backend))
+        if predictor is None:
+            artifacts = _artifact_sets.get((path, version))
+            if artifacts is None:
+                # Drop predictors of earlier versions of these artifacts
+                for stale in [k for k in _artifact_sets if k[0] == path]:
+                    del _artifact_sets[stale]
+                for stale in [k for k in _predictors if k[0] == path]:
+                    del _predictors[stale]
+                artifacts = _artifact_sets[(path, version)] = load_artifact_set(path)
+            predictor = _predictors[(path, version, backend)] = Predictor(artifacts, backend=backend)
+        return predictor
@@ -0,0 +1,100 @@
+import os
+import threading
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from .hooks import observe
+
+
+class BufferedScorer:
+    """
+    Class probabilities from symptom indices without per-request array allocation
+
+    Each worker thread owns a C-contiguous float32 input matrix and an output matrix
+    sized for `max_batch` rows. A request sets its symptom indices to 1 in the input
+    rows, calls `Booster.inplace_predict` on that slice (no DMatrix is built), copies
+    the result into the output buffer and clears the indices it set.
+
+    The returned array is a view into the calling thread's output buffer and is only
+    valid until that thread's next `score` call; copy it to keep it.
+    """
+
+    def __init__(
+        self,
+        booster: Callable[[], xgb.Booster],
+        n_features: Callable[[], int],
+        max_batch: Optional[int] = None,
+    ):
+        """
+        Args:
+            booster: Returns the current booster
+            n_features: Returns the model's feature count
+            max_batch: Maximum rows per call (SCORER_MAX_BATCH, 64)
+        """
+        self.booster = booster
+        self.n_features = n_features
+        self.max_batch = max_batch or int(os.getenv("SCORER_MAX_BATCH", "64"))
+        self._local = threading.local()
+        self._generation = 0
+        self._iteration_range: Optional[Tuple[int, int]] = None
+        self._n_classes: Optional[int] = None
+
+    def reset(self):
+        """Drop every thread's buffers after a model reload"""
+        self._generation += 1
+        self._iteration_range = None
+        self._n_classes = None
+
+    def _buffers(self, booster: xgb.Booster) -> Tuple[np.ndarray, np.ndarray]:
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            n_features = self.n_features()
+            if self._n_classes is None:
+                # Output width is only known from a prediction; binary models return one column
+                probe = booster.inplace_predict(np.zeros((1, n_features), dtype=np.float32), validate_features=False)
+                self._n_classes = 2 if probe.ndim == 1 else probe.shape[1]
+            local.inputs = np.zeros((self.max_batch, n_features), dtype=np.float32)
+            local.outputs = np.empty((self.max_batch, self._n_classes), dtype=np.float32)
+            local.generation = self._generation
+        return local.inputs, local.outputs
+
+    def _range(self, booster: xgb.Booster) -> Tuple[int, int]:
+        # Match XGBClassifier.predict_proba, which stops at the early-stopping best iteration
+        if self._iteration_range is None:
+            best = booster.attr("best_iteration")
+            self._iteration_range = (0, int(best) + 1) if best is not None else (0, 0)
+        return self._iteration_range
+
+    def score(self, rows: Sequence[Sequence[int]]) -> np.ndarray:
+        """
+        Probabilities for symptom sets given as present feature indices
+
+        Args:
+            rows: One index sequence per row, at most `max_batch` rows
+
+        Returns:
+            (len(rows), n_classes) float32 view into this thread's output buffer
+        """
+        n = len(rows)
+        if n > self.max_batch:
+            raise ValueError(f"Batch of {n} rows exceeds max_batch={self.max_batch}")
+        booster = self.booster()
+        inputs, outputs = self._buffers(booster)
+
+        for row, indices in enumerate(rows):
+            inputs[row, indices] = 1.0
+        try:
+            with observe("inplace_predict"):
+                result = booster.inplace_predict(inputs[:n], iteration_range=self._range(booster), validate_features=False)
+        finally:
+            for row, indices in enumerate(rows):
+                inputs[row, indices] = 0.0
+
+        if result.ndim == 1:
+            outputs[:n, 1] = result
+            np.subtract(1.0, result, out=outputs[:n, 0])
+        else:
+            np.copyto(outputs[:n], result)
+        return outputs[:n]
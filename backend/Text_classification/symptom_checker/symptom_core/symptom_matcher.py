@@ -0,0 +1,252 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Words that negate the symptom right after them in intake notes ("no fever", "denies chest pain")
+NEGATION_CUES = {"no", "not", "denies", "denied", "without", "negative", "absent"}
+NEGATION_WINDOW = 3
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Negation does not carry over a clause boundary ("no fever, but a bad cough")
+_CLAUSE = re.compile(r"[.,;:!?\n]|\bbut\b")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation, underscores and whitespace to single spaces"""
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def trigrams(text: str) -> List[str]:
+    """
+    Character trigrams of a normalized term, ignoring spaces
+
+    Spaces are dropped so that "head ache" and "headache" share every trigram; the
+    "$" padding lets short words and word boundaries count.
+    """
+    compact = "$" + normalize(text).replace(" ", "") + "$"
+    return sorted({compact[i:i + 3] for i in range(len(compact) - 2)})
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """1 - edit distance / length of the longer string, counting a swap of adjacent letters as one edit"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        before, previous = previous, current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+class FuzzySymptomIndex:
+    """
+    Trigram index over the model's feature names for typo- and spacing-tolerant lookup
+
+    Built once per vocabulary. A lookup walks the posting lists of the query's
+    trigrams (a few dozen dict hits for a typical symptom) and scores the candidates
+    by Dice similarity, so resolving a term costs microseconds rather than a scan of
+    every feature name. The best few candidates are re-scored by edit distance, which
+    catches single-letter typos in short words ("nausia") that break most trigrams.
+
+    `search` ranks loosely (partial terms, related names) for autocomplete. `resolve`
+    feeds the model, so beyond normalization variants it only accepts typo-level
+    matches by edit distance: "ear pain" must not quietly become back_pain. Resolved
+    terms are kept in a small LRU cache, shared by threads.
+    """
+
+    RERANK = 8
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        min_score: Optional[float] = None,
+        cache_size: int = 4096,
+        resolve_min_score: Optional[float] = None,
+    ):
+        """
+        Args:
+            feature_names: Model feature names, in model order
+            min_score: Minimum similarity (0-1) for a search result
+            cache_size: Resolved terms to remember
+            resolve_min_score: Minimum edit similarity (0-1) for a typo to resolve to a feature
+        """
+        self.feature_names = list(feature_names)
+        self.min_score = min_score if min_score is not None else float(os.getenv("SYMPTOM_FUZZY_MIN_SCORE", "0.55"))
+        self.resolve_min_score = (
+            resolve_min_score if resolve_min_score is not None else float(os.getenv("SYMPTOM_RESOLVE_MIN_SCORE", "0.8"))
+        )
+        self.cache_size = cache_size
+        self.index_of: Dict[str, int] = {}
+        self._exact: Dict[str, int] = {}
+        self._normalized: List[str] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for idx, name in enumerate(self.feature_names):
+            self.index_of.setdefault(name, idx)
+            key = normalize(name)
+            self._exact.setdefault(key, idx)
+            self._exact.setdefault(key.replace(" ", ""), idx)
+            self._normalized.append(key)
+            grams = trigrams(name)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(idx)
+        self._cache: "OrderedDict[str, Optional[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, query: str, limit: int = 10, min_score: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Best matching feature names for a (partial, misspelled) query
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum results
+            min_score: Minimum similarity, defaults to the index threshold
+
+        Returns:
+            (feature name, score) pairs, best first
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        threshold = self.min_score if min_score is None else min_score
+        scores = self._scores(key)
+        # Substring hits rank highly even when the query is much shorter than the name
+        for idx in scores:
+            if key in self._normalized[idx]:
+                scores[idx] = max(scores[idx], 0.75 + 0.25 * len(key) / len(self._normalized[idx]))
+        exact = self._exact.get(key, self._exact.get(key.replace(" ", "")))
+        if exact is not None:
+            scores[exact] = 1.0
+        ranked = sorted(
+            ((idx, score) for idx, score in scores.items() if score >= threshold),
+            key=lambda item: (-item[1], len(self._normalized[item[0]])),
+        )
+        return [(self.feature_names[idx], round(score, 4)) for idx, score in ranked[:limit]]
+
+    def resolve(self, term: str) -> Optional[str]:
+        """Feature name for a user-supplied symptom: exact match first, else a typo-level match"""
+        idx = self.resolve_index(term)
+        return None if idx is None else self.feature_names[idx]
+
+    def resolve_index(self, term: str) -> Optional[int]:
+        """Feature index for a user-supplied symptom, or None if it is not the same word or a typo of one"""
+        key = normalize(term)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        idx = self._exact.get(key, self._exact.get(key.replace(" ", "")))
+        if idx is None and key:
+            # Trigram scores only shortlist candidates; the edit distance decides
+            scores = self._scores(key)
+            compact = key.replace(" ", "")
+            best, best_similarity = None, self.resolve_min_score
+            for i in sorted(scores, key=lambda i: (-scores[i], len(self._normalized[i])))[:self.RERANK]:
+                similarity = edit_similarity(compact, self._normalized[i].replace(" ", ""))
+                if similarity >= best_similarity and (best is None or similarity > best_similarity):
+                    best, best_similarity = i, similarity
+            idx = best
+
+        with self._lock:
+            self._cache[key] = idx
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return idx
+
+    def _scores(self, key: str) -> Dict[int, float]:
+        grams = trigrams(key)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for idx in self._postings.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+        size = len(grams)
+        scores = {idx: 2.0 * count / (size + self._sizes[idx]) for idx, count in shared.items()}
+        compact = key.replace(" ", "")
+        for idx in sorted(scores, key=scores.get, reverse=True)[:self.RERANK]:
+            similarity = edit_similarity(compact, self._normalized[idx].replace(" ", ""))
+            if similarity > scores[idx]:
+                scores[idx] = similarity
+        return scores
+
+
+@lru_cache(maxsize=8)
+def _cached_index(feature_names: Tuple[str, ...]) -> FuzzySymptomIndex:
+    return FuzzySymptomIndex(feature_names)
+
+
+def index_for(feature_names: Sequence[str]) -> FuzzySymptomIndex:
+    """Shared index for a vocabulary, built on first use"""
+    return _cached_index(tuple(feature_names))
+
+
+class SymptomMatcher:
+    """
+    Maps free text onto the model's symptom vocabulary
+
+    Feature names are indexed as token tuples at load time, so extracting symptoms
+    from a note is a dictionary lookup per token window, longest phrase first.
+    """
+
+    def __init__(self, feature_names: List[str]):
+        self.feature_names = list(feature_names)
+        self._phrases: Dict[Tuple[str, ...], str] = {}
+        for name in self.feature_names:
+            tokens = tuple(normalize(name).split())
+            if tokens:
+                self._phrases.setdefault(tokens, name)
+        self._max_len = max((len(tokens) for tokens in self._phrases), default=0)
+
+    def lookup(self, term: str) -> str:
+        """Feature name for an exact (normalized) symptom name, or "" if unknown"""
+        return self._phrases.get(tuple(normalize(term).split()), "")
+
+    def extract(self, text: str) -> List[str]:
+        """
+        Find known symptoms mentioned in free text
+
+        Args:
+            text: Free-text note, e.g. "3 days of fever and dry cough, no rash"
+
+        Returns:
+            Matched feature names in order of appearance, without duplicates or negated mentions
+        """
+        found: List[str] = []
+        seen = set()
+        for clause in _CLAUSE.split(text.lower()):
+            tokens = normalize(clause).split()
+            i = 0
+            while i < len(tokens):
+                for length in range(min(self._max_len, len(tokens) - i), 0, -1):
+                    name = self._phrases.get(tuple(tokens[i:i + length]))
+                    if name is None:
+                        continue
+                    if name not in seen and not self._negated(tokens, i):
+                        seen.add(name)
+                        found.append(name)
+                    i += length
+                    break
+                else:
+                    i += 1
+        return found
+
+    @staticmethod
+    def _negated(tokens: List[str], start: int) -> bool:
+        window = tokens[max(0, start - NEGATION_WINDOW):start]
+        return any(token in NEGATION_CUES for token in window)
@@ -0,0 +1,159 @@
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from symptom_core import ArtifactSet, InplaceBackend, MetricsHook, Predictor, set_metrics_hook
+from symptom_core.scorer import BufferedScorer
+
+FEATURES = ["fever", "cough", "headache", "nausea", "rash", "fatigue"]
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist")
+    model.fit(X, y)
+    return ArtifactSet(model, FEATURES, np.array(["cold", "flu", "measles", "dengue"], dtype=object), cache_size=16)
+
+
+class RecordingHook(MetricsHook):
+    def __init__(self):
+        self.stages = []
+        self.lookups = []
+
+    @contextmanager
+    def observe(self, stage):
+        yield
+        self.stages.append(stage)
+
+    def cache_request(self, cache, hit):
+        self.lookups.append((cache, hit))
+
+
+@pytest.fixture
+def hook():
+    recorder = RecordingHook()
+    set_metrics_hook(recorder)
+    yield recorder
+    set_metrics_hook(MetricsHook())
+
+
+def test_core_imports_without_prometheus():
+    # Fresh interpreter with prometheus_client made unimportable
+    code = (
+        "import sys\n"
+        "class Block:\n"
+        "    def find_spec(self, name, path=None, target=None):\n"
+        "        if name.split('.')[0] == 'prometheus_client':\n"
+        "            raise ImportError(name)\n"
+        "sys.meta_path.insert(0, Block())\n"
+        "import symptom_core\n"
+        "assert 'metrics' not in sys.modules\n"
+    )
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=package_parent, check=True)
+
+
+def test_hook_receives_stage_timings_and_cache_lookups(artifacts, hook):
+    predictor = Predictor(artifacts, backend="inplace")
+    artifacts.cache.clear()
+    predictor.predict(["fever", "rash"])
+    predictor.predict(["Rash", "fever"])
+
+    assert hook.stages.count("predict_proba") == 1
+    assert "inplace_predict" in hook.stages
+    assert hook.lookups == [("predictions", False), ("predictions", True)]
+
+
+@pytest.mark.parametrize("backend", ["inplace", "classifier"])
+def test_backends_rank_the_same(artifacts, backend):
+    artifacts.cache.clear()
+    ranked = Predictor(artifacts, backend=backend, min_confidence=0).predict(["fever", "rash"], top_k=4)
+    assert [p.rank for p in ranked] == [1, 2, 3, 4]
+    assert ranked[0].disease == "dengue"
+    assert sum(p.confidence for p in ranked) == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.fixture(scope="module")
+def early_stopped():
+    # Noisy labels so validation loss turns up well before the last round
+    rng = np.random.default_rng(1)
+    X = (rng.random((400, len(FEATURES))) < 0.4).astype(np.float32)
+    y = (X[:, 0] + 2 * X[:, 4]).astype(int)
+    y = np.where(rng.random(len(y)) < 0.3, rng.integers(0, 4, len(y)), y)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=4, learning_rate=0.3, early_stopping_rounds=10, tree_method="hist")
+    model.fit(X[:300], y[:300], eval_set=[(X[300:], y[300:])], verbose=False)
+    booster = model.get_booster()
+    assert int(booster.attr("best_iteration")) + 1 < booster.num_boosted_rounds()
+    return model
+
+
+def dense(rows):
+    X = np.zeros((len(rows), len(FEATURES)), dtype=np.float32)
+    for row, key in enumerate(rows):
+        X[row, list(key)] = 1.0
+    return X
+
+
+ROWS = [(), (0,), (1, 3), (0, 4), (0, 2, 4, 5)]
+
+
+def test_buffered_scorer_stops_at_the_best_iteration(early_stopped):
+    scorer = BufferedScorer(early_stopped.get_booster, lambda: len(FEATURES))
+    np.testing.assert_allclose(scorer.score(ROWS), early_stopped.predict_proba(dense(ROWS)), rtol=1e-5, atol=1e-6)
+
+
+def test_buffered_scorer_buffers_are_per_thread(early_stopped):
+    scorer = BufferedScorer(early_stopped.get_booster, lambda: len(FEATURES))
+    expected = early_stopped.predict_proba(dense(ROWS))
+    barrier = threading.Barrier(4)
+
+    def work(i):
+        key = ROWS[i]
+        first = scorer.score([key])
+        barrier.wait()  # every thread holds its result while the others score
+        for other in ROWS:
+            scorer.score([other])
+        barrier.wait()
+        again = scorer.score([key])
+        return first, again
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(work, range(4)))
+
+    for i, (first, again) in enumerate(results):
+        np.testing.assert_allclose(again[0], expected[i], rtol=1e-5, atol=1e-6)
+        # Same thread, same buffer; no buffer is shared with another thread
+        assert np.shares_memory(first, again)
+        assert not any(np.shares_memory(first, other) for j, (other, _) in enumerate(results) if j != i)
+
+
+def test_inplace_backend_reuses_its_output(early_stopped):
+    artifacts = ArtifactSet(early_stopped, FEATURES, np.array(["cold", "flu", "measles", "dengue"], dtype=object), cache_size=16)
+    backend = InplaceBackend(artifacts, max_batch=2)
+    expected = early_stopped.predict_proba(dense(ROWS))
+
+    small = backend.predict_proba(ROWS[:2])
+    np.testing.assert_allclose(small, expected[:2], rtol=1e-5, atol=1e-6)
+    assert np.shares_memory(small, backend.predict_proba(ROWS[2:4]))
+
+    # More rows than max_batch are scored in chunks into one reused array
+    large = backend.predict_proba(ROWS)
+    np.testing.assert_allclose(large, expected, rtol=1e-5, atol=1e-6)
+    assert np.shares_memory(large, backend.predict_proba(ROWS[::-1]))
+
+    # The predictor caches copies, so reuse cannot change cached rows
+    predictor = Predictor(artifacts, backend=backend)
+    predictor.probabilities_batch(ROWS)
+    cached = artifacts.cache.get(ROWS[1])
+    backend.predict_proba(ROWS[::-1])
+    np.testing.assert_allclose(cached, expected[1], rtol=1e-5, atol=1e-6)
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from symptom_core.symptom_matcher import FuzzySymptomIndex, SymptomMatcher, edit_similarity
+
+FEATURES = [
+    "fever", "high_fever", "cough", "headache", "nausea", "skin_rash", "chest_pain", "abdominal_pain",
+    "back_pain", "stomach_pain", "knee_pain", "weight_gain", "fatigue",
+]
+
+
+@pytest.fixture
+def index():
+    return FuzzySymptomIndex(FEATURES, min_score=0.55)
+
+
+@pytest.mark.parametrize("term, feature", [
+    ("nausia", "nausea"),
+    ("feverr", "fever"),
+    ("couhg", "cough"),
+    ("chset pain", "chest_pain"),
+    ("abdominl pain", "abdominal_pain"),
+    ("head ache", "headache"),
+    ("Skin Rash", "skin_rash"),
+])
+def test_misspellings_resolve(index, term, feature):
+    assert index.resolve(term) == feature
+
+
+def test_unrelated_terms_do_not_resolve(index):
+    assert index.resolve("xyz") is None
+    assert index.search("xyz") == []
+
+
+@pytest.mark.parametrize("term", [
+    "ear pain", "arm pain", "tooth pain", "eye pain", "leg pain", "low fever", "heart pain", "weight",
+])
+def test_lookalike_symptoms_are_not_swapped_in(index, term):
+    # Search may still suggest them; the prediction path must not use them
+    assert index.resolve(term) is None
+    assert index.search(term)
+
+
+def test_transposed_letters_are_one_edit():
+    assert edit_similarity("couhg", "cough") == pytest.approx(0.8)
+    assert edit_similarity("chset", "chest") == pytest.approx(0.8)
+    assert edit_similarity("hcset", "chest") == pytest.approx(0.6)
+
+
+def test_resolve_threshold_is_respected():
+    strict = FuzzySymptomIndex(FEATURES, resolve_min_score=0.9)
+    # Typos fall below a strict threshold; spacing and case variants are exact matches
+    assert strict.resolve("nausia") is None
+    assert strict.resolve("abdominl pain") == "abdominal_pain"
+    assert strict.resolve("head ache") == "headache"
+    assert FuzzySymptomIndex(FEATURES, resolve_min_score=0.8).resolve("nausia") == "nausea"
+
+
+def test_search_threshold_is_respected(index):
+    assert index.search("nausia") == [("nausea", 0.8333)]
+    assert index.search("nausia", min_score=0.9) == []
+    assert FuzzySymptomIndex(FEATURES, min_score=0.95).search("nausia") == []
+    assert all(score >= 0.55 for _, score in index.search("pain"))
+
+
+def test_search_completes_partial_terms(index):
+    # A short prefix ranks the names containing it, without resolving to either
+    assert [name for name, _ in index.search("pain")][:2] == ["back_pain", "knee_pain"]
+    assert index.resolve("pain") is None
+
+
+def test_resolved_terms_are_cached():
+    index = FuzzySymptomIndex(FEATURES, min_score=0.55, cache_size=2)
+    index.resolve("nausia")
+    index.resolve("Nausia")
+    assert (index.hits, index.misses) == (1, 1)
+    index.resolve("feverr")
+    index.resolve("couhg")
+    assert "nausia" not in index._cache
+
+
+def test_cache_is_safe_across_threads():
+    index = FuzzySymptomIndex(FEATURES, cache_size=8)
+    terms = [f"{name}{suffix}" for name in FEATURES for suffix in ("", "x", "s", " ")]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(index.resolve, terms * 20))
+    assert results[:4] == ["fever"] * 4
+    assert len(index._cache) <= 8
+    assert index.hits + index.misses == len(terms) * 20
+
+
+@pytest.fixture
+def matcher():
+    return SymptomMatcher(["fever", "cough", "headache", "chest_pain", "skin_rash", "pain"])
+
+
+@pytest.mark.parametrize("text, symptoms", [
+    ("no fever", []),
+    ("denies cough", []),
+    ("without headache or fever", []),
+    ("not really a cough", []),
+    ("patient denied chest pain", []),
+])
+def test_negated_mentions_are_dropped(matcher, text, symptoms):
+    assert matcher.extract(text) == symptoms
+
+
+@pytest.mark.parametrize("text, symptoms", [
+    # Negation stops at a clause boundary and after NEGATION_WINDOW tokens
+    ("No fever, but a bad cough", ["cough"]),
+    ("denies cough. Fever and chest pain", ["fever", "chest_pain"]),
+    ("no fever but headache", ["headache"]),
+    ("no problems in the last week, fever", ["fever"]),
+    ("no sleep for two nights with fever", ["fever"]),
+])
+def test_negation_does_not_reach_other_clauses(matcher, text, symptoms):
+    assert matcher.extract(text) == symptoms
+
+
+def test_extract_prefers_longest_phrase_and_dedupes(matcher):
+    assert matcher.extract("Chest pain, pain in the chest, CHEST   PAIN and fever fever") == ["chest_pain", "pain", "fever"]
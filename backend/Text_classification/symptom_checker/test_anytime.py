@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+import main
+from anytime import STOP_BUDGET, STOP_DECISIVE, STOP_FULL, AnytimePredictor
+from symptom_core import ArtifactSet, Predictor
+from symptom_core.scorer import BufferedScorer
+
+FEATURES = [f"symptom_{i}" for i in range(8)]
+LABELS = np.array(["cold", "flu", "measles", "dengue"], dtype=object)
+
+
+@pytest.fixture(scope="module")
+def model():
+    # Noisy labels so validation loss turns up well before the last round
+    rng = np.random.default_rng(0)
+    X = (rng.random((400, len(FEATURES))) < 0.4).astype(np.float32)
+    y = (X[:, 0] + 2 * X[:, 1]).astype(int)
+    y = np.where(rng.random(len(y)) < 0.3, rng.integers(0, 4, len(y)), y)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=4, learning_rate=0.3, early_stopping_rounds=10, tree_method="hist")
+    model.fit(X[:300], y[:300], eval_set=[(X[300:], y[300:])], verbose=False)
+    booster = model.get_booster()
+    assert int(booster.attr("best_iteration")) + 1 < booster.num_boosted_rounds()
+    return model
+
+
+def vector(*indices):
+    X = np.zeros((1, len(FEATURES)), dtype=np.float32)
+    X[0, list(indices)] = 1.0
+    return X
+
+
+def test_plan_ends_at_the_best_iteration(model):
+    booster = model.get_booster()
+    best_rounds = int(booster.attr("best_iteration")) + 1
+    anytime = AnytimePredictor(model.get_booster, stages=[0.1, 0.5, 1.0], sample_rate=0)
+    bounds, _ = anytime._plan()
+    assert bounds[-1] == best_rounds
+    assert bounds == sorted(set(bounds)) and bounds[0] >= 1
+    assert bounds == [max(1, round(best_rounds * s)) for s in (0.1, 0.5, 1.0)]
+
+
+def test_plan_uses_every_round_without_early_stopping():
+    rng = np.random.default_rng(1)
+    X = (rng.random((100, len(FEATURES))) < 0.4).astype(np.float32)
+    plain = xgb.XGBClassifier(n_estimators=7, max_depth=2).fit(X, X[:, 0].astype(int))
+    bounds, _ = AnytimePredictor(plain.get_booster, stages=[0.5, 1.0], sample_rate=0)._plan()
+    assert bounds == [4, 7]
+
+
+@pytest.mark.parametrize("indices", [(), (0,), (1, 3), (0, 1, 5, 7)])
+def test_full_staged_evaluation_matches_predict_proba(model, indices):
+    # A margin no stage reaches forces every stage
+    anytime = AnytimePredictor(model.get_booster, stages=[0.1, 0.25, 0.5, 1.0], min_margin=1e9, sample_rate=0)
+    result = anytime.predict(vector(*indices))
+    assert result["stop"] == STOP_FULL
+    assert result["rounds"] == result["total_rounds"] == int(model.get_booster().attr("best_iteration")) + 1
+    np.testing.assert_allclose(result["probabilities"], model.predict_proba(vector(*indices))[0], rtol=1e-5, atol=1e-6)
+
+
+def test_full_result_matches_the_buffered_scorer(model):
+    anytime = AnytimePredictor(model.get_booster, min_margin=1e9, sample_rate=0)
+    scorer = BufferedScorer(model.get_booster, lambda: len(FEATURES))
+    np.testing.assert_allclose(anytime.predict(vector(0, 1))["probabilities"], scorer.score([[0, 1]])[0], rtol=1e-5, atol=1e-6)
+
+
+def test_decisive_input_stops_after_the_first_stage(model):
+    anytime = AnytimePredictor(model.get_booster, stages=[0.5, 1.0], min_margin=0.0, sample_rate=0)
+    result = anytime.predict(vector(0, 1))
+    assert result["stop"] == STOP_DECISIVE
+    assert result["rounds"] == anytime._plan()[0][0] < result["total_rounds"]
+
+
+def test_spent_budget_stops_early(model):
+    anytime = AnytimePredictor(model.get_booster, stages=[0.1, 0.5, 1.0], min_margin=1e9, sample_rate=0)
+    result = anytime.predict(vector(0), budget=0)
+    assert result["stop"] == STOP_BUDGET
+    assert result["rounds"] == anytime._plan()[0][0]
+    np.testing.assert_allclose(result["probabilities"].sum(), 1.0, rtol=1e-5)
+
+
+def test_reset_replans(model):
+    anytime = AnytimePredictor(model.get_booster, sample_rate=0)
+    anytime._plan()
+    anytime.reset()
+    assert anytime._bounds is None and anytime._base_margin is None
+
+
+@pytest.fixture
+def service(model, monkeypatch):
+    artifacts = ArtifactSet(model, FEATURES, LABELS, cache_size=16)
+    monkeypatch.setattr(main, "model", model)
+    monkeypatch.setattr(main, "feature_names", FEATURES)
+    monkeypatch.setattr(main, "predictor", Predictor(artifacts, backend="inplace"))
+    monkeypatch.setattr(main, "shadow", None)
+    return artifacts
+
+
+def check(symptoms, **kwargs):
+    return asyncio.run(main.check_symptoms(main.SymptomRequest(symptoms=symptoms, mode="anytime", **kwargs)))
+
+
+def test_only_full_anytime_results_are_cached(model, service, monkeypatch):
+    monkeypatch.setattr(main, "anytime", AnytimePredictor(model.get_booster, stages=[0.5, 1.0], min_margin=0.0, sample_rate=0))
+    response = check(["symptom_0", "symptom_1"])
+    assert response.success and response.inference.stop == STOP_DECISIVE
+    assert len(service.cache) == 0
+
+    monkeypatch.setattr(main, "anytime", AnytimePredictor(model.get_booster, min_margin=1e9, sample_rate=0))
+    response = check(["symptom_0", "symptom_1"])
+    assert response.inference.stop == STOP_FULL
+    cached = service.cache.get((0, 1))
+    np.testing.assert_allclose(cached, model.predict_proba(vector(0, 1))[0], rtol=1e-5, atol=1e-6)
+
+    # Later requests of either mode read the cached full result
+    full = asyncio.run(main.check_symptoms(main.SymptomRequest(symptoms=["symptom_0", "symptom_1"])))
+    assert full.predictions[0].confidence == pytest.approx(float(cached.max()))
+    assert check(["symptom_0", "symptom_1"]).inference is None
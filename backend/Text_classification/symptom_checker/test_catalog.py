@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import pytest
+
+from catalog import SymptomCatalog, artifact_checksum
+
+FEATURES = ["fever", "chest_pain", "chills", "abdominal_pain", "back_pain", "cough", "chest_tightness"]
+
+
+@pytest.fixture
+def catalog():
+    return SymptomCatalog(FEATURES, "ab" * 32)
+
+
+def test_version_follows_the_artifacts(tmp_path):
+    path = tmp_path / "model.json"
+    path.write_bytes(b"v1")
+    first = artifact_checksum([str(path)])
+    path.write_bytes(b"v2")
+    assert artifact_checksum([str(path)]) != first
+    assert SymptomCatalog(FEATURES, first).version == first[:32]
+
+
+def test_full_response_carries_etag(catalog):
+    response = catalog.response("api")
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{catalog.version}-api"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert json.loads(response.body)["symptoms"] == FEATURES
+
+
+def test_matching_etag_gets_304(catalog):
+    etag = catalog.response("api").headers["etag"]
+    response = catalog.response("api", if_none_match=etag)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+
+
+def test_any_encoding_of_the_current_version_is_fresh(catalog):
+    gzip_etag = catalog.response("api", accept_encoding="gzip").headers["etag"]
+    assert catalog.response("api", if_none_match=f"W/{gzip_etag}").status_code == 304
+    assert catalog.response("api", if_none_match='"other", *').status_code == 304
+
+
+def test_stale_or_other_variant_etag_gets_the_body(catalog):
+    stale = SymptomCatalog(FEATURES, "cd" * 32).response("api").headers["etag"]
+    assert catalog.response("api", if_none_match=stale).status_code == 200
+    legacy = catalog.response("legacy").headers["etag"]
+    assert catalog.response("api", if_none_match=legacy).status_code == 200
+
+
+def test_gzip_body_matches_identity(catalog):
+    response = catalog.response("legacy", accept_encoding="gzip;q=1.0, identity;q=0.5", if_none_match="")
+    if response.headers.get("content-encoding") == "br":
+        pytest.skip("brotli is installed and preferred")
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == {"symptoms": FEATURES}
+    assert catalog.response("legacy", accept_encoding="gzip;q=0").headers.get("content-encoding") is None
+
+
+def test_prefix_completion(catalog):
+    assert catalog.complete("ch") == ["chest_pain", "chest_tightness", "chills"]
+    assert catalog.complete("Chest P") == ["chest_pain"]
+    assert catalog.complete("ch", limit=2) == ["chest_pain", "chest_tightness"]
+
+
+def test_completion_matches_later_words_after_whole_names(catalog):
+    # "pain" starts no feature name, so matches come from the second word
+    assert catalog.complete("pain") == ["abdominal_pain", "back_pain", "chest_pain"]
+    assert catalog.complete("c") == ["chest_pain", "chest_tightness", "chills", "cough"]
+
+
+def test_completion_of_nothing(catalog):
+    assert catalog.complete("") == []
+    assert catalog.complete("zz") == []
@@ -0,0 +1,91 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from explain import ContributionBatcher, explain_classes
+from symptom_core.prediction_cache import LRUCache
+
+FEATURES = ["fever", "cough", "headache", "nausea", "rash", "fatigue"]
+KEYS = [(0,), (0, 4), (1, 2), (3,), (), (0, 1, 2, 3, 4, 5), (2, 5)]
+
+
+@pytest.fixture(scope="module")
+def booster():
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist")
+    model.fit(X, y)
+    return model.get_booster()
+
+
+def unbatched(booster, key):
+    row = np.zeros((1, len(FEATURES)), dtype=np.float32)
+    row[0, list(key)] = 1.0
+    return booster.predict(xgb.DMatrix(row), pred_contribs=True, validate_features=False)[0]
+
+
+class CountingBooster:
+    def __init__(self, booster):
+        self.booster = booster
+        self.batches = []
+
+    def predict(self, dmatrix, **kwargs):
+        self.batches.append(dmatrix.num_row())
+        return self.booster.predict(dmatrix, **kwargs)
+
+
+def make_batcher(booster, **kwargs):
+    return ContributionBatcher(lambda: booster, lambda: len(FEATURES), cache=LRUCache("test-explanations", 100), **kwargs)
+
+
+async def explain_all(batcher, keys):
+    try:
+        return await asyncio.gather(*(batcher.contributions(key) for key in keys))
+    finally:
+        await batcher.close()
+
+
+def test_batched_contributions_match_unbatched(booster):
+    counting = CountingBooster(booster)
+    results = asyncio.run(explain_all(make_batcher(counting, max_batch=32, max_wait=0.05), KEYS))
+
+    assert counting.batches == [len(KEYS)]
+    for key, contribs in zip(KEYS, results):
+        assert contribs.shape == (4, len(FEATURES) + 1)
+        np.testing.assert_allclose(contribs, unbatched(booster, key), rtol=1e-5, atol=1e-6)
+
+
+def test_max_batch_splits_calls(booster):
+    counting = CountingBooster(booster)
+    results = asyncio.run(explain_all(make_batcher(counting, max_batch=3, max_wait=0.05), KEYS))
+    assert counting.batches == [3, 3, 1]
+    for key, contribs in zip(KEYS, results):
+        np.testing.assert_allclose(contribs, unbatched(booster, key), rtol=1e-5, atol=1e-6)
+
+
+def test_identical_keys_share_one_row_and_are_cached(booster):
+    counting = CountingBooster(booster)
+    batcher = make_batcher(counting, max_batch=32, max_wait=0.05)
+
+    async def scenario():
+        first = await asyncio.gather(*(batcher.contributions((0, 4)) for _ in range(5)))
+        again = await batcher.contributions((0, 4))
+        await batcher.close()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert counting.batches == [1]
+    assert all(contribs is first[0] for contribs in first)
+    assert again is first[0]
+
+
+def test_explanation_sums_to_the_margin(booster):
+    contribs = unbatched(booster, (0, 4))
+    margins = booster.predict(xgb.DMatrix(np.array([[1, 0, 0, 0, 1, 0]], dtype=np.float32)), output_margin=True)[0]
+    for item in explain_classes(contribs, (0, 4), [3, 0], FEATURES):
+        total = item["bias"] + sum(c["contribution"] for c in item["contributions"]) + item["absent_symptoms_contribution"]
+        assert total == pytest.approx(margins[item["class_index"]], abs=1e-4)
+        assert {c["symptom"] for c in item["contributions"]} == {"fever", "rash"}
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from next_question import QuestionSelector
+from symptom_core.prediction_cache import LRUCache
+
+N_FEATURES = 12
+FEATURES = [f"symptom_{i}" for i in range(N_FEATURES)]
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = (rng.random((600, N_FEATURES)) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 1].astype(int) + (X[:, 2:].sum(axis=1) > 3)
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4, tree_method="hist")
+    model.fit(X, y)
+    return model
+
+
+def make_selector(model, **kwargs):
+    return QuestionSelector(
+        model.predict_proba,
+        model.get_booster,
+        lambda: FEATURES,
+        cache=LRUCache("test-next-questions", 100),
+        **kwargs,
+    )
+
+
+def encode(key):
+    base = np.zeros((1, N_FEATURES), dtype=np.float32)
+    base[0, list(key)] = 1.0
+    return base
+
+
+def test_present_symptoms_are_not_candidates(model):
+    key = (0, 3)
+    ranking = make_selector(model, budget=10).rank(encode(key), key, limit=N_FEATURES)
+    asked = [q[0] for q in ranking["questions"]]
+    assert asked and not set(asked) & set(key)
+    assert ranking["candidates_scored"] == len(asked)
+    assert not ranking["truncated"]
+
+
+def test_already_asked_symptoms_are_excluded(model):
+    calls = []
+    selector = make_selector(model, budget=10)
+    selector.predict = lambda X: calls.append(len(X)) or model.predict_proba(X)
+    key = (0,)
+    best = [q[0] for q in selector.rank(encode(key), key, limit=N_FEATURES)["questions"]]
+    excluded = best[:2]
+    scored_calls = len(calls)
+
+    ranking = selector.rank(encode(key), key, exclude=excluded, limit=3)
+    assert [q[0] for q in ranking["questions"]] == [i for i in best if i not in excluded][:3]
+    # The cached full ranking is filtered, not rescored
+    assert len(calls) == scored_calls
+
+
+def test_questions_are_ranked_by_information_gain(model):
+    key = (4,)
+    questions = make_selector(model, budget=10).rank(encode(key), key, limit=N_FEATURES)["questions"]
+    gains = [gain for _, gain, _ in questions]
+    assert gains == sorted(gains, reverse=True)
+    assert all(gain >= 0 and 0 <= p_yes <= 1 for _, gain, p_yes in questions)
+
+
+def test_budget_cuts_scoring_short(model):
+    selector = make_selector(model, budget=0)
+    selector.CHUNK = 2
+    key = (5,)
+    ranking = selector.rank(encode(key), key, limit=N_FEATURES)
+    # The first chunk is always scored; the spent budget stops the rest
+    assert ranking["truncated"]
+    assert ranking["candidates_scored"] == 2
+    assert len(ranking["questions"]) == 2
+    # Partial rankings are not cached
+    assert selector.cache.get((key, 5)) is None
+
+
+def test_max_candidates_limits_scoring_to_highest_gain(model):
+    selector = make_selector(model, budget=10, max_candidates=3)
+    ranking = selector.rank(encode(()), (), limit=N_FEATURES)
+    assert sorted(q[0] for q in ranking["questions"]) == sorted(selector.gain_order()[:3].tolist())
@@ -0,0 +1,117 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from registry import LoadedModel, ModelRegistry, discover
+
+FEATURES = ["fever", "cough", "headache", "nausea", "rash", "fatigue"]
+NAMES = ["alpha", "beta", "gamma"]
+
+
+def save_artifacts(prefix, seed):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((200, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=3, tree_method="hist")
+    model.fit(X, y)
+    model.save_model(f"{prefix}.json")
+    np.save(f"{prefix}.labels.npy", np.array(["cold", "flu", "measles", "dengue"], dtype=object))
+    with open(f"{prefix}.features.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(FEATURES))
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    for seed, name in enumerate(NAMES):
+        save_artifacts(tmp_path / name, seed)
+    (tmp_path / "delta").mkdir()
+    save_artifacts(tmp_path / "delta" / "symptom_model", 3)
+    (tmp_path / "broken.features.txt").write_text("fever\n")
+    return tmp_path
+
+
+@pytest.fixture
+def model_bytes(models_dir):
+    return LoadedModel("alpha", str(models_dir / "alpha"), max_batch=4, max_wait=0.001, cache_size=10).memory_bytes
+
+
+def make_registry(models_dir, budget):
+    return ModelRegistry(str(models_dir), memory_budget=budget, max_batch=4, max_wait=0.001)
+
+
+def test_discover_finds_flat_and_nested_sets(models_dir):
+    assert sorted(discover(models_dir)) == ["alpha", "beta", "delta", "gamma"]
+
+
+def test_least_recently_used_model_is_evicted(models_dir, model_bytes):
+    # Room for two models (their sizes differ slightly, hence the margin)
+    registry = make_registry(models_dir, budget=int(2.5 * model_bytes))
+
+    async def scenario():
+        await registry.get("alpha")
+        await registry.get("beta")
+        await registry.get("alpha")  # beta is now least recently used
+        await registry.get("gamma")
+        loaded = registry.loaded()
+        await registry.close()
+        return loaded
+
+    assert asyncio.run(scenario()) == ["alpha", "gamma"]
+
+
+def test_requested_model_is_kept_over_budget(models_dir, model_bytes):
+    registry = make_registry(models_dir, budget=model_bytes // 2)
+
+    async def scenario():
+        await registry.get("alpha")
+        first = registry.loaded()
+        await registry.get("beta")
+        loaded = registry.loaded()
+        await registry.close()
+        return first, loaded
+
+    assert asyncio.run(scenario()) == (["alpha"], ["beta"])
+
+
+def test_unloaded_model_is_reloaded_and_predicts(models_dir, model_bytes):
+    registry = make_registry(models_dir, budget=int(1.5 * model_bytes))
+
+    async def scenario():
+        alpha = await registry.get("alpha")
+        key = alpha.encode(["fever", "rash"])
+        before = await alpha.predict(key)
+        await registry.get("beta")
+        assert registry.loaded() == ["beta"]
+        reloaded = await registry.get("alpha")
+        after = await reloaded.predict(key)
+        await registry.close()
+        return reloaded is alpha, before, after
+
+    same, before, after = asyncio.run(scenario())
+    assert not same
+    np.testing.assert_allclose(before, after)
+
+
+def test_batched_results_are_cached_as_standalone_rows(models_dir):
+    model = LoadedModel("alpha", str(models_dir / "alpha"), max_batch=4, max_wait=0.01, cache_size=10)
+    keys = [model.encode(symptoms) for symptoms in (["fever"], ["rash"], ["fever", "rash"])]
+
+    async def scenario():
+        results = await asyncio.gather(*(model.predict(key) for key in keys))
+        await model.close()
+        return results
+
+    results = asyncio.run(scenario())
+    for key, probabilities in zip(keys, results):
+        cached = model.cache.get(key)
+        assert cached is probabilities
+        assert cached.base is None and cached.flags.owndata
+    np.testing.assert_allclose(results[2], model.predictor.backend.predict_proba([keys[2]])[0])
+
+
+def test_unknown_model_raises(models_dir):
+    registry = make_registry(models_dir, budget=2**30)
+    with pytest.raises(KeyError):
+        asyncio.run(registry.get("broken"))
@@ -0,0 +1,97 @@
+import gc
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+import main
+import serve
+from symptom_core import ArtifactSet, Predictor
+
+FEATURES = ["fever", "cough", "headache", "nausea", "skin_rash", "fatigue"]
+
+
+@pytest.fixture
+def preloaded(monkeypatch):
+    """Run serve.preload with load_model_components swapped for a tiny in-memory model"""
+    rng = np.random.default_rng(0)
+    X = (rng.random((200, len(FEATURES))) < 0.3).astype(np.float32)
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=3, tree_method="hist")
+    model.fit(X, X[:, 0].astype(int) + 2 * X[:, 4].astype(int))
+    predictor = Predictor(ArtifactSet(model, FEATURES, np.array(["cold", "flu", "measles", "dengue"], dtype=object)))
+
+    def load_model_components():
+        monkeypatch.setattr(main, "predictor", predictor)
+        monkeypatch.setattr(main, "model", model)
+        return True
+
+    monkeypatch.setattr(main, "load_model_components", load_model_components)
+    assert serve.preload()
+    yield predictor
+    gc.unfreeze()
+
+
+def test_preload_freezes_the_loaded_components(preloaded):
+    assert gc.get_freeze_count() > 0
+    # Frozen objects are out of every collected generation
+    tracked = {id(o) for o in gc.get_objects()}
+    assert id(preloaded) not in tracked and id(preloaded.artifacts.index) not in tracked
+
+
+def test_failed_load_freezes_nothing(monkeypatch):
+    monkeypatch.setattr(main, "load_model_components", lambda: False)
+    assert not serve.preload()
+    assert gc.get_freeze_count() == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_predicts_with_the_preloaded_model(preloaded):
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read)
+            main.model.get_booster().set_param({"nthread": 1})
+            disease = main.predictor.predict(["fever", "skin_rash"])[0].disease
+            os.write(write, disease.encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        disease = f.read()
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    assert disease == "dengue"
+
+
+def test_single_worker_keeps_metrics_in_process(monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    assert serve.prepare_metrics_dir(1) is None
+    assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_metrics_aggregate_across_forked_workers(tmp_path):
+    (tmp_path / "counter_stale.db").write_bytes(b"left by an earlier run")
+    # Fresh interpreter: prometheus_client picks its storage once, at import
+    code = textwrap.dedent(f"""
+        import os
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory = {str(tmp_path)!r}
+        import serve
+        assert serve.prepare_metrics_dir(2) == directory
+        assert os.listdir(directory) == []
+        from metrics import ERRORS, render_metrics
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                ERRORS.labels("worker").inc()
+                os._exit(0)
+            os.waitpid(pid, 0)
+        body = render_metrics()[0].decode()
+        assert 'symptom_errors_total{{stage="worker"}} 2.0' in body, body
+    """)
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import xgboost as xgb
+from fastapi.testclient import TestClient
+
+import main
+import sessions as session_module
+from sessions import SessionStore, TriageSession
+from symptom_core import ArtifactSet, Predictor
+
+FEATURES = ["fever", "cough", "headache", "nausea", "skin_rash", "fatigue"]
+LABELS = np.array(["cold", "flu", "measles", "dengue"], dtype=object)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist")
+    model.fit(X, y)
+    return model
+
+
+@pytest.fixture
+def client(model, clock, monkeypatch):
+    predictor = Predictor(ArtifactSet(model, FEATURES, LABELS, cache_size=16), backend="inplace")
+    monkeypatch.setattr(main, "model", model)
+    monkeypatch.setattr(main, "feature_names", FEATURES)
+    monkeypatch.setattr(main, "predictor", predictor)
+    monkeypatch.setattr(main, "sessions", SessionStore(ttl=60, max_sessions=3))
+    # No `with`: startup (and its model loading) does not run
+    return TestClient(main.app)
+
+
+def test_apply_reports_changes():
+    session = TriageSession("s", len(FEATURES), expires_at=0)
+    assert session.apply(add=[0, 2])
+    session.probabilities = np.ones(4)
+    assert not session.apply(add=[0], remove=[3])  # already present / already absent
+    assert session.probabilities is not None
+    assert session.apply(remove=[0])
+    assert session.probabilities is None
+    assert session.present() == [2]
+
+
+def test_create_and_get(client):
+    created = client.post("/sessions", json={"symptoms": ["fever", "Skin Rash", "ear pain"]}).json()
+    assert created["success"]
+    assert created["symptoms"] == ["fever", "skin_rash"]
+    assert created["unmatched_symptoms"] == ["ear pain"]
+    assert created["predictions"] and created["expires_in"] == 60
+
+    fetched = client.get(f"/sessions/{created['session_id']}").json()
+    assert fetched["symptoms"] == created["symptoms"]
+    assert fetched["predictions"] == created["predictions"]
+
+
+def test_patch_adds_and_removes(client):
+    session_id = client.post("/sessions", json={"symptoms": ["fever", "cough"]}).json()["session_id"]
+
+    updated = client.patch(f"/sessions/{session_id}", json={"add": ["skin_rash", "cough"], "remove": ["cough"]}).json()
+    # Removes apply first, then adds
+    assert updated["symptoms"] == ["fever", "cough", "skin_rash"]
+
+    updated = client.patch(f"/sessions/{session_id}", json={"remove": ["cough", "headache", "ear pain"], "add": ["elbow"]}).json()
+    assert updated["success"]
+    assert updated["symptoms"] == ["fever", "skin_rash"]
+    assert updated["unmatched_symptoms"] == ["elbow", "ear pain"]
+
+
+def test_incremental_vector_equals_encoding_the_full_list(client):
+    steps = [
+        {"add": ["fever"]},
+        {"add": ["nausea", "headache"]},
+        {"remove": ["fever"], "add": ["fatigue"]},
+        {"remove": ["nausia"]},
+    ]
+    session_id = client.post("/sessions", json={"symptoms": ["cough"]}).json()["session_id"]
+    for step in steps:
+        response = client.patch(f"/sessions/{session_id}", json=step).json()
+
+    session = main.sessions.get(session_id)
+    expected = main.predictor.encode(["cough", "headache", "fatigue"])
+    assert tuple(session.present()) == expected
+    np.testing.assert_array_equal(session.feature_vector, main.predictor.vector(expected))
+    # And the prediction is the one for the full list
+    full = main.predictor.predict(["cough", "headache", "fatigue"])
+    assert [p["disease"] for p in response["predictions"]] == [p.disease for p in full]
+
+
+def test_expired_session_is_404(client, clock):
+    session_id = client.post("/sessions", json={"symptoms": ["fever"]}).json()["session_id"]
+    clock.now += 59
+    assert client.get(f"/sessions/{session_id}").status_code == 200
+    # The TTL slides on use
+    clock.now += 59
+    assert client.patch(f"/sessions/{session_id}", json={"add": ["cough"]}).status_code == 200
+    clock.now += 61
+    assert client.get(f"/sessions/{session_id}").status_code == 404
+    assert client.patch(f"/sessions/{session_id}", json={"add": ["cough"]}).status_code == 404
+    assert client.delete(f"/sessions/{session_id}").status_code == 404
+
+
+def test_unknown_session_is_404(client):
+    assert client.get("/sessions/nope").status_code == 404
+
+
+def test_least_recently_used_session_is_evicted_at_capacity(clock):
+    store = SessionStore(ttl=60, max_sessions=3)
+    first, second, third = (store.create(4) for _ in range(3))
+    assert store.get(first.id) is first  # second is now least recently used
+    fourth = store.create(4)
+    assert len(store) == 3
+    assert store.get(second.id) is None
+    assert all(store.get(s.id) is s for s in (first, third, fourth))
+
+
+def test_expired_sessions_are_dropped_before_evicting(clock):
+    store = SessionStore(ttl=60, max_sessions=3)
+    old = store.create(4)
+    clock.now += 30
+    kept = [store.create(4) for _ in range(2)]
+    clock.now += 31
+    store.create(4)
+    assert len(store) == 3
+    assert store.get(old.id) is None
+    assert all(store.get(s.id) is s for s in kept)
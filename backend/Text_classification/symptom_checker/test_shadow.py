@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xgboost as xgb
+from prometheus_client import REGISTRY
+
+from registry import LoadedModel
+from shadow import ShadowEvaluator, spearman
+
+FEATURES = ["fever", "cough", "headache", "nausea", "rash", "fatigue"]
+LABELS = ["cold", "flu", "measles", "dengue"]
+SYMPTOM_SETS = [["fever"], ["fever", "rash"], ["rash"], ["cough", "headache"]]
+
+
+@pytest.fixture(scope="module")
+def candidate(tmp_path_factory):
+    prefix = tmp_path_factory.mktemp("shadow") / "candidate"
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist")
+    model.fit(X, y)
+    model.save_model(f"{prefix}.json")
+    np.save(f"{prefix}.labels.npy", np.array(LABELS, dtype=object))
+    with open(f"{prefix}.features.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(FEATURES))
+    return LoadedModel("candidate", str(prefix), max_batch=4, max_wait=0.001, cache_size=10)
+
+
+def reordered_primary(candidate):
+    """
+    A live model with the candidate's scores but its own label order, plus a disease
+    the candidate does not know
+    """
+    labels = ["dengue", "extra", "cold", "measles", "flu"]
+    order = [LABELS.index(label) if label in LABELS else None for label in labels]
+
+    def score(symptoms):
+        probabilities = candidate.predictor.backend.predict_proba([candidate.encode(symptoms)])[0]
+        return np.array([0.0 if i is None else probabilities[i] for i in order])
+
+    return score, lambda: labels
+
+
+async def mirror(evaluator, symptom_sets):
+    queued = [evaluator.submit(symptoms) for symptoms in symptom_sets]
+    for _ in range(200):
+        if evaluator.compared + evaluator.failed >= sum(queued):
+            break
+        await asyncio.sleep(0.01)
+    summary = evaluator.summary()
+    evaluator._worker.cancel()
+    return queued, summary
+
+
+def test_labels_are_aligned_by_name(candidate):
+    score, labels = reordered_primary(candidate)
+    evaluator = ShadowEvaluator(candidate, score, labels, sample_rate=1.0, queue_size=10)
+    queued, summary = asyncio.run(mirror(evaluator, SYMPTOM_SETS))
+
+    assert all(queued)
+    assert summary["compared"] == len(SYMPTOM_SETS) and summary["failed"] == 0
+    # Same model under a different label order: full agreement once matched by name
+    assert summary["top1_agreement"] == 1.0
+    assert summary["mean_rank_correlation"] == pytest.approx(1.0)
+
+
+def test_full_queue_drops_requests(candidate):
+    score, labels = reordered_primary(candidate)
+    evaluator = ShadowEvaluator(candidate, score, labels, sample_rate=1.0, queue_size=2)
+    dropped = REGISTRY.get_sample_value("symptom_shadow_dropped_total") or 0.0
+
+    async def scenario():
+        # The worker cannot run until this coroutine yields, so the queue fills
+        queued = [evaluator.submit(symptoms) for symptoms in SYMPTOM_SETS]
+        queue_size = evaluator._queue.qsize()
+        evaluator._worker.cancel()
+        return queued, queue_size
+
+    queued, queue_size = asyncio.run(scenario())
+    assert queued == [True, True, False, False]
+    assert queue_size == 2
+    assert REGISTRY.get_sample_value("symptom_shadow_dropped_total") == dropped + 2
+
+
+def test_unsampled_requests_are_not_queued(candidate):
+    score, labels = reordered_primary(candidate)
+    evaluator = ShadowEvaluator(candidate, score, labels, sample_rate=0.0)
+    assert not evaluator.submit(["fever"])
+    assert evaluator._queue is None
+
+
+def test_spearman():
+    assert spearman(np.array([0.1, 0.5, 0.4]), np.array([0.2, 0.9, 0.3])) == pytest.approx(1.0)
+    assert spearman(np.array([0.1, 0.5, 0.4]), np.array([0.9, 0.1, 0.2])) == pytest.approx(-1.0)
+    assert spearman(np.array([0.3]), np.array([0.7])) == 1.0
@@ -0,0 +1,119 @@
+import asyncio
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from symptom_core import ArtifactSet, Predictor
+from symptom_core.symptom_matcher import SymptomMatcher
+from triage import PATH_LLM_FEW_MATCHES, PATH_LLM_LOW_CONFIDENCE, PATH_LOCAL, PATH_LOCAL_FALLBACK, HybridTriage
+
+FEATURES = ["fever", "cough", "headache", "nausea", "skin_rash", "chest_pain"]
+LLM_ANALYSIS = {"potential_conditions": ["flu"], "urgency": "low"}
+
+
+class FakeLLM:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    async def analyze(self, text):
+        self.calls.append(text)
+        if self.error is not None:
+            raise self.error
+        return LLM_ANALYSIS
+
+
+def fixed_scorer(top):
+    """Scorer whose top-1 probability is `top`, recording what it was given"""
+    def score(symptoms):
+        score.calls.append(list(symptoms))
+        rest = (1 - top) / 3
+        return np.array([top, rest, rest, rest])
+    score.calls = []
+    return score
+
+
+def triage(text, scorer, llm=None, min_confidence=0.5, min_matches=2):
+    engine = HybridTriage(SymptomMatcher(FEATURES), scorer, llm=llm, min_confidence=min_confidence, min_matches=min_matches)
+    return asyncio.run(engine.triage(text))
+
+
+def test_confident_local_answer_skips_the_llm():
+    llm = FakeLLM()
+    result = triage("fever and cough", fixed_scorer(0.9), llm)
+    assert result["path"] == PATH_LOCAL
+    assert result["matched_symptoms"] == ["fever", "cough"]
+    assert result["llm_analysis"] is None and llm.calls == []
+
+
+def test_thresholds_are_inclusive():
+    # Exactly min_matches symptoms and exactly min_confidence stay local
+    llm = FakeLLM()
+    assert triage("fever and cough", fixed_scorer(0.5), llm)["path"] == PATH_LOCAL
+    assert llm.calls == []
+
+
+def test_confidence_just_below_threshold_asks_the_llm():
+    llm = FakeLLM()
+    result = triage("fever and cough", fixed_scorer(0.49), llm)
+    assert result["path"] == PATH_LLM_LOW_CONFIDENCE
+    assert result["llm_analysis"] == LLM_ANALYSIS
+    assert llm.calls == ["fever and cough"]
+    assert result["top_confidence"] == pytest.approx(0.49)
+
+
+def test_one_match_short_asks_the_llm():
+    llm = FakeLLM()
+    scorer = fixed_scorer(0.99)
+    result = triage("just a fever", scorer, llm)
+    assert result["path"] == PATH_LLM_FEW_MATCHES
+    assert len(llm.calls) == 1
+    # The local prediction is still computed and returned alongside
+    assert scorer.calls == [["fever"]]
+    assert result["probabilities"] is not None
+
+
+def test_no_matches_asks_the_llm_without_scoring():
+    scorer = fixed_scorer(0.99)
+    result = triage("feeling odd", scorer, FakeLLM(), min_matches=1)
+    assert result["path"] == PATH_LLM_FEW_MATCHES
+    assert scorer.calls == [] and result["probabilities"] is None
+
+
+@pytest.mark.parametrize("error", [ConnectionError("provider down"), ValueError("unparseable response")])
+def test_llm_failure_falls_back_to_local(error):
+    llm = FakeLLM(error)
+    result = triage("fever and cough", fixed_scorer(0.3), llm)
+    assert result["path"] == PATH_LOCAL_FALLBACK
+    assert result["llm_error"] == str(error)
+    assert result["llm_analysis"] is None
+    assert result["probabilities"] is not None and len(llm.calls) == 1
+
+
+def test_missing_llm_falls_back_to_local():
+    result = triage("fever", fixed_scorer(0.9))
+    assert result["path"] == PATH_LOCAL_FALLBACK
+    assert result["llm_error"] == "LLM analyzer not configured"
+
+
+def test_negated_symptoms_are_not_scored():
+    scorer = fixed_scorer(0.9)
+    result = triage("No fever, but a bad cough and chest pain. Denies headache", scorer, FakeLLM())
+    assert result["matched_symptoms"] == ["cough", "chest_pain"]
+    assert scorer.calls == [["cough", "chest_pain"]]
+
+
+def test_with_a_real_predictor():
+    rng = np.random.default_rng(0)
+    X = (rng.random((300, len(FEATURES))) < 0.3).astype(np.float32)
+    y = X[:, 0].astype(int) + 2 * X[:, 4].astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, tree_method="hist").fit(X, y)
+    predictor = Predictor(ArtifactSet(model, FEATURES, np.array(["cold", "flu", "measles", "dengue"], dtype=object)))
+
+    def scorer(symptoms):
+        return predictor.probabilities(predictor.encode(symptoms))
+
+    result = triage("fever with a skin rash", scorer, FakeLLM(), min_confidence=0.0)
+    assert result["path"] == PATH_LOCAL
+    assert predictor.rank(result["probabilities"])[0].disease == "dengue"
@@ -0,0 +1,125 @@
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from metrics import LLM_CALLS_SAVED, TRIAGE_DECISIONS, observe
+from symptom_core.symptom_matcher import SymptomMatcher
+
+logger = logging.getLogger(__name__)
+
+# lib/src/services holds the LLM-based SymptomAnalyzer shared with the app
+SERVICES_DIR = Path(__file__).resolve().parents[3] / "lib" / "src" / "services"
+
+# Decision paths, also the values of the triage_decisions_total "path" label
+PATH_LOCAL = "local"
+PATH_LLM_LOW_CONFIDENCE = "llm_low_confidence"
+PATH_LLM_FEW_MATCHES = "llm_few_matches"
+PATH_LOCAL_FALLBACK = "local_fallback"
+
+
+def load_llm_analyzer() -> Optional[Any]:
+    """
+    Build the LLM SymptomAnalyzer when an API key is configured
+
+    Returns:
+        SymptomAnalyzer, or None if HUGGINGFACE_API_KEY is unset or the analyzer cannot be imported
+    """
+    api_key = os.getenv("HUGGINGFACE_API_KEY")
+    if not api_key:
+        return None
+    if str(SERVICES_DIR) not in sys.path:
+        sys.path.append(str(SERVICES_DIR))
+    try:
+        from symptom_analyzer import SymptomAnalyzer
+    except ImportError as e:
+        logger.warning(f"LLM triage disabled, cannot import SymptomAnalyzer: {str(e)}")
+        return None
+    return SymptomAnalyzer(api_key, max_concurrency=int(os.getenv("TRIAGE_LLM_CONCURRENCY", "8")))
+
+
+class HybridTriage:
+    """
+    Local-first triage of free-text symptom notes
+
+    The note is mapped onto the model vocabulary and scored with XGBoost. The LLM is
+    only called when fewer than `min_matches` symptoms were recognized or the top-1
+    confidence is below `min_confidence`; if it is unavailable or fails, the local
+    prediction is returned.
+    """
+
+    def __init__(
+        self,
+        matcher: SymptomMatcher,
+        scorer: Callable[[List[str]], np.ndarray],
+        llm: Optional[Any] = None,
+        min_confidence: Optional[float] = None,
+        min_matches: Optional[int] = None,
+    ):
+        """
+        Args:
+            matcher: Free text to feature name matcher
+            scorer: Maps matched feature names to class probabilities
+            llm: Object with `async analyze(text) -> dict` (SymptomAnalyzer)
+            min_confidence: Top-1 probability needed to answer locally
+            min_matches: Recognized symptoms needed to answer locally
+        """
+        self.matcher = matcher
+        self.scorer = scorer
+        self.llm = llm
+        self.min_confidence = min_confidence if min_confidence is not None else float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.5"))
+        self.min_matches = min_matches if min_matches is not None else int(os.getenv("TRIAGE_MIN_MATCHES", "2"))
+
+    async def triage(self, text: str) -> Dict[str, Any]:
+        """
+        Triage one note
+
+        Returns:
+            Dict with the decision `path`, `matched_symptoms`, local `probabilities`
+            (None when nothing matched), `top_confidence`, and `llm_analysis` /
+            `llm_error` when the LLM was consulted
+        """
+        with observe("symptom_extraction"):
+            matched = self.matcher.extract(text)
+
+        probabilities = None
+        top_confidence = 0.0
+        if matched:
+            probabilities = self.scorer(matched)
+            top_confidence = float(np.max(probabilities))
+
+        result: Dict[str, Any] = {
+            "matched_symptoms": matched,
+            "probabilities": probabilities,
+            "top_confidence": top_confidence,
+            "llm_analysis": None,
+            "llm_error": None,
+        }
+
+        if len(matched) >= self.min_matches and top_confidence >= self.min_confidence:
+            return self._decide(result, PATH_LOCAL)
+
+        path = PATH_LLM_FEW_MATCHES if len(matched) < self.min_matches else PATH_LLM_LOW_CONFIDENCE
+        if self.llm is None:
+            result["llm_error"] = "LLM analyzer not configured"
+            return self._decide(result, PATH_LOCAL_FALLBACK)
+
+        try:
+            with observe("llm_inference"):
+                result["llm_analysis"] = await self.llm.analyze(text)
+        except (ValueError, ConnectionError) as e:
+            logger.warning(f"LLM triage failed, using local prediction: {str(e)}")
+            result["llm_error"] = str(e)
+            return self._decide(result, PATH_LOCAL_FALLBACK)
+        return self._decide(result, path)
+
+    @staticmethod
+    def _decide(result: Dict[str, Any], path: str) -> Dict[str, Any]:
+        result["path"] = path
+        TRIAGE_DECISIONS.labels(path).inc()
+        if path == PATH_LOCAL:
+            LLM_CALLS_SAVED.inc()
+        return result
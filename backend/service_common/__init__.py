@@ -0,0 +1,6 @@
+"""
+Modules shared by the backend services (Lab_analysis, symptom_checker)
+
+The services run from their own directories, so they put backend/ on sys.path
+before importing from here.
+"""
@@ -0,0 +1,37 @@
+"""
+HTTP request latency middleware shared by the backend services
+
+Each service passes its own Prometheus Histogram, labelled ["method", "route", "status"],
+so the metric names stay per service while the recording logic lives in one place.
+"""
+import time
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency labelled by the matched route template"""
+
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Use the route template (/jobs/{job_id}) rather than the raw path to bound cardinality.
+            # Requests rejected before routing (rate limits, CORS preflight) have no route.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.histogram.labels(scope["method"], path, str(status["code"])).observe(time.perf_counter() - start)
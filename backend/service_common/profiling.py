@@ -0,0 +1,212 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames that mean "this thread is waiting, not working"
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler for every thread in the process
+
+    Samples are folded into "thread;outer;...;inner" stacks, the format read by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float = 0.005):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.busy = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._stack(frame)
+                if not stack:
+                    continue
+                kind = self._thread_kind(thread_id, names.get(thread_id, ""))
+                self.stacks[";".join([kind] + [name for name, _ in stack])] += 1
+                leaf_file, leaf_func = stack[-1][1]
+                if (leaf_file, leaf_func) not in IDLE_FRAMES:
+                    self.busy[kind] += 1
+
+    def _thread_kind(self, thread_id: int, name: str) -> str:
+        if thread_id == self.loop_thread_id:
+            return "event_loop"
+        if name.startswith(("ThreadPoolExecutor", "asyncio_", "AnyIO worker")):
+            return "executor"
+        return "other"
+
+    @staticmethod
+    def _stack(frame) -> List[Tuple[str, Tuple[str, str]]]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            stack.append((f"{code.co_name} ({filename}:{frame.f_lineno})", (filename, code.co_name)))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles opt-in or randomly sampled requests
+
+    A request is profiled when PROFILE_SAMPLE_RATE selects it, or when it sends an
+    X-Profile header matching PROFILE_TOKEN. Without a configured token the header
+    is ignored, so clients cannot make the server profile (and write files) at will.
+    Each profiled request writes to PROFILE_DIR:
+
+    - <id>.folded: sampled stacks of all threads, for flamegraph tools
+    - <id>.json: wall time and busy time split between event loop and executor threads
+    - <id>.pstats: cProfile of the event loop thread (PROFILE_MODE=cprofile only)
+
+    The profile id is returned in the X-Profile-Id response header. Only one request
+    is profiled at a time, but nothing else is paused: the samples and the cProfile
+    of the event loop thread cover every request the process serves meanwhile. The
+    JSON summary records how many other requests overlapped the profiled one
+    ("concurrent_requests"); profiles with a non-zero count mix their work in.
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        mode: Optional[str] = None,
+        token: Optional[str] = None,
+        interval: Optional[float] = None,
+    ):
+        self.app = app
+        self.output_dir = output_dir or os.getenv("PROFILE_DIR", "profiles")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.mode = (mode or os.getenv("PROFILE_MODE", "sample")).lower()
+        self.token = token if token is not None else os.getenv("PROFILE_TOKEN", "")
+        self.interval = interval if interval is not None else float(os.getenv("PROFILE_INTERVAL", "0.005"))
+        self._busy = threading.Lock()
+        # Requests in flight, and how many others overlapped the one being profiled
+        self._in_flight = 0
+        self._overlapping = 0
+
+    def _wanted(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        requested = headers.get(b"x-profile")
+        if requested is not None and self.token and hmac.compare_digest(requested, self.token.encode("latin-1")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._in_flight += 1
+        try:
+            if self._wanted(scope) and self._busy.acquire(blocking=False):
+                await self._profile(scope, receive, send)
+            else:
+                if self._busy.locked():
+                    self._overlapping += 1
+                await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _profile(self, scope, receive, send):
+        # Requests already running when profiling starts overlap it too
+        self._overlapping = self._in_flight - 1
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        profiler = cProfile.Profile() if self.mode == "cprofile" else None
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        sampler.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            sampler.stop()
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            try:
+                await asyncio.to_thread(self._write, profile_id, scope, wall, cpu, sampler, profiler, self._overlapping)
+            except Exception as e:
+                logger.warning(f"Failed to write profile {profile_id}: {str(e)}")
+            finally:
+                self._busy.release()
+
+    def _write(self, profile_id: str, scope, wall: float, cpu: float, sampler: StackSampler, profiler, overlapping: int):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, profile_id)
+
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if profiler is not None:
+            profiler.dump_stats(f"{base}.pstats")
+
+        samples = max(sampler.samples, 1)
+        summary: Dict[str, object] = {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "wall_seconds": round(wall, 6),
+            "process_cpu_seconds": round(cpu, 6),
+            "concurrent_requests": overlapping,
+            "samples": sampler.samples,
+            "interval_seconds": sampler.interval,
+            # Busy samples scaled to wall time; executor time is summed over its threads
+            "event_loop_busy_seconds": round(wall * sampler.busy["event_loop"] / samples, 6),
+            "executor_busy_seconds": round(wall * sampler.busy["executor"] / samples, 6),
+            "other_busy_seconds": round(wall * sampler.busy["other"] / samples, 6),
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Wrote request profile {base} ({wall * 1000:.1f} ms)")
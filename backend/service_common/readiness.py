@@ -0,0 +1,44 @@
+"""Readiness gate behind the services' `/ready` probes"""
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ReadinessGate:
+    """
+    Tracks whether a replica may receive traffic
+
+    `/health` only says the process is up; the gate opens once the service's warmup
+    steps have run (artifacts loaded, a warmup batch scored, the inference provider
+    answering), so a load balancer polling `/ready` does not route requests to a cold
+    or disconnected replica. Step durations are kept for the probe body.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.warmup_seconds: Dict[str, float] = {}
+        self._started = time.monotonic()
+
+    def step(self, name: str, fn: Callable[[], Any]) -> Any:
+        """Run one warmup step and record how long it took"""
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.warmup_seconds[name] = round(time.perf_counter() - started, 4)
+
+    def open(self):
+        self.ready = True
+        self.error = None
+        self.warmup_seconds["total"] = round(time.monotonic() - self._started, 4)
+
+    def fail(self, error: str):
+        self.ready = False
+        self.error = error
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "warmup_seconds": dict(self.warmup_seconds),
+        }
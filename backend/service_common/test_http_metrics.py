@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+from service_common.http_metrics import MetricsMiddleware
+
+
+class RecordingHistogram:
+    def __init__(self):
+        self.observed = []
+
+    def labels(self, *labels):
+        return SimpleNamespace(observe=lambda seconds: self.observed.append(labels))
+
+
+def respond(status, route=None):
+    async def app(scope, receive, send):
+        if route is not None:
+            scope["route"] = SimpleNamespace(path=route)
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+def call(middleware, path="/jobs/abc"):
+    async def send(message):
+        pass
+
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": path}, None, send))
+
+
+def test_records_route_template_and_status():
+    histogram = RecordingHistogram()
+    call(MetricsMiddleware(respond(200, route="/jobs/{job_id}"), histogram))
+    assert histogram.observed == [("GET", "/jobs/{job_id}", "200")]
+
+
+def test_rejection_before_routing_is_unmatched():
+    histogram = RecordingHistogram()
+    call(MetricsMiddleware(respond(429), histogram))
+    assert histogram.observed == [("GET", "unmatched", "429")]
+
+
+def test_exception_is_recorded_as_500():
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+
+    histogram = RecordingHistogram()
+    try:
+        call(MetricsMiddleware(broken, histogram))
+    except RuntimeError:
+        pass
+    assert histogram.observed == [("GET", "unmatched", "500")]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+
+from service_common.profiling import ProfilingMiddleware
+
+
+def make_app(gate=None):
+    async def app(scope, receive, send):
+        if gate is not None and scope["path"] == "/slow":
+            await gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+
+def request(path="/", profile=None):
+    headers = [(b"x-profile", profile.encode())] if profile is not None else []
+    return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+
+async def call(middleware, scope):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, None, send)
+    return dict(sent[0]["headers"])
+
+
+def test_header_ignored_without_token(tmp_path):
+    middleware = ProfilingMiddleware(make_app(), output_dir=str(tmp_path), sample_rate=0, token="")
+    headers = asyncio.run(call(middleware, request(profile="anything")))
+    assert b"x-profile-id" not in headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_header_must_match_token(tmp_path):
+    middleware = ProfilingMiddleware(make_app(), output_dir=str(tmp_path), sample_rate=0, token="s3cret", interval=0.001)
+    assert b"x-profile-id" not in asyncio.run(call(middleware, request(profile="wrong")))
+    headers = asyncio.run(call(middleware, request(profile="s3cret")))
+    profile_id = headers[b"x-profile-id"].decode()
+    assert sorted(os.listdir(tmp_path)) == [f"{profile_id}.folded", f"{profile_id}.json"]
+
+
+def test_summary_counts_overlapping_requests(tmp_path):
+    async def scenario():
+        gate = asyncio.Event()
+        middleware = ProfilingMiddleware(make_app(gate), output_dir=str(tmp_path), sample_rate=0, token="t", interval=0.001)
+        profiled = asyncio.create_task(call(middleware, request("/slow", profile="t")))
+        await asyncio.sleep(0.01)
+        await call(middleware, request("/"))
+        await call(middleware, request("/", profile="t"))  # profiler busy: served unprofiled
+        gate.set()
+        return (await profiled)[b"x-profile-id"].decode()
+
+    profile_id = asyncio.run(scenario())
+    with open(tmp_path / f"{profile_id}.json") as f:
+        assert json.load(f)["concurrent_requests"] == 2
@@ -1,13 +1,41 @@
+import asyncio
 import json
-from huggingface_hub import InferenceClient
-from typing import Dict, List, Optional
+from huggingface_hub import AsyncInferenceClient
+from typing import Dict, Iterable, List, Optional, Union
 
 class SymptomAnalyzer:
-    def __init__(self, api_token: str):
-        """Initialize the SymptomAnalyzer with HuggingFace API token."""
-        self.client = InferenceClient(token=api_token)
+    def __init__(
+        self,
+        api_token: str,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = 60.0,
+        client: Optional[AsyncInferenceClient] = None,
+    ):
+        """
+        Initialize the SymptomAnalyzer with HuggingFace API token.
+
+        Args:
+            api_token (str): HuggingFace API token
+            max_concurrency (int): Maximum requests in flight to the inference API
+            timeout (float): Per-request timeout in seconds
+            client (AsyncInferenceClient): Pre-built client to share between analyzers
+        """
+        # One async client keeps one pooled HTTP connection set for every call
+        self.client = client or AsyncInferenceClient(token=api_token, timeout=timeout)
         self.model = "mistralai/Mistral-7B-Instruct-v0.1"  # You can change this to your preferred model
-        
+        self.max_concurrency = max(1, max_concurrency)
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the underlying HTTP connections."""
+        await self.client.close()
+
     async def analyze(self, symptoms_text: str) -> Dict:
         """
         Analyze the provided symptoms text and return structured analysis.
@@ -38,19 +66,78 @@ class SymptomAnalyzer:
         Remember: This is for initial guidance only, not a final diagnosis."""
         
         try:
-            response = await self.client.text_generation(
-                prompt,
-                model=self.model,
-                max_new_tokens=500,
-                temperature=0.3,
-                return_full_text=False
-            )
-            
-            return self._parse_response(response)
+            # Calls beyond max_concurrency wait here instead of opening more connections
+            async with self._limit:
+                response = await self.client.text_generation(
+                    prompt,
+                    model=self.model,
+                    max_new_tokens=500,
+                    temperature=0.3,
+                    return_full_text=False
+                )
             
         except Exception as e:
             raise ConnectionError(f"Failed to get analysis: {str(e)}")
+        
+        return self._parse_response(response)
     
+    async def analyze_many(
+        self,
+        symptom_texts: Iterable[str],
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Analyze many symptom descriptions concurrently, returning results in input order.
+
+        Texts are pulled from `symptom_texts` only as workers become free, so a large
+        backlog (or a generator reading one) is never loaded into tasks all at once.
+
+        Args:
+            symptom_texts (Iterable[str]): Symptom descriptions
+            max_concurrency (int): Workers for this batch; defaults to the analyzer's limit,
+                which still caps requests in flight across all callers
+            return_exceptions (bool): Put failures in the result list instead of raising
+
+        Returns:
+            List with one analysis (or exception) per input, in input order
+
+        Raises:
+            ValueError, ConnectionError: The first failure, when return_exceptions is False
+        """
+        texts = iter(symptom_texts)
+        results: Dict[int, Union[Dict, Exception]] = {}
+        workers = max(1, max_concurrency or self.max_concurrency)
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index
+            while True:
+                # Single-threaded event loop: taking the next item cannot race
+                try:
+                    text = next(texts)
+                except StopIteration:
+                    return
+                index = next_index
+                next_index += 1
+                try:
+                    results[index] = await self.analyze(text)
+                except (ValueError, ConnectionError) as e:
+                    if not return_exceptions:
+                        raise
+                    results[index] = e
+
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return [results[i] for i in range(next_index)]
+
     def _parse_response(self, response: str) -> Dict:
         """
         Parse the LLM response into the required JSON structure.
@@ -97,6 +184,12 @@ class SymptomAnalyzer:
 
 # Example usage:
 # async def main():
-#     analyzer = SymptomAnalyzer("your-hf-token-here")
-#     result = await analyzer.analyze("Persistent headache for 3 days with sensitivity to light")
-#     print(result)
\ No newline at end of file
+#     async with SymptomAnalyzer("your-hf-token-here", max_concurrency=16) as analyzer:
+#         result = await analyzer.analyze("Persistent headache for 3 days with sensitivity to light")
+#         print(result)
+#
+#         # Triage a backlog of intake notes; results come back in input order
+#         notes = ["Fever and cough for a week", "Chest pain when climbing stairs"]
+#         results = await analyzer.analyze_many(notes, return_exceptions=True)
+#
+# asyncio.run(main())
\ No newline at end of file
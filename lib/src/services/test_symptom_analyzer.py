@@ -0,0 +1,135 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from symptom_analyzer import SymptomAnalyzer
+
+RESPONSE = {"potential_conditions": ["{name}"], "recommendation": "Rest", "urgency": "Low"}
+
+
+class FakeInferenceClient:
+    """
+    AsyncInferenceClient stand-in
+
+    Each note reads "<name> delay=<seconds> [fail=http|parse]"; the fake sleeps that
+    long, then answers with `name` as the condition, raises, or returns non-JSON.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.started = []
+        self.cancelled = []
+
+    async def text_generation(self, prompt, **kwargs):
+        note = re.search(r"Symptoms:\s*\n\s*(.+)", prompt).group(1).strip()
+        name = note.split()[0]
+        delay = float(re.search(r"delay=([\d.]+)", note).group(1))
+        self.started.append(name)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.in_flight -= 1
+        if "fail=http" in note:
+            raise RuntimeError("503 Service Unavailable")
+        if "fail=parse" in note:
+            return "I cannot help with that."
+        return json.dumps({**RESPONSE, "potential_conditions": [name]})
+
+    async def close(self):
+        pass
+
+
+def make_analyzer(max_concurrency=4):
+    client = FakeInferenceClient()
+    return SymptomAnalyzer("token", max_concurrency=max_concurrency, client=client), client
+
+
+def conditions(results):
+    return [result["potential_conditions"][0] for result in results]
+
+
+def test_results_come_back_in_input_order():
+    analyzer, _ = make_analyzer()
+    # Later notes finish first
+    notes = [f"n{i} delay={0.05 - i * 0.01:.2f}" for i in range(5)]
+    results = asyncio.run(analyzer.analyze_many(notes))
+    assert conditions(results) == ["n0", "n1", "n2", "n3", "n4"]
+
+
+def test_requests_in_flight_never_exceed_the_analyzer_limit():
+    analyzer, client = make_analyzer(max_concurrency=3)
+    notes = [f"n{i} delay=0.01" for i in range(12)]
+    # More workers than the analyzer allows still wait on its semaphore
+    results = asyncio.run(analyzer.analyze_many(notes, max_concurrency=8))
+    assert len(results) == 12
+    assert client.peak == 3
+
+
+def test_batch_concurrency_caps_workers():
+    analyzer, client = make_analyzer(max_concurrency=8)
+    asyncio.run(analyzer.analyze_many([f"n{i} delay=0.01" for i in range(10)], max_concurrency=2))
+    assert client.peak == 2
+
+
+def test_concurrent_batches_share_the_limit():
+    analyzer, client = make_analyzer(max_concurrency=2)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            analyzer.analyze_many([f"b{b}n{i} delay=0.01" for i in range(4)]) for b in range(3)
+        ))
+
+    assert [len(results) for results in asyncio.run(scenario())] == [4, 4, 4]
+    assert client.peak == 2
+
+
+def test_inputs_are_pulled_only_as_workers_free_up():
+    analyzer, client = make_analyzer(max_concurrency=2)
+    pulled = []
+
+    def notes():
+        for i in range(6):
+            # Never more than one pulled item per worker is waiting or running
+            assert len(pulled) - len(client.started) + client.in_flight <= 2
+            pulled.append(i)
+            yield f"n{i} delay=0.01"
+
+    assert conditions(asyncio.run(analyzer.analyze_many(notes()))) == [f"n{i}" for i in range(6)]
+
+
+def test_return_exceptions_keeps_failures_in_place():
+    analyzer, _ = make_analyzer()
+    notes = ["a delay=0", "b delay=0 fail=http", "c delay=0", "d delay=0 fail=parse"]
+    results = asyncio.run(analyzer.analyze_many(notes, return_exceptions=True))
+    assert results[0]["potential_conditions"] == ["a"] and results[2]["potential_conditions"] == ["c"]
+    assert isinstance(results[1], ConnectionError) and "503" in str(results[1])
+    assert isinstance(results[3], ValueError)
+
+
+def test_first_failure_raises_and_cancels_the_rest():
+    analyzer, client = make_analyzer(max_concurrency=2)
+    pulled = []
+
+    def notes():
+        for note in ["slow delay=5", "bad delay=0.01 fail=http", "never delay=0", "never2 delay=0"]:
+            pulled.append(note)
+            yield note
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await analyzer.analyze_many(notes())
+        return client.in_flight
+
+    assert asyncio.run(scenario()) == 0
+    assert client.cancelled == ["slow"]
+    # The worker that failed stops pulling and the cancelled one never gets further
+    assert pulled == ["slow delay=5", "bad delay=0.01 fail=http"]
+    assert client.started == ["slow", "bad"]